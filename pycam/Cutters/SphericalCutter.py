@@ -23,14 +23,7 @@ from pycam.Cutters.BaseCutter import BaseCutter
 from pycam.Geometry.intersection import intersect_sphere_plane, intersect_sphere_point, \
         intersect_sphere_line
 from pycam.Geometry.PointUtils import padd, pdot, pmul, pnormsq, psub
-
-
-try:
-    import OpenGL.GL as GL
-    import OpenGL.GLU as GLU
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
+from pycam.Utils import get_optional_module
 
 
 class SphericalCutter(BaseCutter):
@@ -43,7 +36,9 @@ class SphericalCutter(BaseCutter):
         return "SphericalCutter<%s,%s>" % (self.location, self.radius)
 
     def to_opengl(self):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        GLU = get_optional_module("OpenGL.GLU")
+        if (GL is None) or (GLU is None):
             return
         GL.glPushMatrix()
         GL.glTranslate(self.center[0], self.center[1], self.center[2])
@@ -24,15 +24,7 @@ from pycam.Geometry.intersection import intersect_torus_plane, intersect_torus_p
         intersect_circle_plane, intersect_circle_point, intersect_cylinder_point, \
         intersect_cylinder_line, intersect_circle_line
 from pycam.Geometry.PointUtils import padd, pdot, pmul, psub
-
-
-try:
-    import OpenGL.GL as GL
-    import OpenGL.GLU as GLU
-    import OpenGL.GLUT as GLUT
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
+from pycam.Utils import get_optional_module
 
 
 class ToroidalCutter(BaseCutter):
@@ -70,7 +62,10 @@ class ToroidalCutter(BaseCutter):
                 < (other.radius, other.majorradius, other.minorradius))
 
     def to_opengl(self):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        GLU = get_optional_module("OpenGL.GLU")
+        GLUT = get_optional_module("OpenGL.GLUT")
+        if (GL is None) or (GLU is None) or (GLUT is None):
             return
         GL.glPushMatrix()
         GL.glTranslate(self.center[0], self.center[1], self.center[2])
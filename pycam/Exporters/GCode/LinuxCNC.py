@@ -19,7 +19,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
 import pycam.Exporters.GCode
-from pycam.Toolpath import ToolpathPathMode
+from pycam.Toolpath import ARC_PLANES, ToolpathPathMode
 from pycam.workspace import LengthUnit
 
 
@@ -31,6 +31,10 @@ DEFAULT_HEADER = (("G40", "disable tool radius compensation"),
 
 DEFAULT_DIGITS = 6
 
+ARC_PLANE_COMMANDS = {"xy": ("G17", "select XY plane"),
+                      "xz": ("G18", "select XZ plane"),
+                      "yz": ("G19", "select YZ plane")}
+
 
 def _render_number(number):
     if int(number) == number:
@@ -79,6 +83,20 @@ class LinuxCNC(pycam.Exporters.GCode.BaseGenerator):
         if command.strip():
             self.add_command(command)
 
+    def add_arc(self, coordinates, center, plane, clockwise):
+        if self._get_cache("arc_plane", None) != plane:
+            self.add_command(*ARC_PLANE_COMMANDS[plane])
+            self._cache["arc_plane"] = plane
+        components = ["G2" if clockwise else "G3"]
+        previous = self._get_cache("position", None)
+        for (axis, value, last) in zip("XYZ", coordinates, previous):
+            if last != value:
+                components.append("%s%.6f" % (axis, value))
+        # the center is given relative to the start of the arc
+        for index in sorted(ARC_PLANES[plane][:2]):
+            components.append("%s%.6f" % ("IJK"[index], center[index] - previous[index]))
+        self.add_command(" ".join(components))
+
     def command_feedrate(self, feedrate):
         self.add_command("F%s" % _render_number(feedrate), "set feedrate")
 
@@ -19,7 +19,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import pycam.Utils.log
 import pycam.Toolpath.Filters
-from pycam.Toolpath import MOVE_STRAIGHT_RAPID, MACHINE_SETTING, COMMENT, MOVES_LIST
+from pycam.Toolpath import MOVE_ARC, MOVE_STRAIGHT_RAPID, MACHINE_SETTING, COMMENT, MOVES_LIST
 
 _log = pycam.Utils.log.get_logger()
 
@@ -59,6 +59,9 @@ class BaseGenerator:
     def add_move(self, coordinates, is_rapid=False):
         raise NotImplementedError("someone forgot to implement 'add_move'")
 
+    def add_arc(self, coordinates, center, plane, clockwise):
+        raise NotImplementedError("someone forgot to implement 'add_arc'")
+
     def add_footer(self):
         raise NotImplementedError("someone forgot to implement 'add_footer'")
 
@@ -72,9 +75,15 @@ class BaseGenerator:
         all_filters = list(self._filters)
         if filters:
             all_filters.extend(filters)
-        filtered_moves = pycam.Toolpath.Filters.get_filtered_moves(moves, all_filters)
+        filtered_moves = pycam.Toolpath.Filters.iter_filtered_moves(moves, all_filters)
         for step in filtered_moves:
-            if step.action in MOVES_LIST:
+            if (step.action == MOVE_ARC) and (step.center is not None) \
+                    and (self._cache.get("position") is not None):
+                self.add_arc(step.position, step.center, step.plane, step.clockwise)
+                self._cache["position"] = step.position
+                # the next straight move needs to announce its type again
+                self._cache["rapid_move"] = None
+            elif step.action in MOVES_LIST:
                 is_rapid = step.action == MOVE_STRAIGHT_RAPID
                 self.add_move(step.position, is_rapid)
                 self._cache["position"] = step.position
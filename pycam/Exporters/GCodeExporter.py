@@ -19,8 +19,12 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import decimal
+import fractions
+import math
 import os
 
+from pycam.Toolpath import ARC_PLANES
+
 
 DEFAULT_HEADER = ("G40 (disable tool radius compensation)",
                   "G49 (disable tool length compensation)",
@@ -30,6 +34,11 @@ DEFAULT_HEADER = ("G40 (disable tool radius compensation)",
 
 MAX_DIGITS = 12
 
+# the GCode commands selecting the planes of circular moves
+ARC_PLANE_COMMANDS = {"xy": "G17 (select XY plane)",
+                      "xz": "G18 (select XZ plane)",
+                      "yz": "G19 (select YZ plane)"}
+
 
 def _get_num_of_significant_digits(number):
     """ Determine the number of significant digits of a float number. """
@@ -50,14 +59,37 @@ def _get_num_of_significant_digits(number):
         return MAX_DIGITS
 
 
-def _get_num_converter(step_width):
-    """ Return a float-to-decimal conversion function with a prevision suitable
-    for the given step width.
+def _get_unit_count(value, scale):
+    """ return the number of units (1 / scale) of a value - rounded exactly like "%.Nf" % value
+
+    The float product of the value and the scale may be rounded to the wrong side near half a
+    unit (e.g. 2.675 * 100).  Only these rare cases are calculated exactly.
+    """
+    product = value * scale
+    if abs(abs(product) % 1 - 0.5) < 1e-9 * max(1, abs(product)):
+        return round(fractions.Fraction(value) * scale)
+    return round(product)
+
+
+def _get_axis_formatter(step_width):
+    """ Return the step width (as a number of units of its smallest significant digit), the
+    scale factor for turning a value into these units and the number of digits.
     """
     digits = _get_num_of_significant_digits(step_width)
-    format_string = "%%.%df" % digits
-    conv_func = lambda number: decimal.Decimal(format_string % number)
-    return conv_func, format_string
+    scale = 10 ** digits
+    return _get_unit_count(step_width, scale), scale, digits
+
+
+def _format_units(count, digits, negative=False):
+    """ render an integer number of units of the given decimal digit as a decimal number
+
+    @value negative: the rendered value was negative - even if it is rounded to zero ("-0.0")
+    """
+    text = "{:f}".format(decimal.Decimal(count).scaleb(-digits))
+    if negative and (count == 0):
+        # keep the output of previous versions (based on "%.Nf" % value)
+        text = "-" + text
+    return text
 
 
 class GCodeGenerator:
@@ -93,8 +125,7 @@ class GCodeGenerator:
                 step_width = minimum_steps[i]
             else:
                 step_width = minimum_steps[-1]
-            conv, format_string = _get_num_converter(step_width)
-            self._axes_formatter.append((conv(step_width), conv, format_string))
+            self._axes_formatter.append(_get_axis_formatter(step_width))
         self._finished = False
         if comment:
             self.add_comment(comment)
@@ -108,6 +139,7 @@ class GCodeGenerator:
             self.append("G20 (imperial)")
         self.last_position = [None, None, None]
         self.last_rapid = None
+        self.last_arc_plane = None
         self.last_tool_id = None
         self.last_feedrate = 100
         if touch_off_on_startup or touch_off_on_tool_change:
@@ -259,17 +291,20 @@ class GCodeGenerator:
         @value rapid: is this a rapid move?
         @type rapid: bool
         """
+        # the positions are handled as integer numbers of units of the minimum step width
         new_pos = []
+        values = []
         for index, attr in enumerate("xyz"):
-            conv = self._axes_formatter[index][1]
+            scale = self._axes_formatter[index][1]
             if hasattr(position, attr):
                 value = getattr(position, attr)
             else:
                 value = position[index]
+            values.append(value)
             if value is None:
                 new_pos.append(None)
             else:
-                new_pos.append(conv(value))
+                new_pos.append(_get_unit_count(value, scale))
         # check if there was a significant move
         no_diff = True
         for index, current_new_axis in enumerate(new_pos):
@@ -292,7 +327,9 @@ class GCodeGenerator:
                 continue
             if not self.last_position or \
                     (new_pos[index] != self.last_position[index]):
-                pos_string.append(axis_spec + self._axes_formatter[index][2] % new_pos[index])
+                pos_string.append(axis_spec + _format_units(
+                    new_pos[index], self._axes_formatter[index][2],
+                    negative=math.copysign(1, values[index]) < 0))
                 self.last_position[index] = new_pos[index]
         if rapid == self.last_rapid:
             prefix = ""
@@ -303,6 +340,37 @@ class GCodeGenerator:
         self.last_rapid = rapid
         self.append("%s %s" % (prefix, " ".join(pos_string)))
 
+    def add_arc(self, position, center, plane, clockwise):
+        """ add the GCode for a circular move (G2/G3) to 'position' around 'center'
+
+        @value plane: one of the keys of ARC_PLANES
+        @value clockwise: direction of the move (viewed from the positive normal axis)
+        """
+        if None in self.last_position:
+            # the start of the arc is unknown
+            self.add_move(position)
+            return
+        new_pos = [_get_unit_count(value, formatter[1])
+                   for value, formatter in zip(position, self._axes_formatter)]
+        center_pos = [_get_unit_count(value, formatter[1])
+                      for value, formatter in zip(center, self._axes_formatter)]
+        if plane != self.last_arc_plane:
+            self.append(ARC_PLANE_COMMANDS[plane])
+            self.last_arc_plane = plane
+        pos_string = []
+        for index, axis_spec in enumerate("XYZ"):
+            if new_pos[index] != self.last_position[index]:
+                pos_string.append(axis_spec + _format_units(new_pos[index],
+                                                            self._axes_formatter[index][2]))
+        for index in sorted(ARC_PLANES[plane][:2]):
+            offset = center_pos[index] - self.last_position[index]
+            pos_string.append("IJK"[index] + _format_units(offset,
+                                                           self._axes_formatter[index][2]))
+        self.append("%s %s" % ("G2" if clockwise else "G3", " ".join(pos_string)))
+        self.last_position = new_pos
+        # the next straight move needs to announce its type again
+        self.last_rapid = None
+
     def finish(self):
         self.add_move_to_safety()
         self.append("M2 (end program)")
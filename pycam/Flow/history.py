@@ -1,10 +1,9 @@
 import collections
 import contextlib
 import datetime
-import io
 
 from pycam.errors import PycamBaseException
-from pycam.Flow.parser import dump_yaml, parse_yaml
+from pycam.Flow.parser import CollectionsSnapshot
 from pycam.Utils.events import get_event_handler
 import pycam.Utils.log
 
@@ -12,16 +11,19 @@ _log = pycam.Utils.log.get_logger()
 
 
 class DataRevision:
-    """ create a representation of the current state of all collections """
+    """ create a representation of the current state of all collections
+
+    Unchanged items share their state with the previous revision (see "CollectionsSnapshot").
+    """
 
     def __init__(self):
         """ create a representation of the current state of all collections """
         self.timestamp = datetime.datetime.now()
-        self.dump = dump_yaml()
+        self.snapshot = CollectionsSnapshot()
 
     def __lt__(self, other):
         """sort revisions by timestamp"""
-        return (self.timestamp, self.dump) < (other.timestamp, other.dump)
+        return self.timestamp < other.timestamp
 
 
 class DataHistory:
@@ -81,8 +83,7 @@ class DataHistory:
             # we do not expect a "change" since we switch to a previous state
             with self.merge_changes(no_store=True):
                 with event_handler.blocked_events(self.subscribed_events, emit_after=True):
-                    source = io.StringIO(self._revisions[-1].dump)
-                    parse_yaml(source, reset=True)
+                    self._revisions[-1].snapshot.restore()
             _log.info("Restored previous state from history (%d/%d)",
                       len(self._revisions) + 1, self.max_revision_count)
             event_handler.emit_event("history-changed")
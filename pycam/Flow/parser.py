@@ -1,15 +1,19 @@
 import yaml
 
-import pycam.Exporters.GCode.LinuxCNC
-import pycam.Importers
-import pycam.Plugins
 import pycam.Utils.log
+import pycam.Utils.threading
 from pycam.workspace import CollectionName
 import pycam.workspace.data_models
 
 
 _log = pycam.Utils.log.get_logger()
 
+# top-level section for choosing the executor backends of parallel calculations by call site
+EXECUTOR_BACKENDS_SECTION = "executor_backends"
+DEFAULT_CALL_SITE_KEY = "default"
+
+# the most recently created snapshot - its item states are shared with the next snapshot
+_latest_snapshot = None
 
 COLLECTIONS = (pycam.workspace.data_models.Tool,
                pycam.workspace.data_models.Process,
@@ -54,6 +58,62 @@ def parse_yaml(source, excluded_sections=None, reset=False):
             if item_class(name, data) is None:
                 _log.error("Failed to import '%s' into '%s'.", name, section.value)
         _log.info("Imported %d items into '%s'", len(collection) - count_before, section.value)
+    if reset:
+        pycam.Utils.threading.reset_executor_backends()
+    _apply_executor_backends(parsed)
+
+
+def _apply_executor_backends(parsed):
+    for call_site, backend in parsed.get(EXECUTOR_BACKENDS_SECTION, {}).items():
+        if call_site == DEFAULT_CALL_SITE_KEY:
+            call_site = None
+        pycam.Utils.threading.set_executor_backend(backend, call_site=call_site)
+
+
+def update_from_yaml(sources):
+    """ synchronize the object collections with yaml descriptions
+
+    In contrast to "parse_yaml" (with "reset") unchanged items are kept.  Thus their cached
+    results (e.g. loaded models) remain available.
+
+    @param sources: list of file-like objects - items of later sources override items of
+        earlier sources with the same name
+    @returns a set of tuples (collection name, item ID) of all added, changed or removed items
+    """
+    merged = {}
+    for source in sources:
+        parsed = yaml.safe_load(source) or {}
+        for section, items in parsed.items():
+            merged.setdefault(section, {}).update(items or {})
+    # create all items before touching the collections - an invalid description changes nothing
+    wanted_items = {item_class: [item_class(item_id, data, add_to_collection=False)
+                                 for item_id, data in merged.get(
+                                     item_class.collection_name.value, {}).items()]
+                    for item_class in COLLECTIONS}
+    changed = set()
+    for item_class, new_items in wanted_items.items():
+        section = item_class.collection_name
+        collection = item_class.get_collection()
+        wanted_ids = {item.get_id() for item in new_items}
+        current_items = {item.get_id(): item for item in collection}
+        for item_id, item in current_items.items():
+            if item_id not in wanted_ids:
+                collection.remove(item)
+                changed.add((section, item_id))
+        for new_item in new_items:
+            item_id = new_item.get_id()
+            current = current_items.get(item_id)
+            if current is None:
+                collection.append(new_item)
+                changed.add((section, item_id))
+            elif current.get_dict() != new_item.get_dict():
+                collection[list(collection).index(current)] = new_item
+                changed.add((section, item_id))
+    pycam.Utils.threading.reset_executor_backends()
+    _apply_executor_backends(merged)
+    _log.info("Changed items: %s", ", ".join(sorted("{}/{}".format(section.value, item_id)
+                                                    for section, item_id in changed)))
+    return changed
 
 
 def dump_yaml(target=None, excluded_sections=None):
@@ -75,6 +135,11 @@ def dump_yaml(target=None, excluded_sections=None):
             continue
         result[section.value] = item_class.get_collection().get_dict(
             with_application_attributes=True, without_uuids=True)
+    executor_backends = pycam.Utils.threading.get_executor_backends()
+    if executor_backends:
+        result[EXECUTOR_BACKENDS_SECTION] = {
+            (DEFAULT_CALL_SITE_KEY if call_site is None else call_site): backend.value
+            for call_site, backend in executor_backends.items()}
     return yaml.dump(result, stream=target)
 
 
@@ -88,16 +153,68 @@ def validate_collections():
         collection.validate()
 
 
+class CollectionsSnapshot:
+    """ a representation of the current state of all collections
+
+    The state of an item is captured only once after each of its changes (see
+    "BaseDataContainer.get_revision").  Unchanged items share their state with the previous
+    snapshot.  The captured states are never modified.  Thus taking a snapshot of a large
+    workspace is cheap, if only a few items changed.
+    """
+
+    def __init__(self):
+        global _latest_snapshot
+        if _latest_snapshot is None:
+            known_states = {}
+        else:
+            known_states = {item: (revision, state)
+                            for entries in _latest_snapshot._items.values()
+                            for item, revision, state in entries}
+        self._items = {}
+        for item_class in COLLECTIONS:
+            entries = []
+            for item in item_class.get_collection():
+                revision = item.get_revision()
+                known_revision, state = known_states.get(item, (None, None))
+                if known_revision != revision:
+                    state = item.get_dict(with_application_attributes=True)
+                entries.append((item, revision, state))
+            self._items[item_class] = tuple(entries)
+        self._executor_backends = pycam.Utils.threading.get_executor_backends()
+        _latest_snapshot = self
+
+    def restore(self):
+        """ change the collections back to the captured state
+
+        Unchanged items are kept.  Only the items that were changed after the snapshot are
+        created again from their captured state.
+        """
+        rebuilt_count = 0
+        for item_class, entries in self._items.items():
+            wanted_items = []
+            for item, revision, state in entries:
+                if item.get_revision() != revision:
+                    item = item_class(state[item_class.unique_attribute], state,
+                                      add_to_collection=False)
+                    rebuilt_count += 1
+                wanted_items.append(item)
+            item_class.get_collection().set_items(wanted_items)
+        pycam.Utils.threading.reset_executor_backends()
+        for call_site, backend in self._executor_backends.items():
+            pycam.Utils.threading.set_executor_backend(backend, call_site=call_site)
+        _log.debug("Restored snapshot of collections (rebuilt items: %d)", rebuilt_count)
+
+
 class RestoreCollectionsOnError:
     """ restore the collections to their original state, if an exception is thrown meanwhile """
 
     def __enter__(self):
-        self._original_dump = dump_yaml()
+        self._snapshot = CollectionsSnapshot()
 
     def __exit__(self, exc_type, exc_value, traceback):
         if exc_type is not None:
             _log.warning("Reverting collection changes due to error: %s", exc_value)
             # a problem occurred during the operation
-            parse_yaml(self._original_dump, reset=True)
+            self._snapshot.restore()
         # do not suppress exceptions
         return False
@@ -0,0 +1,174 @@
+import concurrent.futures
+
+from pycam.errors import InvalidDataError
+import pycam.Utils.log
+import pycam.Utils.threading
+from pycam.workspace import CollectionName
+import pycam.workspace.data_models
+
+
+_log = pycam.Utils.log.get_logger()
+
+# the calculation of the result of a collection item - other collections contain settings only
+CALCULATIONS = {CollectionName.MODELS: lambda item: item.get_model(),
+                CollectionName.TASKS: lambda item: item.generate_toolpath(),
+                CollectionName.TOOLPATHS: lambda item: item.get_toolpath(),
+                CollectionName.EXPORTS: lambda item: item.run_export()}
+
+
+def _get_node_key(item):
+    return (item.collection_name, item.get_id())
+
+
+class FlowNode:
+    """ a collection item (e.g. a model or a toolpath) as part of the dependency graph """
+
+    def __init__(self, item):
+        self.item = item
+        self.key = _get_node_key(item)
+        self.dependencies = set()
+        self.dependents = set()
+
+    def run(self):
+        try:
+            calculation = CALCULATIONS[self.key[0]]
+        except KeyError:
+            # nothing to be calculated (e.g. a tool)
+            return
+        _log.debug("Calculating %s '%s'", self.key[0].value, self.key[1])
+        calculation(self.item)
+
+    def __str__(self):
+        return "{}({})".format(self.key[0].value, self.key[1])
+
+
+def get_dependency_graph(items=None):
+    """ collect the given collection items and all their (indirect) dependencies
+
+    @param items: the wanted collection items (default: all exports)
+    @returns a dictionary of FlowNode objects indexed by collection name and item ID
+    """
+    if items is None:
+        items = pycam.workspace.data_models.Export.get_collection()
+    graph = {}
+    pending = list(items)
+    while pending:
+        item = pending.pop()
+        key = _get_node_key(item)
+        if key in graph:
+            continue
+        node = FlowNode(item)
+        graph[key] = node
+        for dependency in item.get_dependencies():
+            node.dependencies.add(_get_node_key(dependency))
+            pending.append(dependency)
+    for node in graph.values():
+        for key in node.dependencies:
+            graph[key].dependents.add(node.key)
+    _check_for_cycles(graph)
+    return graph
+
+
+def get_affected_keys(graph, changed_keys):
+    """ return the keys of all nodes depending (directly or indirectly) on the changed keys
+
+    The result includes the changed keys themselves (as far as they are part of the graph).
+    """
+    result = set()
+    pending = [key for key in changed_keys if key in graph]
+    while pending:
+        key = pending.pop()
+        if key not in result:
+            result.add(key)
+            pending.extend(graph[key].dependents)
+    return result
+
+
+def _check_for_cycles(graph):
+    """ raise an InvalidDataError if the items depend on each other in a circular way """
+    remaining = {key: len(node.dependencies) for key, node in graph.items()}
+    ready = [key for key, count in remaining.items() if count == 0]
+    while ready:
+        key = ready.pop()
+        del remaining[key]
+        for dependent in graph[key].dependents:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if remaining:
+        raise InvalidDataError("Circular dependency between the following items: {}".format(
+            ", ".join(sorted(str(graph[key]) for key in remaining))))
+
+
+class FlowScheduler:
+    """ calculate the items of the processing flow in the order of their dependencies
+
+    Items without mutual dependencies (e.g. two unrelated toolpaths) are calculated concurrently.
+    Later calculations based on an item retrieve its result from the cache (see "CacheStorage").
+    The cached results of an item are pinned until all of its dependents are finished.  Thus
+    they are not evicted due to the memory budget of the cache and every item is calculated
+    only once during a run.  The number of concurrently calculated items is limited
+    by "max_workers".  Their parallel calculations share the global executors (e.g. the pool of
+    local processes).  Thus the number of worker processes is not exceeded.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = pycam.Utils.threading.get_number_of_processes()
+        self.max_workers = max(1, max_workers)
+
+    def run(self, items=None):
+        """ calculate the given collection items (default: all exports) and their dependencies
+
+        The first failing calculation prevents the start of further calculations.  Its
+        exception is raised after the running calculations are finished.
+        """
+        graph = get_dependency_graph(items)
+        missing_counts = {key: len(node.dependencies) for key, node in graph.items()}
+        pending_dependents = {key: len(node.dependents) for key, node in graph.items()}
+        ready = [key for key, count in missing_counts.items() if count == 0]
+        running = {}
+        pinned = set()
+        error = None
+
+        def unpin(key):
+            pinned.remove(key)
+            pycam.workspace.data_models.unpin_cached_results(graph[key].item)
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pycam-flow") as pool:
+                while ready or running:
+                    while ready and (error is None):
+                        node = graph[ready.pop()]
+                        pycam.workspace.data_models.pin_cached_results(node.item)
+                        pinned.add(node.key)
+                        running[pool.submit(node.run)] = node
+                    if not running:
+                        break
+                    finished, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        node = running.pop(future)
+                        # the results of the dependencies may be evicted after their last use
+                        for key in node.dependencies:
+                            pending_dependents[key] -= 1
+                            if (pending_dependents[key] == 0) and (key in pinned):
+                                unpin(key)
+                        exc = future.exception()
+                        if exc is not None:
+                            _log.debug("Failed to calculate %s: %s", node, exc)
+                            if error is None:
+                                error = exc
+                            continue
+                        if not node.dependents:
+                            unpin(node.key)
+                        for key in node.dependents:
+                            missing_counts[key] -= 1
+                            if missing_counts[key] == 0:
+                                ready.append(key)
+        finally:
+            for key in list(pinned):
+                unpin(key)
+        if error is not None:
+            raise error
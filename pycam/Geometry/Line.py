@@ -18,16 +18,11 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-try:
-    import OpenGL.GL as GL
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
-
 from pycam.Geometry import epsilon, TransformableContainer, IDGenerator
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.PointUtils import (padd, pcross, pdist, pdot, pmul, pnorm, pnormsq,
                                        pnormalized, psub)
+from pycam.Utils import get_optional_module
 # OpenGLTools will be imported later, if necessary
 # import pycam.Gui.OpenGLTools
 
@@ -152,7 +147,8 @@ class Line(IDGenerator, TransformableContainer):
         return (dir1 == dir2 == self.dir) or (dir1 is None) or (dir2 is None)
 
     def to_opengl(self, color=None, show_directions=False):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        if GL is None:
             return
         if color is not None:
             GL.glColor4f(*color)
@@ -21,7 +21,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
 
-from pycam.Geometry import sqrt, number, epsilon
+from pycam.Geometry import sqrt, number, epsilon, Box3D, Point3D
 from pycam.Geometry.PointUtils import pcross, pnormalized
 
 
@@ -167,3 +167,79 @@ def multiply_vector_matrix(v, m):
     return (v[0] * m[0][0] + v[1] * m[0][1] + v[2] * m[0][2],
             v[0] * m[1][0] + v[1] * m[1][1] + v[2] * m[1][2],
             v[0] * m[2][0] + v[1] * m[2][1] + v[2] * m[2][2])
+
+
+def get_affine_matrix(matrix):
+    """ convert a 3x3 or 3x4 matrix into a 3x4 matrix
+
+    A missing fourth column (the shift offsets) is filled with zeros.
+    @rtype: tuple(tuple(float))
+    @return: the matrix (3x4)
+    """
+    return tuple(tuple(number(value) for value in row[:4]) + (number(0), ) * (4 - len(row))
+                 for row in matrix)
+
+
+def get_translation_matrix(offset):
+    """ return a 3x4 matrix for shifting a point by the given 3d offset """
+    return ((1, 0, 0, offset[0]), (0, 1, 0, offset[1]), (0, 0, 1, offset[2]))
+
+
+def get_scale_matrix(scale_x, scale_y, scale_z):
+    """ return a 3x4 matrix for scaling a point (relative to the origin) """
+    return ((scale_x, 0, 0, 0), (0, scale_y, 0, 0), (0, 0, scale_z, 0))
+
+
+def multiply_affine_matrices(first, second):
+    """ combine two affine transformations (3x3 or 3x4 matrices) into a single 3x4 matrix
+
+    Transforming a point with the resulting matrix is equivalent to transforming it with the
+    "first" matrix and afterwards with the "second" matrix.
+    @rtype: tuple(tuple(float))
+    @return: the combined matrix (3x4)
+    """
+    first = get_affine_matrix(first)
+    second = get_affine_matrix(second)
+    return tuple(tuple(sum(second[row][index] * first[index][column] for index in range(3))
+                       for column in range(3))
+                 + (sum(second[row][index] * first[index][3] for index in range(3))
+                    + second[row][3], )
+                 for row in range(3))
+
+
+def get_rotation_matrix_around_point(center, rot_axis, rot_angle, use_radians=True):
+    """ calculate the 3x4 matrix for a rotation around an axis through the given center
+
+    see "get_rotation_matrix_axis_angle" for the description of the parameters
+    """
+    rotation = get_rotation_matrix_axis_angle(rot_axis, rot_angle, use_radians=use_radians)
+    to_origin = get_translation_matrix([-value for value in center])
+    return multiply_affine_matrices(multiply_affine_matrices(to_origin, rotation),
+                                    get_translation_matrix(center))
+
+
+def is_axis_aligned_matrix(matrix):
+    """ check if a matrix consists only of scaling and shifting (e.g. no rotation)
+
+    Axis-aligned boxes (e.g. the bounding box of a model) remain axis-aligned after such a
+    transformation.
+    """
+    return all(matrix[row][column] == 0
+               for row in range(3) for column in range(3) if row != column)
+
+
+def get_transformed_box(box, matrix):
+    """ transform an axis-aligned box (Box3D) with an axis-aligned matrix
+
+    see "is_axis_aligned_matrix"
+    @rtype: Box3D
+    """
+    assert is_axis_aligned_matrix(matrix)
+    matrix = get_affine_matrix(matrix)
+    lower, upper = [], []
+    for axis in range(3):
+        values = [matrix[axis][axis] * corner[axis] + matrix[axis][3]
+                  for corner in (box.lower, box.upper)]
+        lower.append(min(values))
+        upper.append(max(values))
+    return Box3D(Point3D(*lower), Point3D(*upper))
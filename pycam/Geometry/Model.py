@@ -18,7 +18,9 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import hashlib
 import math
+import struct
 import uuid
 
 from pycam.Geometry import epsilon, INFINITE, TransformableContainer, IDGenerator, Box3D, Point3D
@@ -26,7 +28,7 @@ from pycam.Geometry.Matrix import TRANSFORMATIONS
 from pycam.Geometry.Line import Line
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.Polygon import Polygon
-from pycam.Geometry.PointUtils import pcross, pdist, pmul, pnorm, pnormalized, psub
+from pycam.Geometry.PointUtils import pcross, pdist, pnorm, pnormalized, psub
 from pycam.Geometry.Triangle import Triangle
 from pycam.Geometry.TriangleKdtree import TriangleKdtree
 from pycam.Toolpath import Bounds
@@ -82,6 +84,8 @@ class BaseModel(IDGenerator, TransformableContainer):
         self.maxz = None
         # derived classes should override this
         self._export_function = None
+        # calculated on demand - it is discarded whenever the model changes
+        self._content_digest = None
 
     def __add__(self, other_model):
         """ combine two models """
@@ -148,6 +152,7 @@ class BaseModel(IDGenerator, TransformableContainer):
                 self.maxz = max(self.maxz, item.maxz)
 
     def append(self, item):
+        self._content_digest = None
         self._update_limits(item)
 
     def extend(self, items):
@@ -162,6 +167,7 @@ class BaseModel(IDGenerator, TransformableContainer):
         return model
 
     def reset_cache(self):
+        self._content_digest = None
         self.minx = None
         self.miny = None
         self.minz = None
@@ -195,23 +201,24 @@ class BaseModel(IDGenerator, TransformableContainer):
         matrix = ((scale_x, 0, 0, 0), (0, scale_y, 0, 0), (0, 0, scale_z, 0))
         self.transform_by_matrix(matrix, callback=self._get_progress_callback(callback))
 
-    def _shift_to_origin(self, position, callback=None):
-        if position != Point3D(0, 0, 0):
-            self.shift(*(pmul(position, -1)), callback=callback)
-
-    def _shift_origin_to(self, position, callback=None):
-        if position != Point3D(0, 0, 0):
-            self.shift(*position, callback=callback)
-
     def rotate(self, center, axis_vector, angle, callback=None):
-        # shift the model to the rotation center
-        self._shift_to_origin(center, callback=callback)
-        # rotate the model
-        matrix = pycam.Geometry.Matrix.get_rotation_matrix_axis_angle(axis_vector, angle,
-                                                                      use_radians=False)
+        # shift to the rotation center, rotate and shift back - combined in a single pass
+        matrix = pycam.Geometry.Matrix.get_rotation_matrix_around_point(
+            center, axis_vector, angle, use_radians=False)
         self.transform_by_matrix(matrix, callback=callback)
-        # shift the model back to its original position
-        self._shift_origin_to(center, callback=callback)
+
+    def get_content_digest(self):
+        """ return a hex digest of the geometry of the model
+
+        Models with equal geometry (e.g. loaded from the same file) share the same digest.
+        The digest is calculated only once - until the model is changed.
+        """
+        if self._content_digest is None:
+            self._content_digest = self._calculate_content_digest()
+        return self._content_digest
+
+    def _calculate_content_digest(self):
+        raise NotImplementedError
 
     def get_bounds(self):
         return Bounds(Bounds.TYPE_CUSTOM, Box3D(Point3D(self.minx, self.miny, self.minz),
@@ -273,6 +280,13 @@ class Model(BaseModel):
         # the kdtree is up-to-date again
         self._dirty = False
 
+    def _calculate_content_digest(self):
+        digest = hashlib.sha256(type(self).__name__.encode("utf-8"))
+        for triangle in self._triangles:
+            digest.update(struct.pack("<12d", *triangle.p1[:3], *triangle.p2[:3],
+                                      *triangle.p3[:3], *triangle.normal[:3]))
+        return digest.hexdigest()
+
     def triangles(self, minx=-INFINITE, miny=-INFINITE, minz=-INFINITE, maxx=+INFINITE,
                   maxy=+INFINITE, maxz=+INFINITE):
         if (minx == miny == minz == -INFINITE) and (maxx == maxy == maxz == +INFINITE):
@@ -491,6 +505,15 @@ class ContourModel(BaseModel):
             # parent class)
             pass
 
+    def _calculate_content_digest(self):
+        digest = hashlib.sha256(type(self).__name__.encode("utf-8"))
+        for polygon in self.get_polygons():
+            points = polygon.get_points()
+            digest.update(struct.pack("<?I", polygon.is_closed, len(points)))
+            for point in points:
+                digest.update(struct.pack("<3d", *point[:3]))
+        return digest.hexdigest()
+
     def get_polygons(self, z=None, ignore_below=True):
         if z is None:
             return self._line_groups
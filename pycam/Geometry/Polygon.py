@@ -17,23 +17,20 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import collections
+import math
+
 from pycam.Geometry import epsilon, number, TransformableContainer, IDGenerator
 from pycam.Geometry.Line import Line
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.PointUtils import padd, pcross, pdist, pdiv, pdot, pis_inside, pmul, pnorm, \
         pnormalized, psub
 from pycam.Geometry.utils import get_bisector
-from pycam.Utils import log
+from pycam.Utils import get_optional_module, log
 log = log.get_logger()
 # import later to avoid circular imports
 # from pycam.Geometry.Model import ContourModel
 
-try:
-    import OpenGL.GL as GL
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
-
 
 LINE_WIDTH_INNER = 0.7
 LINE_WIDTH_OUTER = 1.3
@@ -465,42 +462,9 @@ class Polygon(TransformableContainer):
         if not pis_inside(p, self.minx, self.maxx, self.miny, self.maxy, self.minz, self.maxz):
             # the point is outside the rectangle boundary
             return False
-        # see http://www.alienryderflex.com/polygon/
-        # Count the number of intersections of a ray along the x axis through
-        # all polygon lines.
-        # Odd number -> point is inside
-        intersection_count_left = 0
-        intersection_count_right = 0
-        for index in range(len(self._points)):
-            p1 = self._points[index]
-            p2 = self._points[(index + 1) % len(self._points)]
-            # Only count intersections with lines that are partly below
-            # the y level of the point. This solves the problem of intersections
-            # through shared vertices or lines that go along the y level of the
-            # point.
-            if ((p1[1] < p[1]) and (p[1] <= p2[1])) \
-                    or ((p2[1] < p[1]) and (p[1] <= p1[1])):
-                part_y = (p[1] - p1[1]) / (p2[1] - p1[1])
-                intersection_x = p1[0] + part_y * (p2[0] - p1[0])
-                if intersection_x < p[0] + epsilon:
-                    # count intersections to the left
-                    intersection_count_left += 1
-                if intersection_x > p[0] - epsilon:
-                    # count intersections to the right
-                    intersection_count_right += 1
-        # odd intersection count -> inside
-        left_odd = intersection_count_left % 2 == 1
-        right_odd = intersection_count_right % 2 == 1
-        if left_odd and right_odd:
-            # clear decision: we are inside
-            return True
-        elif not left_odd and not right_odd:
-            # clear decision: we are outside
-            return False
-        else:
-            # it seems like we are on the line -> inside
-            log.debug("polygon.is_point_inside: unclear decision")
-            return True
+        edges = ((self._points[index], self._points[(index + 1) % len(self._points)])
+                 for index in range(len(self._points)))
+        return _is_point_inside_edges(p, edges)
 
     def get_points(self):
         return self._points[:]
@@ -522,7 +486,8 @@ class Polygon(TransformableContainer):
         return self._lines_cache[:]
 
     def to_opengl(self, **kwords):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        if GL is None:
             return
         GL.glDisable(GL.GL_LIGHTING)
         if self.is_closed:
@@ -1112,12 +1077,21 @@ class Polygon(TransformableContainer):
         return result
 
     def split_line(self, line):
+        return self._split_line(line, lambda proj_line: self.get_lines(), self.is_point_inside)
+
+    def _split_line(self, line, get_candidate_lines, is_point_inside):
+        """ split the line at its intersections with the lines of the polygon
+
+        @param get_candidate_lines: function returning the lines of the polygon (in their original
+            order) that may intersect the given line (projected onto the plane of the polygon)
+        @param is_point_inside: function checking if a point is inside of the polygon
+        """
         outer = []
         inner = []
         # project the line onto the polygon's plane
         proj_line = self.plane.get_line_projection(line)
         intersections = []
-        for pline in self.get_lines():
+        for pline in get_candidate_lines(proj_line):
             cp, d = proj_line.get_intersection(pline)
             if cp:
                 intersections.append((cp, d))
@@ -1135,8 +1109,118 @@ class Polygon(TransformableContainer):
             if p1 != p2:
                 middle = pdiv(padd(p1, p2), 2)
                 new_line = Line(get_original_point(d1), get_original_point(d2))
-                if self.is_point_inside(middle):
+                if is_point_inside(middle):
                     inner.append(new_line)
                 else:
                     outer.append(new_line)
         return (inner, outer)
+
+
+def _is_point_inside_edges(p, edges):
+    """ check if the point is inside of the area surrounded by the edges (pairs of points)
+
+    Edges not crossing the y level of the point may be omitted.
+    """
+    # see http://www.alienryderflex.com/polygon/
+    # Count the number of intersections of a ray along the x axis through
+    # all polygon lines.
+    # Odd number -> point is inside
+    intersection_count_left = 0
+    intersection_count_right = 0
+    for p1, p2 in edges:
+        # Only count intersections with lines that are partly below
+        # the y level of the point. This solves the problem of intersections
+        # through shared vertices or lines that go along the y level of the
+        # point.
+        if ((p1[1] < p[1]) and (p[1] <= p2[1])) \
+                or ((p2[1] < p[1]) and (p[1] <= p1[1])):
+            part_y = (p[1] - p1[1]) / (p2[1] - p1[1])
+            intersection_x = p1[0] + part_y * (p2[0] - p1[0])
+            if intersection_x < p[0] + epsilon:
+                # count intersections to the left
+                intersection_count_left += 1
+            if intersection_x > p[0] - epsilon:
+                # count intersections to the right
+                intersection_count_right += 1
+    # odd intersection count -> inside
+    left_odd = intersection_count_left % 2 == 1
+    right_odd = intersection_count_right % 2 == 1
+    if left_odd and right_odd:
+        # clear decision: we are inside
+        return True
+    elif not left_odd and not right_odd:
+        # clear decision: we are outside
+        return False
+    else:
+        # it seems like we are on the line -> inside
+        log.debug("polygon.is_point_inside: unclear decision")
+        return True
+
+
+class PolygonEdgeIndex:
+    """ a uniform grid of the lines of a polygon in the xy plane
+
+    Splitting a line (or checking a point) involves only the polygon lines within the grid cells
+    around the line (or the row of the point).  The results are the same as the ones of
+    "Polygon.split_line" and "Polygon.is_point_inside" - but the cost does not grow with the
+    number of lines of the polygon.
+    """
+
+    def __init__(self, polygon):
+        self.polygon = polygon
+        self._lines = polygon.get_lines()
+        self._cells_per_axis = max(1, int(math.sqrt(len(self._lines))))
+        self._origin = (polygon.minx, polygon.miny)
+        self._cell_size = (max(polygon.maxx - polygon.minx, epsilon) / self._cells_per_axis,
+                           max(polygon.maxy - polygon.miny, epsilon) / self._cells_per_axis)
+        self._cells = collections.defaultdict(list)
+        self._rows = collections.defaultdict(list)
+        for index, line in enumerate(self._lines):
+            columns = self._get_cell_range(0, line.minx - epsilon, line.maxx + epsilon)
+            for row in self._get_cell_range(1, line.miny - epsilon, line.maxy + epsilon):
+                self._rows[row].append(index)
+                for column in columns:
+                    self._cells[(column, row)].append(index)
+
+    @staticmethod
+    def is_suitable(polygon):
+        """ check if the polygon is located in a plane parallel to the xy plane """
+        return (len(polygon) > 0) and (polygon.plane.n[0] == 0) and (polygon.plane.n[1] == 0)
+
+    def _get_cell_range(self, axis, low, high):
+        """ return the indices of the columns (axis=0) or rows (axis=1) covering the interval
+
+        Values beyond the grid are assigned to the outermost cells.
+        """
+        limit = self._cells_per_axis - 1
+        first = int((low - self._origin[axis]) // self._cell_size[axis])
+        last = int((high - self._origin[axis]) // self._cell_size[axis])
+        return range(min(max(0, first), limit), min(max(0, last), limit) + 1)
+
+    def _get_candidate_lines(self, proj_line):
+        # intersections slightly beyond the ends of the line are accepted
+        margin = epsilon * (1 + proj_line.len)
+        columns = self._get_cell_range(0, proj_line.minx - margin, proj_line.maxx + margin)
+        rows = self._get_cell_range(1, proj_line.miny - margin, proj_line.maxy + margin)
+        if len(columns) * len(rows) >= len(self._lines):
+            return self._lines
+        indices = set()
+        for row in rows:
+            for column in columns:
+                indices.update(self._cells.get((column, row), ()))
+        return [self._lines[index] for index in sorted(indices)]
+
+    def is_point_inside(self, p):
+        polygon = self.polygon
+        if not polygon.is_closed:
+            return False
+        if not pis_inside(p, polygon.minx, polygon.maxx, polygon.miny, polygon.maxy,
+                          polygon.minz, polygon.maxz):
+            return False
+        edges = ((self._lines[index].p1, self._lines[index].p2)
+                 for row in self._get_cell_range(1, p[1], p[1])
+                 for index in self._rows.get(row, ()))
+        return _is_point_inside_edges(p, edges)
+
+    def split_line(self, line):
+        return self.polygon._split_line(line, self._get_candidate_lines, self.is_point_inside)
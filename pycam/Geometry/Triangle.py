@@ -23,19 +23,10 @@ from pycam.Geometry.PointUtils import padd, pcross, pdist, pdist_sq, pdiv, pdot,
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.Line import Line
 from pycam.Geometry import TransformableContainer, IDGenerator
+from pycam.Utils import get_optional_module
 import pycam.Utils.log
 
 
-try:
-    import OpenGL.GL as GL
-    import OpenGL.GLU as GLU
-    import OpenGL.GLUT as GLUT
-    from OpenGL.GLUT.fonts import GLUT_STROKE_ROMAN
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
-
-
 class Triangle(IDGenerator, TransformableContainer):
 
     __slots__ = ["id", "p1", "p2", "p3", "normal", "minx", "maxx", "miny", "maxy", "minz", "maxz",
@@ -103,8 +94,12 @@ class Triangle(IDGenerator, TransformableContainer):
         return 7
 
     def to_opengl(self, color=None, show_directions=False):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        GLU = get_optional_module("OpenGL.GLU")
+        GLUT = get_optional_module("OpenGL.GLUT")
+        if (GL is None) or (GLU is None) or (GLUT is None):
             return
+        GLUT_STROKE_ROMAN = get_optional_module("OpenGL.GLUT.fonts").GLUT_STROKE_ROMAN
         if color is not None:
             GL.glColor4f(*color)
         GL.glBegin(GL.GL_TRIANGLES)
@@ -17,13 +17,8 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-try:
-    import OpenGL.GL as GL
-    GL_enabled = True
-except ImportError:
-    GL_enabled = False
-
 from pycam.Geometry import IDGenerator
+from pycam.Utils import get_optional_module
 
 
 class Node:
@@ -111,7 +106,8 @@ class Kdtree(IDGenerator):
             return "(%s,%d:%g,%s)" % (self.lo, self.cutdim, self.cutval, self.hi)
 
     def to_opengl(self, minx, maxx, miny, maxy, minz, maxz):
-        if not GL_enabled:
+        GL = get_optional_module("OpenGL.GL")
+        if GL is None:
             return
         if self.bucket:
             GL.glBegin(GL.GL_LINES)
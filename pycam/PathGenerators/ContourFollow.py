@@ -280,7 +280,8 @@ class ContourFollow:
         args = [(follow_model, cutter, self._up_vector, t, z)
                 for t in triangles if id(t) not in self._processed_triangles]
         results_iter = run_in_parallel(_process_one_triangle, args, unordered=True,
-                                       callback=progress_counter.update)
+                                       callback=progress_counter.update,
+                                       call_site="contour_follow")
         for result, ignore_triangle_id_list in results_iter:
             if ignore_triangle_id_list:
                 self._processed_triangles.extend(ignore_triangle_id_list)
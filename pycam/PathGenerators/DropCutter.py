@@ -65,7 +65,7 @@ class DropCutter:
             xy_coords = [(pos[0], pos[1]) for pos in one_grid_line]
             args.append((xy_coords, minz, maxz, model, cutter))
         for points in run_in_parallel(_process_one_grid_line, args,
-                                      callback=progress_counter.update):
+                                      callback=progress_counter.update, call_site="drop_cutter"):
             if draw_callback and draw_callback(
                     text="DropCutter: processing line %d/%d" % (current_line + 1, num_of_lines)):
                 # cancel requested
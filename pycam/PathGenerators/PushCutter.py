@@ -124,7 +124,8 @@ class PushCutter:
         for line in layer_grid:
             p1, p2 = line
             args.append((p1, p2, models, cutter))
-        for points in run_in_parallel(_process_one_line, args, callback=progress_counter.update):
+        for points in run_in_parallel(_process_one_line, args, callback=progress_counter.update,
+                                      call_site="push_cutter"):
             if points:
                 if self.waterlines:
                     self.pa.new_scanline()
@@ -296,6 +296,8 @@ class UpdateToolView:
         self.max_fps = max_fps
         self.last_tool_position = None
         self.current_tool_position = None
+        # the calculation was interrupted - its result is incomplete
+        self.cancelled = False
 
     def update(self, text=None, percent=None, tool_position=None, toolpath=None):
         if toolpath is not None:
@@ -318,4 +320,6 @@ class UpdateToolView:
             if redraw_wanted:
                 self.core.emit_event("visual-item-updated")
         # break the loop if someone clicked the "cancel" button
-        return self.callback(text=text, percent=percent)
+        if self.callback(text=text, percent=percent):
+            self.cancelled = True
+        return self.cancelled
@@ -23,6 +23,7 @@ from io import StringIO
 
 import pycam.Plugins
 import pycam.Utils.log
+import pycam.workspace.data_models
 
 _log = pycam.Utils.log.get_logger()
 
@@ -100,12 +101,21 @@ class MemoryAnalyzer(pycam.Plugins.PluginBase):
         return True
 
     def refresh_memory_analyzer(self, widget=None):
+        self._refresh_cache_statistics()
         self.model.clear()
         self.gui.get_object("MemoryAnalyzerLoadingLabel").show()
         for objname in ("MemoryAnalyzerRefreshButton", "MemoryAnalyzerCopyButton"):
             self.gui.get_object(objname).set_sensitive(False)
         self._gobject.idle_add(self._refresh_data_in_background)
 
+    def _refresh_cache_statistics(self):
+        stats = pycam.workspace.data_models.get_cache_statistics()
+        self.gui.get_object("MemoryAnalyzerCacheLabel").set_text(
+            "Cache: {items:d} items ({size_mb:.1f} of {max_size_mb:.0f} MB), {hits:d} hits, "
+            "{misses:d} misses, {evictions:d} evictions".format(
+                size_mb=stats["size"] / 1024 ** 2, max_size_mb=stats["max_size"] / 1024 ** 2,
+                **stats))
+
     def _refresh_data_in_background(self):
         if not self._guppy:
             return
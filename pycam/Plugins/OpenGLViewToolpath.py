@@ -19,7 +19,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import pycam.Plugins
 import pycam.Gui.OpenGLTools
-from pycam.Toolpath import MOVES_LIST, MOVE_STRAIGHT_RAPID
+from pycam.Toolpath import get_arc_points, MOVES_LIST, MOVE_ARC, MOVE_STRAIGHT_RAPID
 
 
 class OpenGLViewToolpath(pycam.Plugins.PluginBase):
@@ -148,6 +148,15 @@ class OpenGLViewToolpath(pycam.Plugins.PluginBase):
                 if last_position is not None:
                     GL.glVertex3f(*last_position)
                 last_rapid = is_rapid
+            if ((step.action == MOVE_ARC) and (step.center is not None)
+                    and (last_position is not None)):
+                # circular moves are approximated by straight lines
+                arc_points = get_arc_points(last_position, step)
+                for position in arc_points[:-1]:
+                    GL.glVertex3f(*position)
+                if len(arc_points) > 1:
+                    # the direction cone is drawn on the last line
+                    last_position = arc_points[-2]
             GL.glVertex3f(*step.position)
             if show_directions and (last_position is not None):
                 transitions.append((last_position, step.position))
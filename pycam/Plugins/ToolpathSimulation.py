@@ -145,11 +145,10 @@ class ToolpathSimulation(pycam.Plugins.PluginBase):
             current = datetime.timedelta(seconds=int(self._progress.get_value()))
             complete = datetime.timedelta(seconds=int(self._progress.get_upper()))
             self._timer_widget.set_label("%s / %s" % (current, complete))
-            moves = self._toolpath.get_moves(max_time=self._duration * fraction / 60)
-            if moves:
+            moves, position = self._toolpath.get_progress(self._duration * fraction / 60)
+            if position is not None:
                 tool = self.core.get("current_tool")
                 if tool:
-                    last_position = moves[-1][1]
-                    tool.moveto(last_position)
+                    tool.moveto(position)
             self.core.set("toolpath_in_progress", moves)
             self.core.emit_event("visual-item-updated")
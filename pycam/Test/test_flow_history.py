@@ -0,0 +1,113 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import unittest
+import unittest.mock
+
+from pycam.errors import InvalidDataError
+from pycam.Flow.history import DataHistory
+from pycam.Flow.parser import CollectionsSnapshot, parse_yaml, RestoreCollectionsOnError
+from pycam.workspace.data_models import Model, Tool
+
+
+FLOW_DESCRIPTION = """
+models:
+    model1:
+        source: {type: object, data: foo}
+tools:
+    tool1: {shape: flat_bottom, diameter: 3, feed: 300}
+    tool2: {shape: ball_nose, diameter: 1, feed: 600}
+    tool3: {shape: ball_nose, diameter: 2, feed: 600}
+"""
+
+
+class TestCollectionsSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        parse_yaml(io.StringIO(FLOW_DESCRIPTION), reset=True)
+        self.tools = Tool.get_collection()
+
+    def tearDown(self):
+        parse_yaml(io.StringIO("{}"), reset=True)
+
+    def test_shared_states(self):
+        CollectionsSnapshot()
+        self.tools["tool2"].set_value("feed", 500)
+        with unittest.mock.patch.object(Tool, "get_dict", autospec=True,
+                                        side_effect=Tool.get_dict) as get_dict:
+            CollectionsSnapshot()
+        # only the state of the changed item is captured again
+        self.assertEqual([call[0][0].get_id() for call in get_dict.call_args_list], ["tool2"])
+
+    def test_restore_changed_items(self):
+        tool1, tool2 = self.tools["tool1"], self.tools["tool2"]
+        model = Model.get_collection()["model1"]
+        snapshot = CollectionsSnapshot()
+        tool2.set_value("diameter", 5)
+        tool2.set_application_value("name", "changed")
+        self.tools.remove(self.tools["tool3"])
+        Tool("tool4", {"shape": "flat_bottom", "diameter": 3})
+        snapshot.restore()
+        self.assertEqual([tool.get_id() for tool in self.tools], ["tool1", "tool2", "tool3"])
+        # unchanged items are kept - changed items are replaced
+        self.assertIs(self.tools["tool1"], tool1)
+        self.assertIs(Model.get_collection()["model1"], model)
+        self.assertIsNot(self.tools["tool2"], tool2)
+        self.assertEqual(self.tools["tool2"].get_value("diameter"), 1)
+        self.assertIsNone(self.tools["tool2"].get_application_value("name"))
+        # the captured state is not affected by later changes of the restored item
+        self.tools["tool2"].set_value("diameter", 7)
+        snapshot.restore()
+        self.assertEqual(self.tools["tool2"].get_value("diameter"), 1)
+
+    def test_restore_on_error(self):
+        with self.assertRaises(InvalidDataError):
+            with RestoreCollectionsOnError():
+                parse_yaml(io.StringIO("tools: {tool5: {shape: flat_bottom, diameter: 1}}"),
+                           reset=True)
+                raise InvalidDataError("broken")
+        self.assertEqual([tool.get_id() for tool in self.tools], ["tool1", "tool2", "tool3"])
+
+
+class TestDataHistory(unittest.TestCase):
+
+    def setUp(self):
+        parse_yaml(io.StringIO(FLOW_DESCRIPTION), reset=True)
+        self.history = DataHistory()
+
+    def tearDown(self):
+        self.history.cleanup()
+        parse_yaml(io.StringIO("{}"), reset=True)
+
+    def test_undo(self):
+        tools = Tool.get_collection()
+        tool1 = tools["tool1"]
+        tools["tool2"].set_value("feed", 500)
+        tools["tool2"].set_value("feed", 400)
+        self.assertEqual(self.history.get_undo_steps_count(), 3)
+        self.assertTrue(self.history.restore_previous_state())
+        self.assertEqual(tools["tool2"].get_value("feed"), 500)
+        self.assertTrue(self.history.restore_previous_state())
+        self.assertEqual(tools["tool2"].get_value("feed"), 600)
+        self.assertIs(tools["tool1"], tool1)
+        self.assertFalse(self.history.restore_previous_state())
+
+
+if __name__ == "__main__":
+    unittest.main()
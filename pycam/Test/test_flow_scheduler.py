@@ -0,0 +1,253 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import threading
+import time
+import unittest
+import unittest.mock
+
+import yaml
+
+from pycam.errors import InvalidDataError
+from pycam.Flow.parser import parse_yaml, update_from_yaml
+import pycam.Flow.scheduler
+from pycam.Flow.scheduler import FlowScheduler, get_affected_keys, get_dependency_graph
+from pycam.workspace import CollectionName
+from pycam.workspace.data_models import Export, Model, Tool
+
+
+FLOW_DESCRIPTION = """
+models:
+    model1:
+        source: {type: file, location: samples/Box0.stl}
+    model2:
+        source: {type: copy, original: model1}
+    outline:
+        source: {type: file, location: samples/Box0.stl}
+tools:
+    tool1: {shape: flat_bottom, diameter: 3, feed: 300}
+processes:
+    process1: {strategy: slice, step_down: 1.0, milling_style: ignore}
+    process2: {strategy: engrave, step_down: 1.0, trace_models: [model2]}
+bounds:
+    bounds1:
+        specification: margins
+        lower: [2, 2, 2]
+        upper: [2, 2, 2]
+        reference_models: [model1]
+tasks:
+    task1: {type: milling, tool: tool1, process: process1, bounds: bounds1,
+            collision_models: [model1]}
+    task2: {type: milling, tool: tool1, process: process2, bounds: bounds1}
+toolpaths:
+    toolpath1:
+        source: {type: task, item: task1}
+    toolpath2:
+        source: {type: task, item: task2}
+        transformations:
+            - {action: crop, models: [outline]}
+export_settings:
+    settings1:
+        gcode: {safety_height: 25}
+exports:
+    export1:
+        format: {type: gcode, export_settings: settings1}
+        source: {type: toolpath, items: [toolpath1]}
+        target: {type: file, location: export1.ngc}
+    export2:
+        format: {type: gcode}
+        source: {type: toolpath, items: [toolpath1, toolpath2]}
+        target: {type: file, location: export2.ngc}
+"""
+
+
+class TestFlowScheduler(unittest.TestCase):
+
+    def setUp(self):
+        parse_yaml(io.StringIO(FLOW_DESCRIPTION), reset=True)
+
+    def tearDown(self):
+        parse_yaml(io.StringIO("{}"), reset=True)
+
+    def _run_with_calculation(self, calculation, max_workers=4, items=None):
+        calculations = {name: calculation for name in pycam.Flow.scheduler.CALCULATIONS}
+        with unittest.mock.patch.dict(pycam.Flow.scheduler.CALCULATIONS, calculations):
+            FlowScheduler(max_workers=max_workers).run(items=items)
+
+    def test_dependency_graph(self):
+        graph = get_dependency_graph()
+        self.assertEqual(graph[(CollectionName.EXPORTS, "export1")].dependencies,
+                         {(CollectionName.TOOLPATHS, "toolpath1"),
+                          (CollectionName.EXPORT_SETTINGS, "settings1")})
+        self.assertEqual(graph[(CollectionName.TOOLPATHS, "toolpath2")].dependencies,
+                         {(CollectionName.TASKS, "task2"), (CollectionName.MODELS, "outline")})
+        self.assertEqual(graph[(CollectionName.TASKS, "task1")].dependencies,
+                         {(CollectionName.PROCESSES, "process1"),
+                          (CollectionName.BOUNDS, "bounds1"), (CollectionName.TOOLS, "tool1"),
+                          (CollectionName.MODELS, "model1")})
+        self.assertEqual(graph[(CollectionName.PROCESSES, "process2")].dependencies,
+                         {(CollectionName.MODELS, "model2")})
+        self.assertEqual(graph[(CollectionName.MODELS, "model2")].dependencies,
+                         {(CollectionName.MODELS, "model1")})
+        self.assertEqual(graph[(CollectionName.MODELS, "model1")].dependents,
+                         {(CollectionName.MODELS, "model2"), (CollectionName.TASKS, "task1"),
+                          (CollectionName.BOUNDS, "bounds1")})
+
+    def test_circular_dependency(self):
+        parse_yaml(io.StringIO("""
+models:
+    model1:
+        source: {type: copy, original: model2}
+    model2:
+        source: {type: copy, original: model1}
+exports:
+    export1:
+        format: {type: model, filetype: stl}
+        source: {type: model, items: [model1]}
+        target: {type: file, location: model.stl}
+"""), reset=True)
+        self.assertRaises(InvalidDataError, get_dependency_graph)
+
+    def test_calculation_order(self):
+        finished = []
+        lock = threading.Lock()
+
+        def calculate(item):
+            # every dependency needs to be finished before
+            dependencies = {(dependency.collection_name, dependency.get_id())
+                            for dependency in item.get_dependencies()
+                            if dependency.collection_name in pycam.Flow.scheduler.CALCULATIONS}
+            with lock:
+                self.assertEqual(dependencies - set(finished), set())
+            time.sleep(0.01)
+            with lock:
+                finished.append((item.collection_name, item.get_id()))
+
+        self._run_with_calculation(calculate)
+        # every item is calculated exactly once
+        self.assertEqual(len(finished), len(set(finished)))
+        self.assertEqual({item_id for collection_name, item_id in finished},
+                         {"model1", "model2", "outline", "task1", "task2", "toolpath1",
+                          "toolpath2", "export1", "export2"})
+
+    def test_concurrent_calculation(self):
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def calculate(item):
+            with lock:
+                running.append(item)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(item)
+
+        self._run_with_calculation(calculate, max_workers=2)
+        # the independent models are calculated concurrently - but the budget is respected
+        self.assertEqual(max(max_running), 2)
+
+    def test_pinned_results(self):
+        cache = pycam.workspace.data_models._cache
+
+        def calculate(item):
+            # the results of all dependencies are still available
+            for dependency in item.get_dependencies():
+                if dependency.collection_name in pycam.Flow.scheduler.CALCULATIONS:
+                    self.assertEqual(cache.get(hash(dependency), "result"), dependency.get_id())
+            cache.add(hash(item), "result", item.get_id())
+
+        # every new result exceeds the memory budget of the cache
+        with unittest.mock.patch.object(cache, "max_size", 1):
+            self._run_with_calculation(calculate)
+        self.assertEqual(cache._pinned, {})
+
+    def test_failure(self):
+        calculated = []
+
+        def calculate(item):
+            if item.get_id() == "task1":
+                raise InvalidDataError("broken task")
+            calculated.append(item.get_id())
+
+        with self.assertRaises(InvalidDataError):
+            self._run_with_calculation(calculate, max_workers=1)
+        # items depending on the failed item are not calculated
+        self.assertNotIn("toolpath1", calculated)
+        self.assertNotIn("export1", calculated)
+
+
+class TestFlowUpdate(unittest.TestCase):
+
+    def setUp(self):
+        parse_yaml(io.StringIO(FLOW_DESCRIPTION), reset=True)
+
+    def tearDown(self):
+        parse_yaml(io.StringIO("{}"), reset=True)
+
+    def _update(self, original, replacement):
+        description = FLOW_DESCRIPTION.replace(original, replacement)
+        self.assertNotEqual(description, FLOW_DESCRIPTION)
+        old_graph = get_dependency_graph()
+        changed = update_from_yaml([io.StringIO(description)])
+        new_graph = get_dependency_graph()
+        affected = get_affected_keys(old_graph, changed) | get_affected_keys(new_graph, changed)
+        return changed, {key[1] for key in affected if key[0] == CollectionName.EXPORTS}
+
+    def test_unchanged(self):
+        model = Model.get_collection()["model1"]
+        self.assertEqual(update_from_yaml([io.StringIO(FLOW_DESCRIPTION)]), set())
+        # unchanged items (including their cached results) are kept
+        self.assertIs(Model.get_collection()["model1"], model)
+
+    def test_changed_item(self):
+        tool = Tool.get_collection()["tool1"]
+        changed, exports = self._update("diameter: 3", "diameter: 4")
+        self.assertEqual(changed, {(CollectionName.TOOLS, "tool1")})
+        self.assertEqual(exports, {"export1", "export2"})
+        self.assertIsNot(Tool.get_collection()["tool1"], tool)
+        self.assertEqual(Tool.get_collection()["tool1"].get_value("diameter"), 4)
+
+    def test_partially_affected(self):
+        changed, exports = self._update("{action: crop, models: [outline]}",
+                                        "{action: crop, models: [model1]}")
+        self.assertEqual(changed, {(CollectionName.TOOLPATHS, "toolpath2")})
+        self.assertEqual(exports, {"export2"})
+        # a removed item affects its former dependents
+        changed, exports = self._update("""
+    outline:
+        source: {type: file, location: samples/Box0.stl}""", "")
+        self.assertIn((CollectionName.MODELS, "outline"), changed)
+        self.assertEqual(exports, {"export2"})
+
+    def test_removed_export(self):
+        changed, exports = self._update("export1.ngc", "export3.ngc")
+        self.assertEqual(exports, {"export1"})
+        update_from_yaml([io.StringIO("{}")])
+        self.assertEqual(len(Export.get_collection()), 0)
+        self.assertEqual(len(Model.get_collection()), 0)
+
+    def test_invalid_description(self):
+        model = Model.get_collection()["model1"]
+        with self.assertRaises(yaml.YAMLError):
+            update_from_yaml([io.StringIO(FLOW_DESCRIPTION.replace("diameter: 3", "diameter: ["))])
+        self.assertIs(Model.get_collection()["model1"], model)
+
+
+if __name__ == "__main__":
+    unittest.main()
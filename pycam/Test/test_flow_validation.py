@@ -0,0 +1,117 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import unittest
+import unittest.mock
+
+from pycam.errors import InvalidDataError, InvalidKeyError
+from pycam.Flow.parser import parse_yaml, validate_collections
+from pycam.workspace.data_models import Model, Task, Toolpath
+
+
+FLOW_DESCRIPTION = """
+models:
+    model1:
+        source: {type: file, location: samples/Box0.stl}
+        transformations:
+            - {action: scale, scale_target: factor, axes: [2, 2, 1]}
+    outline:
+        source: {type: file, location: samples/Box0.stl}
+tools:
+    tool1: {shape: flat_bottom, diameter: 3, feed: 300}
+processes:
+    process1: {strategy: slice, path_pattern: grid, overlap: 0.1, step_down: 1.0,
+               grid_direction: x, milling_style: ignore}
+bounds:
+    bounds1:
+        specification: margins
+        lower: [2, 2, 2]
+        upper: [2, 2, 2]
+        reference_models: [model1]
+tasks:
+    task1: {type: milling, tool: tool1, process: process1, bounds: bounds1,
+            collision_models: [model1]}
+toolpaths:
+    toolpath1:
+        source: {type: task, item: task1}
+        transformations:
+            - {action: crop, models: [outline]}
+export_settings:
+    settings1:
+        gcode: {safety_height: 25}
+exports:
+    export1:
+        format: {type: gcode, export_settings: settings1}
+        source: {type: toolpath, items: [toolpath1]}
+        target: {type: file, location: export1.ngc}
+"""
+
+
+class TestFlowValidation(unittest.TestCase):
+
+    def tearDown(self):
+        parse_yaml(io.StringIO("{}"), reset=True)
+
+    def _validate(self, original="", replacement=""):
+        description = FLOW_DESCRIPTION.replace(original, replacement)
+        parse_yaml(io.StringIO(description), reset=True)
+        validate_collections()
+
+    def test_valid_flow(self):
+        # nothing is calculated during the validation
+        with unittest.mock.patch.object(Model, "get_model") as get_model, \
+                unittest.mock.patch.object(Task, "generate_toolpath") as generate_toolpath, \
+                unittest.mock.patch.object(Toolpath, "get_toolpath") as get_toolpath:
+            self._validate()
+        self.assertFalse(get_model.called)
+        self.assertFalse(generate_toolpath.called)
+        self.assertFalse(get_toolpath.called)
+
+    def test_missing_reference(self):
+        for original, replacement in (("tool: tool1", "tool: tool2"),
+                                      ("reference_models: [model1]", "reference_models: [foo]"),
+                                      ("models: [outline]", "models: [model1, foo]"),
+                                      ("export_settings: settings1", "export_settings: foo"),
+                                      ("item: task1", "item: foo")):
+            with self.subTest(reference=replacement):
+                self.assertRaises(InvalidDataError, self._validate, original, replacement)
+
+    def test_invalid_enum(self):
+        for original, replacement in (("shape: flat_bottom", "shape: foo"),
+                                      ("grid_direction: x", "grid_direction: foo"),
+                                      ("action: crop", "action: foo"),
+                                      ("type: gcode", "type: foo")):
+            with self.subTest(value=replacement):
+                self.assertRaises(InvalidKeyError, self._validate, original, replacement)
+
+    def test_invalid_range(self):
+        for original, replacement in (("diameter: 3", "diameter: 0"),
+                                      ("overlap: 0.1", "overlap: 1"),
+                                      ("step_down: 1.0", "step_down: -1")):
+            with self.subTest(value=replacement):
+                self.assertRaises(InvalidDataError, self._validate, original, replacement)
+
+    def test_incompatible_export(self):
+        # GCode requires toolpaths
+        self.assertRaises(InvalidDataError, self._validate, "{type: toolpath, items: [toolpath1]}",
+                          "{type: model, items: [model1]}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import unittest
+
+from pycam.Exporters.GCodeExporter import GCodeGenerator
+
+
+class TestGCodeGenerator(unittest.TestCase):
+
+    def _get_lines(self, generator):
+        return generator.destination.getvalue().splitlines()
+
+    def test_rounding(self):
+        # values near half a step are rounded like the previous "%.Nf" formatting
+        generator = GCodeGenerator(io.StringIO(), minimum_steps=[0.1, 0.01, 0.01], header=[])
+        generator.add_move((0.15, 2.675, -4.245))
+        generator.add_move((-0.04, 2.69, -4.23))
+        generator.add_move((0.25, 2.685, -4.255))
+        self.assertEqual(self._get_lines(generator),
+                         ["G21 (metric)", "G1 X0.1 Y2.67 Z-4.25", " X-0.0 Y2.69 Z-4.23",
+                          " X0.2 Z-4.25"])
+
+    def test_arc(self):
+        generator = GCodeGenerator(io.StringIO(), minimum_steps=[0.001], header=[])
+        # the start of the first arc is unknown - it is replaced with a straight move
+        generator.add_arc((10, 0, 1), (0, 0, 1), "xy", False)
+        generator.add_arc((-10, 0, 1), (0, 0, 1), "xy", False)
+        generator.add_move((-10, -5, 1))
+        generator.add_arc((-10, -5, 5), (-10, -5, 3), "yz", True)
+        generator.add_move((-10, -5, 6))
+        self.assertEqual(self._get_lines(generator),
+                         ["G21 (metric)", "G1 X10.000 Y0.000 Z1.000", "G17 (select XY plane)",
+                          "G3 X-10.000 I-10.000 J0.000", "G1 Y-5.000", "G19 (select YZ plane)",
+                          "G2 Z5.000 J0.000 K2.000", "G1 Z6.000"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import pycam
+
+
+# maximum time (in seconds) for importing the command line interface
+CLI_IMPORT_TIME_BUDGET = 0.5
+# wall-clock measurements depend on the machine - they are checked only on request
+MEASURE_IMPORT_TIME = bool(os.environ.get("PYCAM_TEST_IMPORT_TIME"))
+# these modules are expensive and not required for running a processing flow
+EXPENSIVE_MODULES = ("gi", "OpenGL", "subprocess", "urllib.request", "pycam.Plugins")
+
+_MEASURE_IMPORT_CODE = """
+import json, sys, time
+start_time = time.perf_counter()
+import pycam.run_cli
+duration = time.perf_counter() - start_time
+import pycam
+print(json.dumps({"duration": duration, "modules": sorted(sys.modules),
+                  "resolved_versions": pycam.get_version.cache_info().currsize}))
+"""
+
+
+def _measure_cli_import():
+    """ import the command line interface in a fresh interpreter """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(pycam.__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (base_dir, env.get("PYTHONPATH"))))
+    output = subprocess.check_output([sys.executable, "-c", _MEASURE_IMPORT_CODE], env=env,
+                                     cwd=base_dir, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode("utf-8").splitlines()[-1])
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_cli_import_avoids_expensive_modules(self):
+        result = _measure_cli_import()
+        self.assertEqual(result["resolved_versions"], 0)
+        self.assertEqual([name for name in EXPENSIVE_MODULES if name in result["modules"]], [])
+
+    @unittest.skipUnless(MEASURE_IMPORT_TIME, "set PYCAM_TEST_IMPORT_TIME=1 to measure")
+    def test_cli_import_time_budget(self):
+        # use the fastest of a few runs - this reduces the influence of other processes
+        duration = min(_measure_cli_import()["duration"] for _ in range(3))
+        self.assertLess(duration, CLI_IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import unittest.mock
+
+from pycam.Geometry import Box3D, Point3D
+from pycam.Geometry.Matrix import (get_rotation_matrix_axis_angle, get_transformed_box,
+                                   multiply_affine_matrices)
+from pycam.Geometry.Model import Model
+from pycam.Geometry.PointUtils import ptransform_by_matrix
+from pycam.Geometry.Triangle import Triangle
+import pycam.Test
+from pycam.workspace.data_models import get_transformed_model, ModelTransformation
+
+
+def _get_model():
+    model = Model()
+    model.append(Triangle((0, 0, 0), (2, 0, 0), (0, 1, 0)))
+    model.append(Triangle((0, 0, 1), (2, 0, 1), (0, 1, 3)))
+    return model
+
+
+def _get_points(model):
+    return [point for triangle in model.triangles() for point in triangle.get_points()]
+
+
+class TestAffineMatrices(pycam.Test.PycamTestCase):
+
+    def test_multiply(self):
+        shift = ((1, 0, 0, 1), (0, 1, 0, 2), (0, 0, 1, 3))
+        rotation = get_rotation_matrix_axis_angle((0, 0, 1), 90, use_radians=False)
+        combined = multiply_affine_matrices(shift, rotation)
+        for point in ((0, 0, 0), (1, -2, 5), (0.5, 3, -1)):
+            self.assert_vector_equal(
+                ptransform_by_matrix(point, combined),
+                ptransform_by_matrix(ptransform_by_matrix(point, shift), rotation))
+
+    def test_transformed_box(self):
+        box = Box3D(Point3D(0, 0, 0), Point3D(1, 2, 3))
+        matrix = ((2, 0, 0, 1), (0, -1, 0, 0), (0, 0, 1, -3))
+        self.assertEqual(get_transformed_box(box, matrix),
+                         Box3D(Point3D(1, -2, -3), Point3D(3, 0, 0)))
+
+
+class TestModelTransformations(pycam.Test.PycamTestCase):
+
+    TRANSFORMATIONS = (
+        {"action": "scale", "scale_target": "factor", "axes": {"x": 1.25}},
+        {"action": "scale", "scale_target": "size", "axes": {"x": 10}},
+        {"action": "shift", "shift_target": "align_max", "axes": {"z": 0}},
+        {"action": "rotate", "center": [10, 10, 0], "vector": [0, 0, 1], "angle": 30},
+        {"action": "shift", "shift_target": "align_min", "axes": [10, 20, 0]},
+        {"action": "shift", "shift_target": "center", "axes": {"x": 50}},
+        {"action": "multiply_matrix", "matrix": [[1, 0, 0], [0, 1, 0], [0, 0, -1]]},
+    )
+
+    def test_combined_transformations(self):
+        transformations = [ModelTransformation(data) for data in self.TRANSFORMATIONS]
+        expected = _get_model()
+        for transformation in transformations:
+            # apply each transformation separately
+            expected = get_transformed_model(expected, [transformation])
+        original = _get_model()
+        with unittest.mock.patch.object(Model, "copy", autospec=True,
+                                        side_effect=Model.copy) as copy:
+            result = get_transformed_model(original, transformations)
+        # one copy before the rotation (followed by "align_min") and one at the end
+        self.assertEqual(copy.call_count, 2)
+        for point1, point2 in zip(_get_points(result), _get_points(expected)):
+            self.assert_vector_equal(point1, point2)
+        self.assert_vector_equal((result.minx, result.miny, result.minz),
+                                 (expected.minx, expected.miny, expected.minz))
+        # the original model is not changed
+        self.assert_vector_equal(_get_points(original)[1], (2, 0, 0))
+
+    def test_axis_aligned_transformations(self):
+        transformations = [ModelTransformation(data) for data in self.TRANSFORMATIONS[:3]]
+        with unittest.mock.patch.object(Model, "copy", autospec=True,
+                                        side_effect=Model.copy) as copy:
+            result = get_transformed_model(_get_model(), transformations)
+        self.assertEqual(copy.call_count, 1)
+        self.assert_vector_equal((result.minx, result.maxx, result.maxz), (0, 10, 0))
+
+    def test_rotate(self):
+        model = _get_model()
+        with unittest.mock.patch.object(model, "reset_cache",
+                                        wraps=model.reset_cache) as reset_cache:
+            model.rotate((1, 1, 0), (0, 0, 1), 90)
+        # a single pass over the model
+        self.assertEqual(reset_cache.call_count, 1)
+        self.assert_vector_equal(_get_points(model)[1], (2, 2, 0))
+
+
+if __name__ == "__main__":
+    pycam.Test.main()
@@ -0,0 +1,138 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from pycam.Flow.parser import parse_yaml
+from pycam.Geometry.Model import Model
+from pycam.Geometry.Triangle import Triangle
+import pycam.workspace.data_models
+from pycam.workspace.data_models import Task, Tool
+from pycam.workspace.persistent_cache import (get_content_key, PersistentCache,
+                                              set_toolpath_cache_directory)
+
+
+FLOW_DESCRIPTION = """
+models:
+    model1:
+        source: {type: file, location: samples/Box0.stl}
+tools:
+    tool1: {shape: flat_bottom, diameter: 3, feed: 300}
+processes:
+    process1: {strategy: slice, path_pattern: grid, overlap: 0.1, step_down: 1.0,
+               grid_direction: x, milling_style: ignore}
+bounds:
+    bounds1:
+        specification: absolute
+        lower: {x: -5, y: -5, z: 0}
+        upper: {x: 5, y: 5, z: 1}
+tasks:
+    task1: {type: milling, tool: tool1, process: process1, bounds: bounds1,
+            collision_models: [model1]}
+"""
+
+
+class TestPersistentCache(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.cache = PersistentCache(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_store_and_retrieve(self):
+        key = get_content_key({"foo": [1, 2.5]})
+        self.assertRaises(KeyError, self.cache.get, key)
+        self.cache.set(key, [(0, (1.0, 2.0, 3.0))])
+        self.assertEqual(self.cache.get(key), [(0, (1.0, 2.0, 3.0))])
+        # a new instance uses the same files
+        self.assertEqual(PersistentCache(self._directory.name).get(key), [(0, (1.0, 2.0, 3.0))])
+
+    def test_invalid_file(self):
+        key = get_content_key("foo")
+        self.cache.set(key, "bar")
+        with open(self.cache._get_filename(key), "wb") as cache_file:
+            cache_file.write(b"broken")
+        self.assertRaises(KeyError, self.cache.get, key)
+
+    def test_content_key(self):
+        self.assertEqual(get_content_key({"a": 1, "b": [2, 3]}),
+                         get_content_key({"b": [2, 3], "a": 1}))
+        self.assertNotEqual(get_content_key({"a": 1}), get_content_key({"a": 1.5}))
+
+    def test_model_digest(self):
+        model = Model()
+        model.append(Triangle((0, 0, 0), (1, 0, 0), (0, 1, 0)))
+        self.assertEqual(model.get_content_digest(), model.copy().get_content_digest())
+        moved = model.copy()
+        moved.shift(0, 0, 1)
+        self.assertNotEqual(model.get_content_digest(), moved.get_content_digest())
+
+
+class TestToolpathCache(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        set_toolpath_cache_directory(self._directory.name)
+        parse_yaml(io.StringIO(FLOW_DESCRIPTION), reset=True)
+
+    def tearDown(self):
+        set_toolpath_cache_directory(None)
+        parse_yaml(io.StringIO("{}"), reset=True)
+        self._directory.cleanup()
+
+    def _generate_toolpath(self):
+        # discard the in-memory cache - similar to a new run of the program
+        pycam.workspace.data_models._cache.clear()
+        with unittest.mock.patch.object(Task, "_calculate_moves",
+                                        wraps=Task.get_collection()["task1"]._calculate_moves,
+                                        autospec=False) as calculation:
+            toolpath = Task.get_collection()["task1"].generate_toolpath()
+        return toolpath, calculation.called
+
+    def test_reuse_result(self):
+        toolpath, calculated = self._generate_toolpath()
+        self.assertTrue(calculated)
+        self.assertTrue(toolpath.path)
+        self.assertEqual(len(os.listdir(self._directory.name)), 1)
+        cached_toolpath, calculated = self._generate_toolpath()
+        self.assertFalse(calculated)
+        self.assertEqual(cached_toolpath.path, toolpath.path)
+        # machine settings of the tool do not influence the moves
+        Tool.get_collection()["tool1"].set_value("feed", 500)
+        cached_toolpath, calculated = self._generate_toolpath()
+        self.assertFalse(calculated)
+        self.assertEqual(cached_toolpath.path, toolpath.path)
+        # the size of the tool is relevant
+        Tool.get_collection()["tool1"].set_value("diameter", 4)
+        self.assertTrue(self._generate_toolpath()[1])
+
+    def test_cancelled_calculation(self):
+        pycam.workspace.data_models._cache.clear()
+        with unittest.mock.patch.object(Task, "_calculate_moves", return_value=None):
+            self.assertIsNone(Task.get_collection()["task1"].generate_toolpath())
+        # the incomplete result is not stored
+        self.assertEqual(os.listdir(self._directory.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
-from pycam.Geometry.Polygon import Polygon
+import math
+import random
+
+from pycam.Geometry.Polygon import Polygon, PolygonEdgeIndex
 from pycam.Geometry.Line import Line
 
 
@@ -106,3 +109,40 @@ def test_get_offset_polygons_truncated_square_inside_small_offset():
         print(str(p))
     assert(len(output_p) == 1)
     assert_polygons_are_identical(output_p[0], expected_inside_p)
+
+
+def _get_star_polygon(corners):
+    star = Polygon()
+    points = []
+    for index in range(2 * corners):
+        radius = 10 if index % 2 == 0 else 4
+        angle = math.pi * index / corners
+        points.append((radius * math.cos(angle), radius * math.sin(angle), 0))
+    for index, point in enumerate(points):
+        star.append(Line(point, points[(index + 1) % len(points)]))
+    return star
+
+
+def test_edge_index_split_line():
+    star = _get_star_polygon(50)
+    index = PolygonEdgeIndex(star)
+    generator = random.Random(42)
+    for _ in range(200):
+        line = Line(tuple(generator.uniform(-12, 12) for _ in range(2)) + (0, ),
+                    tuple(generator.uniform(-12, 12) for _ in range(2)) + (0, ))
+        expected = star.split_line(line)
+        result = index.split_line(line)
+        for expected_lines, result_lines in zip(expected, result):
+            assert [(one_line.p1, one_line.p2) for one_line in expected_lines] \
+                == [(one_line.p1, one_line.p2) for one_line in result_lines]
+    # points on the polygon and on its boundary box
+    for point in [(10, 0, 0), (0, -10 * math.sin(math.pi / 2), 0), (3, 3, 0), (-9.9, 0, 0)]:
+        assert index.is_point_inside(point) == star.is_point_inside(point)
+
+
+def test_edge_index_candidates():
+    star = _get_star_polygon(50)
+    index = PolygonEdgeIndex(star)
+    # a short move far away from the center touches only a few lines
+    short_line = Line((9.5, 0.1, 0), (9.7, 0.2, 0))
+    assert len(index._get_candidate_lines(short_line)) < len(star.get_lines()) / 10
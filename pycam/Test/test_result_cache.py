@@ -0,0 +1,143 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import unittest.mock
+
+from pycam.Geometry.Model import Model
+from pycam.Geometry.Triangle import Triangle
+import pycam.Toolpath
+import pycam.Toolpath.Filters
+from pycam.Toolpath.Steps import MoveStraight
+import pycam.workspace.data_models
+from pycam.workspace.data_models import Boundary, ResultCache, Tool
+
+
+def _get_toolpath(length):
+    return pycam.Toolpath.Toolpath(toolpath_path=[MoveStraight((index, 0, 0))
+                                                  for index in range(length)])
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_least_recently_used(self):
+        toolpath_size = pycam.workspace.data_models._estimate_size(_get_toolpath(10))
+        cache = ResultCache(max_size=2 * toolpath_size)
+        cache.add("owner1", "key1", _get_toolpath(10))
+        cache.add("owner1", "key2", _get_toolpath(10))
+        # mark "key1" as recently used
+        cache.get("owner1", "key1")
+        cache.add("owner2", "key1", _get_toolpath(10))
+        self.assertRaises(KeyError, cache.get, "owner1", "key2")
+        cache.get("owner1", "key1")
+        cache.get("owner2", "key1")
+        self.assertEqual(cache.size, 2 * toolpath_size)
+        stats = cache.get_statistics()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (3, 1, 1))
+
+    def test_oversized_item(self):
+        cache = ResultCache(max_size=1)
+        cache.add("owner", "small", 1)
+        cache.add("owner", "big", _get_toolpath(100))
+        # the new item is kept, even though it exceeds the budget
+        self.assertEqual(len(cache.get("owner", "big").path), 100)
+        self.assertRaises(KeyError, cache.get, "owner", "small")
+
+    def test_owner_limit(self):
+        cache = ResultCache()
+        for index in range(5):
+            cache.add("owner1", index, index, max_owner_items=3)
+            cache.add("owner2", index, index)
+        self.assertEqual(cache.get_statistics()["items"], 8)
+        self.assertRaises(KeyError, cache.get, "owner1", 1)
+        self.assertEqual(cache.get("owner1", 2), 2)
+        self.assertEqual(cache.get("owner2", 0), 0)
+
+    def test_release(self):
+        cache = ResultCache()
+        cache.add("owner1", "key", 1)
+        cache.add("owner2", "key", 2)
+        cache.release("owner1")
+        self.assertRaises(KeyError, cache.get, "owner1", "key")
+        self.assertEqual(cache.get("owner2", "key"), 2)
+        self.assertEqual(cache.size, pycam.workspace.data_models._estimate_size(2))
+
+    def test_pinned_owner(self):
+        cache = ResultCache(max_size=1)
+        cache.pin("owner1")
+        cache.add("owner1", "key", _get_toolpath(10))
+        cache.add("owner2", "key", _get_toolpath(10))
+        cache.add("owner2", "other", _get_toolpath(10))
+        # only the items of the unpinned owner are evicted
+        self.assertEqual(len(cache.get("owner1", "key").path), 10)
+        self.assertRaises(KeyError, cache.get, "owner2", "key")
+        cache.unpin("owner1")
+        cache.add("owner2", "key", _get_toolpath(10))
+        self.assertRaises(KeyError, cache.get, "owner1", "key")
+
+    def test_release_deleted_collection_item(self):
+        collection = Boundary.get_collection()
+        collection.clear()
+        boundary = Boundary("bounds1", {"specification": "absolute", "lower": [0, 0, 0],
+                                        "upper": [1, 1, 1]})
+        boundary.get_absolute_limits()
+        owner = hash(boundary)
+        self.assertIn(owner, pycam.workspace.data_models._cache._owner_keys)
+        collection.remove(boundary)
+        self.assertNotIn(owner, pycam.workspace.data_models._cache._owner_keys)
+
+
+class TestCacheKeys(unittest.TestCase):
+
+    def test_toolpath_revision(self):
+        toolpath = _get_toolpath(10)
+        original_hash = hash(toolpath)
+        self.assertEqual(hash(toolpath.copy()), original_hash)
+        toolpath.path = toolpath.path[:-1]
+        self.assertNotEqual(hash(toolpath), original_hash)
+        toolpath.filters = [pycam.Toolpath.Filters.SafetyHeight(5)]
+        self.assertNotEqual(hash(toolpath), original_hash)
+
+    def test_data_container_hash(self):
+        Tool.get_collection().clear()
+        tool = Tool("tool1", {"shape": "flat_bottom", "diameter": 3})
+        original_hash = tool.get_content_hash()
+        with unittest.mock.patch.object(tool, "get_dict", wraps=tool.get_dict) as get_dict:
+            self.assertEqual(tool.get_content_hash(), original_hash)
+            self.assertFalse(get_dict.called)
+        tool.set_value("diameter", 4)
+        self.assertNotEqual(tool.get_content_hash(), original_hash)
+        tool.set_value("diameter", 3)
+        self.assertEqual(tool.get_content_hash(), original_hash)
+        Tool.get_collection().clear()
+
+    def test_model_digest(self):
+        model = Model()
+        model.append(Triangle((0, 0, 0), (1, 0, 0), (0, 1, 0)))
+        original_digest = model.get_content_digest()
+        with unittest.mock.patch.object(model, "_calculate_content_digest") as calculate:
+            self.assertEqual(model.get_content_digest(), original_digest)
+            self.assertFalse(calculate.called)
+        model.shift(1, 0, 0)
+        self.assertNotEqual(model.get_content_digest(), original_digest)
+        shifted_digest = model.get_content_digest()
+        model.append(Triangle((0, 0, 1), (1, 0, 1), (0, 1, 1)))
+        self.assertNotEqual(model.get_content_digest(), shifted_digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,399 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+import unittest
+import unittest.mock
+
+from pycam.errors import AbortOperationException, CommunicationError, InvalidKeyError
+from pycam.run_worker import AutoScaler
+from pycam.Utils.remote import TaskClient, TaskServer, TaskServerThread, TaskWorker, run_worker
+import pycam.Utils.threading
+from pycam.Utils.threading import (AdaptiveTaskChunker, ExecutorBackend, ProcessDataCache,
+                                   ProcessDataCacheItemID, ProcessExecutor, RemoteExecutor,
+                                   SerialExecutor, ThreadExecutor)
+
+
+def _sum_with_cached_item(args):
+    data, offset = args
+    return sum(data) + offset
+
+
+def _square(value):
+    return value * value
+
+
+def _slow_square(value):
+    time.sleep(0.2)
+    return value * value
+
+
+_slow_task_lock = threading.Lock()
+_slow_task_calls = []
+
+
+def _slow_on_first_call(args):
+    """ the first call of task zero blocks for a while - all other calls return immediately """
+    task_index, = args
+    with _slow_task_lock:
+        is_first_call = (task_index == 0) and not _slow_task_calls
+        if task_index == 0:
+            _slow_task_calls.append(task_index)
+    if is_first_call:
+        time.sleep(3)
+    return task_index
+
+
+class TestAdaptiveTaskChunker(unittest.TestCase):
+
+    def _collect_chunks(self, chunker):
+        chunks = []
+        while not chunker.is_finished():
+            chunks.append(chunker.get_next_chunk())
+        return chunks
+
+    def test_initial_chunks_are_single_tasks(self):
+        chunker = AdaptiveTaskChunker(range(100), 4)
+        self.assertEqual(chunker.get_next_chunk(), (0, [0]))
+        self.assertEqual(chunker.get_next_chunk(), (1, [1]))
+
+    def test_cheap_tasks_are_grouped(self):
+        chunker = AdaptiveTaskChunker(range(1000), 2, target_chunk_duration=0.1,
+                                      max_chunk_size=50)
+        chunker.add_measurement(10, 0.01)
+        start_index, chunk = chunker.get_next_chunk()
+        self.assertEqual(start_index, 0)
+        self.assertEqual(len(chunk), 50)
+
+    def test_expensive_tasks_are_not_grouped(self):
+        chunker = AdaptiveTaskChunker(range(1000), 2, target_chunk_duration=0.1)
+        chunker.add_measurement(2, 4.0)
+        self.assertEqual(len(chunker.get_next_chunk()[1]), 1)
+
+    def test_tail_chunks_shrink(self):
+        chunker = AdaptiveTaskChunker(range(100), 4, max_chunk_size=1000)
+        chunker.add_measurement(1, 0.0)
+        chunk_sizes = [len(chunk) for start_index, chunk in self._collect_chunks(chunker)]
+        self.assertEqual(sum(chunk_sizes), 100)
+        self.assertEqual(chunk_sizes, sorted(chunk_sizes, reverse=True))
+        self.assertEqual(chunk_sizes[-1], 1)
+
+    def test_all_tasks_are_covered_in_order(self):
+        chunker = AdaptiveTaskChunker(range(37), 3)
+        chunker.add_measurement(5, 0.001)
+        collected = []
+        for start_index, chunk in self._collect_chunks(chunker):
+            self.assertEqual(start_index, len(collected))
+            collected.extend(chunk)
+        self.assertEqual(collected, list(range(37)))
+        self.assertIsNone(chunker.get_next_chunk())
+
+
+class TestExecutors(unittest.TestCase):
+
+    def tearDown(self):
+        pycam.Utils.threading.reset_executor_backends()
+        pycam.Utils.threading.cleanup()
+
+    def _check_executor(self, executor):
+        try:
+            self.assertEqual(list(executor.run(_square, range(50))),
+                             [value * value for value in range(50)])
+            self.assertEqual(sorted(executor.run(_square, range(50), unordered=True)),
+                             [value * value for value in range(50)])
+            # the executor can be used again after an interrupted run
+            results = executor.run(_square, range(50))
+            self.assertEqual(next(results), 0)
+            results.close()
+            self.assertEqual(list(executor.run(_square, range(3))), [0, 1, 4])
+        finally:
+            executor.shutdown()
+
+    def _check_shutdown_during_run(self, executor):
+        failures = []
+
+        def consume_results():
+            try:
+                list(executor.run(_slow_square, range(20)))
+            except AbortOperationException as exc:
+                failures.append(exc)
+
+        consumer = threading.Thread(target=consume_results, daemon=True)
+        consumer.start()
+        time.sleep(0.3)
+        # e.g. a reconfiguration of the executor backends during a calculation
+        executor.shutdown()
+        # the run is aborted instead of waiting for the cancelled chunks forever
+        consumer.join(timeout=10)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(len(failures), 1)
+        executor.shutdown()
+
+    def test_serial_executor(self):
+        self._check_executor(SerialExecutor())
+
+    def test_thread_executor(self):
+        self._check_executor(ThreadExecutor(3))
+        self._check_shutdown_during_run(ThreadExecutor(2))
+
+    def test_process_executor(self):
+        self._check_executor(ProcessExecutor(multiprocessing, 2))
+        self._check_shutdown_during_run(ProcessExecutor(multiprocessing, 2))
+
+    def test_remote_executor_cancelled_during_submission(self):
+        task_client = unittest.mock.Mock()
+        calls = []
+
+        def callback():
+            calls.append(None)
+            return len(calls) > 3
+
+        results = RemoteExecutor(task_client).run(_square, [(value, ) for value in range(200)],
+                                                  callback=callback)
+        self.assertEqual(list(results), [])
+        # the remaining tasks are neither prepared nor submitted
+        self.assertEqual(len(calls), 4)
+        self.assertFalse(task_client.submit_tasks.called)
+        task_client.finish_job.assert_called_once()
+
+    def test_backend_by_call_site(self):
+        pycam.Utils.threading.set_executor_backend("thread", call_site="push_cutter")
+        pycam.Utils.threading.set_executor_backend(ExecutorBackend.SERIAL)
+        self.assertIsInstance(pycam.Utils.threading.get_executor(call_site="push_cutter"),
+                              ThreadExecutor)
+        self.assertIsInstance(pycam.Utils.threading.get_executor(call_site="drop_cutter"),
+                              SerialExecutor)
+        self.assertIsInstance(pycam.Utils.threading.get_executor(backend="thread"),
+                              ThreadExecutor)
+        self.assertEqual(list(pycam.Utils.threading.run_in_parallel(
+            _square, [1, 2, 3], call_site="push_cutter")), [1, 4, 9])
+
+    def test_parse_backend_setting(self):
+        parse = pycam.Utils.threading.parse_executor_backend_setting
+        self.assertEqual(parse("thread"), (None, ExecutorBackend.THREAD))
+        self.assertEqual(parse("drop_cutter=process"), ("drop_cutter", ExecutorBackend.PROCESS))
+        self.assertRaises(InvalidKeyError, parse, "fibers")
+
+
+class TestAutoScaler(unittest.TestCase):
+
+    def test_scale_up_for_waiting_tasks(self):
+        scaler = AutoScaler(1, 4)
+        self.assertEqual(scaler.get_wanted_count(1, 2, now=0), 3)
+        self.assertEqual(scaler.get_wanted_count(3, 20, now=1), 4)
+
+    def test_scale_down_after_idle_delay(self):
+        scaler = AutoScaler(1, 4, scale_down_delay=10)
+        self.assertEqual(scaler.get_wanted_count(3, 5, now=100), 4)
+        self.assertEqual(scaler.get_wanted_count(4, 0, now=105), 4)
+        self.assertEqual(scaler.get_wanted_count(4, 0, now=110), 3)
+        self.assertEqual(scaler.get_wanted_count(3, 0, now=115), 3)
+        self.assertEqual(scaler.get_wanted_count(3, 0, now=120), 2)
+        self.assertEqual(scaler.get_wanted_count(1, 0, now=200), 1)
+
+
+class TestProcessDataCache(unittest.TestCase):
+
+    def test_least_recently_used_item_is_evicted(self):
+        cache = ProcessDataCache(max_size=30)
+        cache.add("a", "A", size=10)
+        cache.add("b", "B", size=10)
+        cache.add("c", "C", size=10)
+        self.assertEqual(cache.get("a"), "A")
+        cache.add("d", "D", size=10)
+        self.assertFalse(cache.contains("b"))
+        self.assertTrue(cache.contains("a"))
+        self.assertEqual(cache.size, 30)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_pinned_items_are_kept(self):
+        cache = ProcessDataCache(max_size=20)
+        cache.add(ProcessDataCacheItemID("a"), "A", size=10)
+        cache.pin("a")
+        cache.add("b", "B", size=10)
+        cache.add("c", "C", size=10)
+        self.assertTrue(cache.contains("a"))
+        self.assertFalse(cache.contains("b"))
+        # the budget may be exceeded by pinned items
+        cache.pin("c")
+        cache.add("d", "D", size=10)
+        self.assertEqual(cache.size, 30)
+        cache.unpin("a")
+        self.assertFalse(cache.contains("a"))
+        self.assertEqual(cache.size, 20)
+
+    def test_statistics(self):
+        cache = ProcessDataCache()
+        cache.add("a", list(range(100)))
+        self.assertGreater(cache.size, 100)
+        cache.get("a")
+        self.assertRaises(KeyError, cache.get, "b")
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["hits"], 1)
+        self.assertEqual(statistics["misses"], 1)
+        self.assertEqual(statistics["items"], 1)
+
+
+class TestTaskProtocol(unittest.TestCase):
+
+    AUTH_KEY = b"secret"
+
+    def setUp(self):
+        self.server = TaskServerThread(("localhost", 0), self.AUTH_KEY)
+        self.server.start()
+        port = self.server.server.get_port()
+        self.address = ("localhost", port)
+        self.workers = []
+        for index in range(2):
+            worker = threading.Thread(target=run_worker,
+                                      args=(self.address, self.AUTH_KEY, "worker%d" % index),
+                                      daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        self.client = TaskClient(self.address, self.AUTH_KEY)
+        self.client.connect()
+
+    def tearDown(self):
+        self.client.stop()
+        self.server.stop()
+        for worker in self.workers:
+            worker.join(timeout=5)
+
+    def test_job_results(self):
+        job_id = "job1"
+        self.client.register_job(job_id)
+        items = {}
+        self.client.prepare_cache_item(job_id, "data", [1, 2, 3], items)
+        tasks = [(index, [ProcessDataCacheItemID("data"), index]) for index in range(20)]
+        self.client.submit_tasks(job_id, _sum_with_cached_item, tasks[:10], items)
+        self.client.submit_tasks(job_id, _sum_with_cached_item, tasks[10:], {})
+        results = {}
+        while len(results) < len(tasks):
+            for task_id, result, error in self.client.get_results(job_id, timeout=5):
+                self.assertIsNone(error)
+                results[task_id] = result
+        self.client.finish_job(job_id)
+        self.assertEqual(results, {index: 6 + index for index in range(20)})
+
+    def test_evicted_items_are_requested_again(self):
+        self.server.server.cache.max_size = 0
+        for job_id in ("job1", "job2"):
+            self.client.register_job(job_id)
+            items = {}
+            self.client.prepare_cache_item(job_id, "data", [1, 2], items)
+            self.client.submit_tasks(job_id, _sum_with_cached_item,
+                                     [(0, [ProcessDataCacheItemID("data"), 0])], items)
+            results = []
+            while not results:
+                results = self.client.get_results(job_id, timeout=5)
+            self.assertEqual(results, [(0, 3, None)])
+            self.client.finish_job(job_id)
+
+    def test_wrong_auth_key(self):
+        client = TaskClient(self.address, b"wrong")
+        try:
+            self.assertRaises(CommunicationError, client.connect)
+        finally:
+            client.stop()
+
+
+class TestStragglerHandling(unittest.TestCase):
+
+    def setUp(self):
+        del _slow_task_calls[:]
+        self.threads = []
+
+    def _start_server(self, **kwargs):
+        self.server = TaskServerThread(("localhost", 0), b"")
+        self.server.server = TaskServer(b"", **kwargs)
+        self.server.start()
+        self.address = ("localhost", self.server.server.get_port())
+
+    def _start_worker(self, name, **kwargs):
+        worker = TaskWorker(self.address, b"", name, **kwargs)
+        thread = threading.Thread(target=asyncio.run, args=(worker.run(), ), daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _run_job(self, task_count):
+        client = TaskClient(self.address, b"")
+        client.connect()
+        try:
+            client.register_job("job")
+            client.submit_tasks("job", _slow_on_first_call,
+                                [(index, [index]) for index in range(task_count)], {})
+            results = set()
+            while len(results) < task_count:
+                for task_id, result, error in client.get_results("job", timeout=5):
+                    self.assertIsNone(error)
+                    results.add(result)
+            client.finish_job("job")
+        finally:
+            client.stop()
+        return results
+
+    def tearDown(self):
+        self.server.stop()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def test_speculative_execution(self):
+        self._start_server(min_speculation_age=0.3)
+        self._start_worker("first")
+        # the first connected worker receives the slow task
+        time.sleep(0.2)
+        self._start_worker("second")
+        start_time = time.time()
+        self.assertEqual(self._run_job(8), set(range(8)))
+        self.assertLess(time.time() - start_time, 2)
+        self.assertEqual(len(_slow_task_calls), 2)
+
+    def test_missing_heartbeat(self):
+        self._start_server(heartbeat_timeout=0.5, min_speculation_age=60)
+        self._start_worker("silent", heartbeat_interval=60)
+        time.sleep(0.2)
+        self._start_worker("alive", heartbeat_interval=0.1)
+        start_time = time.time()
+        self.assertEqual(self._run_job(4), set(range(4)))
+        self.assertLess(time.time() - start_time, 2.5)
+
+    def test_results_are_sent_while_tasks_are_running(self):
+        self._start_server(min_speculation_age=60)
+        self._start_worker("single")
+        client = TaskClient(self.address, b"")
+        client.connect()
+        try:
+            client.register_job("job")
+            start_time = time.time()
+            # both tasks are handed out at once - the second one is slow
+            client.submit_tasks("job", _slow_on_first_call, [(0, [1]), (1, [0])], {})
+            results = []
+            while not results:
+                results = client.get_results("job", timeout=5)
+            # the result of the first task does not wait for the second task
+            self.assertLess(time.time() - start_time, 1.5)
+            self.assertEqual(results, [(0, 1, None)])
+            client.finish_job("job")
+        finally:
+            client.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import itertools
+import math
+import sys
+import unittest
+import unittest.mock
+
+from pycam.Exporters.GCode.LinuxCNC import LinuxCNC
+from pycam.Geometry.PointUtils import pdist
+import pycam.Toolpath
+import pycam.Toolpath.Filters as Filters
+from pycam.Toolpath.Steps import (Comment, CompactPath, MachineSetting, MoveArc, MoveSafety,
+                                  MoveStraight, MoveStraightRapid)
+
+
+STEPS = [Comment("start"), MoveStraight((0, 0, 0)), MoveStraight((0, 0, -1)),
+         MoveStraight((2, 0, -1)), MoveSafety(), MoveStraight((5, 5, -1)),
+         MoveStraight((5, 6, -1))]
+
+
+def _get_filters():
+    return [Filters.MachineSetting("feedrate", 200), Filters.SelectTool(1),
+            Filters.SpindleSpeed(1000), Filters.TriggerSpindle(0),
+            Filters.StepWidth({"x": 0.001, "y": 0.001, "z": 0.001}),
+            Filters.SafetyHeight(5), Filters.PlungeFeedrate(50)]
+
+
+class TestFilterPipeline(unittest.TestCase):
+
+    def test_single_filters(self):
+        self.assertEqual(STEPS | Filters.MachineSetting("feedrate", 200),
+                         [MachineSetting("feedrate", 200)] + STEPS)
+        self.assertEqual(STEPS | Filters.SelectTool(3),
+                         STEPS[:1] + [MachineSetting("select_tool", 3)] + STEPS[1:])
+        self.assertEqual([] | Filters.SelectTool(3), [MachineSetting("select_tool", 3)])
+        self.assertEqual(STEPS | Filters.MovesOnly(), [step for step in STEPS[1:]
+                                                       if step.position is not None])
+
+    def test_step_width(self):
+        step_width = Filters.StepWidth({"x": 0.01, "y": 0.01, "z": 0.5})
+        moves = [MoveStraight((0, 0, 0)), MoveStraight((0.004, 0.003, 0.2)),
+                 MoveStraight((0.022, 0.003, 0.2)), MoveStraight((0.023, 0.03, 0.7)),
+                 Comment("pause"), MoveStraight((0.024, 0.03, 0.7))]
+        self.assertEqual(moves | step_width,
+                         [MoveStraight((0, 0, 0)), MoveStraight([0.022, 0, 0]),
+                          MoveStraight([0.022, 0.03, 0.7]), Comment("pause"),
+                          MoveStraight((0.024, 0.03, 0.7))])
+
+    def test_step_width_rounding(self):
+        # values near half a step are rounded like the previous "%.Nf" formatting
+        self.assertEqual(Filters._get_unit_count(0.15, 10), 1)
+        self.assertEqual(Filters._get_unit_count(2.675, 100), 267)
+        self.assertEqual(Filters._get_unit_count(-4.245, 100), -425)
+        step_width = Filters.StepWidth({"x": 0.1, "y": 0.01, "z": 0.01})
+        moves = [MoveStraight((0.3, 2.69, -4.23)), MoveStraight((0.15, 2.675, -4.245))]
+        self.assertEqual([tuple(move.position) for move in moves | step_width],
+                         [move.position for move in moves])
+
+    def test_simplify(self):
+        # a noisy straight line followed by a corner
+        moves = [MoveStraight((index, 0.001 * (index % 2), 0)) for index in range(11)]
+        moves.append(MoveStraight((10, 5, 0)))
+        self.assertEqual(moves | Filters.Simplify(0.01),
+                         [moves[0], moves[10], MoveStraight((10, 5, 0))])
+        # the deviation exceeds the tolerance
+        self.assertEqual(len(moves | Filters.Simplify(0.0001)), len(moves))
+        # other steps interrupt the simplification
+        interrupted = moves[:5] + [MoveSafety()] + moves[5:]
+        self.assertEqual(interrupted | Filters.Simplify(0.01),
+                         [moves[0], moves[4], MoveSafety(), moves[5], moves[10], moves[11]])
+
+    def test_simplify_window(self):
+        moves = [MoveStraight((index, 0, 0)) for index in range(1001)]
+        simplified = moves | Filters.Simplify(0.01)
+        self.assertEqual(simplified[-1], moves[-1])
+        self.assertLessEqual(len(simplified), 2 + 1000 // Filters.Simplify.WINDOW_SIZE)
+
+    def test_simplify_toolpath(self):
+        points = [(0, 0, 0), (1, 0, 0), (2, 0, 0), (3, 0, 0), (3, 1, 0), (3, 2, 0), (4, 2, 0)]
+        pycam.Toolpath.simplify_toolpath(points)
+        self.assertEqual(points, [(0, 0, 0), (3, 0, 0), (3, 2, 0), (4, 2, 0)])
+
+    def test_fused_chain(self):
+        # the fused chain delivers the same result as the separate application of all filters
+        expected = list(STEPS)
+        for one_filter in sorted(_get_filters()):
+            expected = expected | one_filter
+        self.assertEqual(list(Filters.iter_filtered_moves(STEPS, _get_filters())), expected)
+        self.assertEqual(Filters.get_filtered_moves(STEPS, reversed(_get_filters())), expected)
+
+    def test_streaming(self):
+        consumed = []
+
+        def get_endless_moves():
+            for index in itertools.count():
+                consumed.append(index)
+                yield MoveStraight((index, index % 2, -1))
+
+        streaming_filters = [one_filter for one_filter in _get_filters()
+                             if one_filter.STREAMING]
+        self.assertGreater(len(streaming_filters), 3)
+        steps = Filters.iter_filtered_moves(get_endless_moves(), streaming_filters)
+        first_steps = list(itertools.islice(steps, 20))
+        self.assertEqual(first_steps[0], MachineSetting("feedrate", 200))
+        # only a few steps of the source were requested
+        self.assertLess(len(consumed), 20)
+
+
+class TestFilterStageCache(unittest.TestCase):
+
+    def _get_basic_moves(self, toolpath, filters):
+        with unittest.mock.patch.object(Filters.StepWidth, "iter_filtered_steps",
+                                        autospec=True,
+                                        side_effect=Filters.StepWidth.iter_filtered_steps) as calc:
+            moves = toolpath.get_basic_moves(filters=filters)
+        return moves, calc.call_count
+
+    def test_changed_last_stage(self):
+        toolpath = pycam.Toolpath.Toolpath(
+            toolpath_path=STEPS,
+            toolpath_filters=[Filters.StepWidth({"x": 0.001, "y": 0.001, "z": 0.001})])
+        moves, calculations = self._get_basic_moves(toolpath, [Filters.SafetyHeight(5)])
+        self.assertEqual(calculations, 1)
+        self.assertEqual(moves, CompactPath(
+            STEPS | Filters.StepWidth({"x": 0.001, "y": 0.001, "z": 0.001})
+            | Filters.SafetyHeight(5)))
+        # only the last stage is calculated again
+        moves, calculations = self._get_basic_moves(toolpath, [Filters.SafetyHeight(7)])
+        self.assertEqual(calculations, 0)
+        self.assertEqual(moves[1], MoveStraightRapid((0, 0, 7)))
+        # a cached result is returned without any calculation
+        with unittest.mock.patch.object(Filters.SafetyHeight, "iter_filtered_steps") as calc:
+            toolpath.get_basic_moves(filters=[Filters.SafetyHeight(5)])
+            self.assertFalse(calc.called)
+        # a changed first stage requires the calculation of all stages
+        toolpath.filters = [Filters.StepWidth({"x": 0.1, "y": 0.1, "z": 0.1})]
+        self.assertEqual(self._get_basic_moves(toolpath, [Filters.SafetyHeight(5)])[1], 1)
+
+    def test_cheap_stages_are_not_stored(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS)
+        filters = [Filters.MachineSetting("feedrate", 200), Filters.SafetyHeight(5),
+                   Filters.MovesOnly()]
+        self.assertEqual(toolpath.get_basic_moves(filters=filters),
+                         CompactPath(STEPS | filters[0] | filters[1] | filters[2]))
+        # only the final result is kept
+        self.assertEqual(len(toolpath._cache_filter_stages), 1)
+
+    def test_bounded_size(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS * 10)
+        for height in range(20):
+            moves = toolpath.get_basic_moves(filters=[Filters.SafetyHeight(height)])
+            cached_size = sum(sys.getsizeof(cached)
+                              for cached in toolpath._cache_filter_stages.values())
+            self.assertLessEqual(cached_size, (pycam.Toolpath.FILTER_STAGES_CACHE_RATIO
+                                               * sys.getsizeof(toolpath.path)))
+            # the current result is always available
+            self.assertIs(toolpath.get_basic_moves(filters=[Filters.SafetyHeight(height)]),
+                          moves)
+
+
+def _get_half_circle(get_position, count=40):
+    return [MoveStraight(get_position(10 * math.cos(index * math.pi / count),
+                                      10 * math.sin(index * math.pi / count)))
+            for index in range(count + 1)]
+
+
+class TestFitArcs(unittest.TestCase):
+
+    def _assert_positions_equal(self, first, second):
+        for value1, value2 in zip(first, second):
+            self.assertAlmostEqual(value1, value2)
+
+    def test_xy_arc(self):
+        moves = _get_half_circle(lambda a, b: (a, b, 1)) + [MoveStraight((-10, -5, 1))]
+        result = moves | Filters.FitArcs(0.01)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0], moves[0])
+        arc = result[1]
+        self.assertEqual((arc.action, arc.plane, arc.clockwise),
+                         (pycam.Toolpath.MOVE_ARC, "xy", False))
+        self._assert_positions_equal(arc.position, (-10, 0, 1))
+        self._assert_positions_equal(arc.center, (0, 0, 1))
+        self.assertEqual(result[2], moves[-1])
+        # the arc is kept by the compact storage of toolpaths
+        self.assertEqual(list(CompactPath(result)), result)
+
+    def test_xz_arc(self):
+        result = _get_half_circle(lambda a, b: (a, 3, b)) | Filters.FitArcs(0.01)
+        self.assertEqual(len(result), 2)
+        self.assertEqual((result[1].plane, result[1].clockwise), ("xz", True))
+
+    def test_tolerance(self):
+        # a coarse polygon deviates too much from its circle
+        moves = _get_half_circle(lambda a, b: (a, b, 0), count=6)
+        self.assertEqual(moves | Filters.FitArcs(0.01), moves)
+        self.assertEqual(len(moves | Filters.FitArcs(1)), 2)
+        # straight lines are not turned into arcs
+        line = [MoveStraight((index, 2 * index, 0)) for index in range(10)]
+        self.assertEqual(line | Filters.FitArcs(0.01), line)
+
+    def test_machine_time(self):
+        # one and a half turns
+        moves = [MoveStraight((10 * math.cos(index * math.pi / 40),
+                               10 * math.sin(index * math.pi / 40), 0)) for index in range(121)]
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=moves)
+        self.assertLess(toolpath.get_machine_time(), 30 * math.pi - 0.01)
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=moves,
+                                           toolpath_filters=[Filters.FitArcs(0.01)])
+        self.assertLess(len(toolpath.get_basic_moves()), 10)
+        self.assertAlmostEqual(toolpath.get_machine_time(), 30 * math.pi)
+        # the simulated machine follows the arcs
+        for max_time, expected in ((5 * math.pi, (0, 10, 0)), (15 * math.pi, (0, -10, 0)),
+                                   (25 * math.pi, (0, 10, 0))):
+            position = toolpath.get_progress(max_time)[1]
+            self.assertLess(pdist(position, expected), 0.05)
+
+    def test_limits(self):
+        for clockwise, lower, upper in ((False, (-10, 0, 1), (10, 10, 1)),
+                                        (True, (-10, -10, 1), (10, 0, 1))):
+            toolpath = pycam.Toolpath.Toolpath(toolpath_path=[
+                MoveStraight((10, 0, 1)), MoveArc((-10, 0, 1), (0, 0, 1), "xy", clockwise)])
+            self._assert_positions_equal((toolpath.minx, toolpath.miny, toolpath.minz), lower)
+            self._assert_positions_equal((toolpath.maxx, toolpath.maxy, toolpath.maxz), upper)
+        # a quarter of a circle in the yz plane
+        path = CompactPath([MoveStraight((0, 0, 5)), MoveArc((0, 5, 0), (0, 0, 0), "yz", True)])
+        self.assertEqual(path.get_limits(), ((0, 0, 0), (0, 5, 5)))
+
+    def test_gcode(self):
+        destination = io.StringIO()
+        generator = LinuxCNC(destination)
+        generator.add_moves([MoveStraight((10, 0, 1)),
+                             MoveArc((-10, 0, 1), (0, 0, 1), "xy", False),
+                             MoveStraight((-10, -5, 1)),
+                             MoveArc((-10, -5, 5), (-10, -5, 3), "yz", True)])
+        lines = destination.getvalue().splitlines()[-5:]
+        self.assertEqual(lines, ["G17\t; select XY plane",
+                                 "G3 X-10.000000 I-10.000000 J0.000000",
+                                 "G1 Y-5.000000",
+                                 "G19\t; select YZ plane",
+                                 "G2 Z5.000000 J0.000000 K2.000000"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import pickle
+import sys
+import unittest
+
+import pycam.Toolpath
+from pycam.Toolpath.Filters import TimeLimit
+from pycam.Toolpath.Steps import (Comment, CompactPath, MachineSetting, MoveSafety, MoveStraight,
+                                  MoveStraightRapid)
+
+
+STEPS = [Comment("start"), MachineSetting("feedrate", 100), MoveStraightRapid((0, 0, 5)),
+         MoveStraight((3, 4, 5)), MoveSafety(), MachineSetting("feedrate", 50),
+         MoveStraight((3, 4, -1))]
+
+
+class TestCompactPath(unittest.TestCase):
+
+    def test_sequence(self):
+        path = CompactPath(STEPS)
+        self.assertEqual(len(path), len(STEPS))
+        self.assertEqual(list(path), STEPS)
+        self.assertEqual([path[index] for index in range(len(STEPS))], STEPS)
+        self.assertEqual(path[-1].position, (3, 4, -1))
+        self.assertEqual(path, STEPS)
+        self.assertEqual(path, CompactPath(tuple(STEPS)))
+        self.assertNotEqual(path, STEPS[:-1])
+        self.assertRaises(IndexError, path.__getitem__, len(STEPS))
+
+    def test_slice(self):
+        path = CompactPath(STEPS)
+        self.assertIsInstance(path[2:], CompactPath)
+        self.assertEqual(list(path[1:-1]), STEPS[1:-1])
+        self.assertEqual(list(path[::2]), STEPS[::2])
+        self.assertEqual(list(path[5:2]), [])
+        self.assertEqual(list(path[:4] + path[4:]), STEPS)
+        self.assertEqual(list(path[:4] + STEPS[4:]), STEPS)
+
+    def test_columns(self):
+        path = CompactPath(STEPS)
+        self.assertEqual(path.get_other_steps(), {0: STEPS[0], 1: STEPS[1], 5: STEPS[5]})
+        self.assertEqual(path.get_limits(), ((0, 0, -1), (3, 4, 5)))
+        self.assertIsNone(CompactPath(STEPS[:2]).get_limits())
+        self.assertEqual(pickle.loads(pickle.dumps(path)), path)
+
+    def test_size(self):
+        moves = [MoveStraight((index, 0, 0)) for index in range(1000)]
+        self.assertLess(sys.getsizeof(CompactPath(moves)), 30 * len(moves))
+
+
+class TestToolpathStorage(unittest.TestCase):
+
+    def test_limits(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS)
+        self.assertEqual((toolpath.minx, toolpath.miny, toolpath.minz), (0, 0, -1))
+        self.assertEqual((toolpath.maxx, toolpath.maxy, toolpath.maxz), (3, 4, 5))
+        self.assertRaises(ValueError, lambda: pycam.Toolpath.Toolpath().minx)
+
+    def test_distance_and_time(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS)
+        # the safety move does not change the position
+        self.assertEqual(toolpath.get_machine_move_distance_and_time(),
+                         (5 + 6, 5 / 100 + 6 / 50))
+
+
+class TestTimeIndex(unittest.TestCase):
+
+    def test_time_limit(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS)
+        total_time = toolpath.get_machine_time()
+        for step_index in range(1, 25):
+            max_time = step_index * total_time / 20
+            expected = CompactPath(toolpath.get_basic_moves() | TimeLimit(max_time))
+            moves, position = toolpath.get_progress(max_time)
+            self.assertEqual([step.action for step in moves], [step.action for step in expected])
+            for step, expected_step in zip(moves, expected):
+                for value, wanted in zip(step.position, expected_step.position):
+                    self.assertAlmostEqual(value, wanted)
+            self.assertEqual(position, moves[-1].position)
+            self.assertEqual(toolpath.get_moves(max_time=max_time), moves)
+
+    def test_interpolation(self):
+        toolpath = pycam.Toolpath.Toolpath(toolpath_path=STEPS)
+        # the move to (3, 4, 5) takes 0.05 minutes
+        moves, position = toolpath.get_progress(0.02)
+        self.assertEqual(len(moves), 2)
+        for value, wanted in zip(position, (1.2, 1.6, 5)):
+            self.assertAlmostEqual(value, wanted)
+        self.assertEqual(toolpath.get_progress(100)[0], toolpath.get_basic_moves()
+                         | pycam.Toolpath.Filters.MovesOnly())
+        # the machine starts at the first move
+        self.assertEqual(toolpath.get_progress(0), (STEPS[2:3], (0, 0, 5)))
+        self.assertEqual(pycam.Toolpath.Toolpath().get_progress(1), ([], None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,12 +19,15 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 
 import collections
-import decimal
+import fractions
+import math
 
 from pycam.Geometry import epsilon
 from pycam.Geometry.Line import Line
-from pycam.Geometry.PointUtils import padd, psub, pmul, pdist, pnear, ptransform_by_matrix
-from pycam.Toolpath import MOVE_SAFETY, MOVES_LIST, MACHINE_SETTING
+from pycam.Geometry.PointUtils import padd, psub, pmul, pdist, pdot, pnear, ptransform_by_matrix
+from pycam.Geometry.Polygon import PolygonEdgeIndex
+from pycam.Toolpath import (ARC_PLANES, MACHINE_SETTING, MOVE_ARC, MOVE_SAFETY, MOVE_STRAIGHT,
+                            MOVE_STRAIGHT_RAPID, MOVES_LIST)
 import pycam.Toolpath.Steps as ToolpathSteps
 import pycam.Utils.log
 
@@ -63,19 +66,35 @@ def toolpath_filter(our_category, key):
     return toolpath_filter_inner
 
 
+def iter_filtered_moves(moves, filters):
+    """ apply the filters (sorted by their weight) to the moves in a single pass
+
+    The streaming filters are chained: every step passes through all of them before the next
+    step is requested from the source.  Only filters requiring the complete toolpath (see
+    "BaseFilter.STREAMING") collect the steps they receive.
+    @returns: an iterator of the resulting steps
+    """
+    steps = iter(moves)
+    for one_filter in sorted(filters):
+        _log.debug("Applying toolpath filter: %s", one_filter.__class__)
+        steps = one_filter.iter_filtered_steps(steps)
+    return steps
+
+
 def get_filtered_moves(moves, filters):
-    filters = list(filters)
-    moves = list(moves)
-    filters.sort()
-    for one_filter in filters:
-        moves |= one_filter
-    return moves
+    return list(iter_filtered_moves(moves, filters))
 
 
 class BaseFilter:
 
     PARAMS = []
     WEIGHT = 50
+    # streaming filters process one step after the other (with a bounded look-ahead) via
+    # "iter_filtered_steps" - other filters need the complete toolpath ("filter_toolpath")
+    STREAMING = False
+    # the results of expensive filters are kept by "Toolpath.get_basic_moves" - cheap filters
+    # are applied again whenever they are needed
+    EXPENSIVE = False
 
     def __init__(self, *args, **kwargs):
         # we want to achieve a stable order in order to be hashable
@@ -100,13 +119,24 @@ class BaseFilter:
     def __hash__(self):
         return hash((str(self.__class__), tuple(self.settings.items())))
 
+    def get_cache_key(self):
+        """ return a value identifying the filter and its settings (e.g. for caching results) """
+        try:
+            return hash(self)
+        except TypeError:
+            # some settings are not hashable (e.g. the step widths of "StepWidth")
+            return repr(self)
+
     def __ror__(self, toolpath):
         # allow to use pycam.Toolpath.Toolpath instances (instead of a list)
         if hasattr(toolpath, "path") and hasattr(toolpath, "filters"):
             toolpath = toolpath.path
-        # use a copy of the list -> changes will be permitted
         _log.debug("Applying toolpath filter: %s", self.__class__)
-        return self.filter_toolpath(list(toolpath))
+        if self.STREAMING:
+            return self.filter_toolpath(toolpath)
+        else:
+            # use a copy of the list -> changes will be permitted
+            return self.filter_toolpath(list(toolpath))
 
     def __repr__(self):
         class_name = str(self.__class__).split("'")[1].split(".")[-1]
@@ -124,22 +154,31 @@ class BaseFilter:
         return ", ".join(["%s=%s" % (key, self.settings[key]) for key in self.settings])
 
     def filter_toolpath(self, toolpath):
+        if self.STREAMING:
+            return list(self.iter_filtered_steps(toolpath))
         raise NotImplementedError(("The filter class %s failed to implement the 'filter_toolpath' "
                                    "method") % str(type(self)))
 
+    def iter_filtered_steps(self, steps):
+        """ generate the filtered steps for an iterable of steps """
+        if self.STREAMING:
+            raise NotImplementedError(("The filter class %s failed to implement the "
+                                       "'iter_filtered_steps' method") % str(type(self)))
+        yield from self.filter_toolpath(list(steps))
+
 
 class SafetyHeight(BaseFilter):
 
     PARAMS = ("safety_height", )
     WEIGHT = 80
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
+    def iter_filtered_steps(self, steps):
         last_pos = None
         max_height = None
-        new_path = []
         safety_pending = False
         get_safe = lambda pos: tuple((pos[0], pos[1], self.settings["safety_height"]))
-        for step in toolpath:
+        for step in steps:
             if step.action == MOVE_SAFETY:
                 safety_pending = True
             elif step.action in MOVES_LIST:
@@ -149,7 +188,7 @@ class SafetyHeight(BaseFilter):
                 if not last_pos:
                     # there was a safety move (or no move at all) before
                     # -> move sideways
-                    new_path.append(ToolpathSteps.MoveStraightRapid(get_safe(new_pos)))
+                    yield ToolpathSteps.MoveStraightRapid(get_safe(new_pos))
                 elif safety_pending:
                     safety_pending = False
                     if pnear(last_pos, new_pos, axes=(0, 1)):
@@ -157,39 +196,45 @@ class SafetyHeight(BaseFilter):
                         pass
                     else:
                         # go up, sideways and down
-                        new_path.append(ToolpathSteps.MoveStraightRapid(get_safe(last_pos)))
-                        new_path.append(ToolpathSteps.MoveStraightRapid(get_safe(new_pos)))
+                        yield ToolpathSteps.MoveStraightRapid(get_safe(last_pos))
+                        yield ToolpathSteps.MoveStraightRapid(get_safe(new_pos))
                 else:
                     # we are in the middle of usual moves -> keep going
                     pass
-                new_path.append(step)
+                yield step
                 last_pos = new_pos
             else:
                 # unknown move -> keep it
-                new_path.append(step)
+                yield step
         # process pending safety moves
         if safety_pending and last_pos:
-            new_path.append(ToolpathSteps.MoveStraightRapid(get_safe(last_pos)))
-        if max_height > self.settings["safety_height"]:
+            yield ToolpathSteps.MoveStraightRapid(get_safe(last_pos))
+        if (max_height is not None) and (max_height > self.settings["safety_height"]):
             _log.warn("Toolpath exceeds safety height: %f => %f",
                       max_height, self.settings["safety_height"])
-        return new_path
 
 
 class MachineSetting(BaseFilter):
 
     PARAMS = ("key", "value")
     WEIGHT = 20
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        result = []
+    def iter_filtered_steps(self, steps):
+        steps = iter(steps)
+        first_other_step = None
         # move all previous machine settings
-        while toolpath and toolpath[0].action == MACHINE_SETTING:
-            result.append(toolpath.pop(0))
+        for step in steps:
+            if step.action != MACHINE_SETTING:
+                first_other_step = step
+                break
+            yield step
         # add the new setting
         for key, value in self._get_settings():
-            result.append(ToolpathSteps.MachineSetting(key, value))
-        return result + toolpath
+            yield ToolpathSteps.MachineSetting(key, value)
+        if first_other_step is not None:
+            yield first_other_step
+            yield from steps
 
     def _get_settings(self):
         return [(self.settings["key"], self.settings["value"])]
@@ -218,15 +263,21 @@ class SelectTool(BaseFilter):
 
     PARAMS = ("tool_id", )
     WEIGHT = 35
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        index = 0
+    def iter_filtered_steps(self, steps):
+        steps = iter(steps)
+        tool_selection = ToolpathSteps.MachineSetting("select_tool", self.settings["tool_id"])
         # skip all non-moves
-        while (index < len(toolpath)) and (toolpath[index][0] not in MOVES_LIST):
-            index += 1
-        toolpath.insert(index, ToolpathSteps.MachineSetting("select_tool",
-                                                            self.settings["tool_id"]))
-        return toolpath
+        for step in steps:
+            if step.action in MOVES_LIST:
+                yield tool_selection
+                yield step
+                yield from steps
+                return
+            yield step
+        # there are no moves
+        yield tool_selection
 
 
 class TriggerSpindle(BaseFilter):
@@ -312,13 +363,13 @@ class PlungeFeedrate(BaseFilter):
     PARAMS = ("plunge_feedrate", )
     # must be greater than the weight of the SafetyHeight filter
     WEIGHT = 82
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        new_path = []
+    def iter_filtered_steps(self, steps):
         last_pos = None
         original_feedrate = None
         current_feedrate = None
-        for step in toolpath:
+        for step in steps:
             if (step.action == MACHINE_SETTING) and (step.key == "feedrate"):
                 # store the current feedrate
                 original_feedrate = step.value
@@ -335,52 +386,241 @@ class PlungeFeedrate(BaseFilter):
                     max_feedrate = min(original_feedrate, max_feedrate)
                     if current_feedrate != max_feedrate:
                         # we are too slow or too fast
-                        new_path.append(ToolpathSteps.MachineSetting("feedrate", max_feedrate))
+                        yield ToolpathSteps.MachineSetting("feedrate", max_feedrate)
                         current_feedrate = max_feedrate
                 else:
                     # we do not move down
                     if current_feedrate != original_feedrate:
                         # switch back to the maximum feedrate
-                        new_path.append(ToolpathSteps.MachineSetting("feedrate",
-                                                                     original_feedrate))
+                        yield ToolpathSteps.MachineSetting("feedrate", original_feedrate)
                         current_feedrate = original_feedrate
                 last_pos = step.position
             else:
                 pass
-            new_path.append(step)
-        return new_path
+            yield step
+
+
+class Simplify(BaseFilter):
+    """ merge consecutive straight moves along a (nearly) straight line
+
+    A sequence of moves is replaced by its last move, if none of the skipped positions deviates
+    from the resulting line by more than the given tolerance.  At most WINDOW_SIZE moves are
+    merged - thus the cost grows linearly with the length of the toolpath.
+    """
+
+    PARAMS = ("tolerance", )
+    # after "StepWidth" and before "SafetyHeight" resolves the safety moves
+    WEIGHT = 70
+    STREAMING = True
+    EXPENSIVE = True
+    WINDOW_SIZE = 64
+
+    def iter_filtered_steps(self, steps):
+        tolerance = self.settings["tolerance"]
+        # the position of the last emitted move
+        anchor = None
+        # the moves following the anchor - only the last one will be emitted
+        pending = []
+        for step in steps:
+            if step.action in (MOVE_STRAIGHT, MOVE_STRAIGHT_RAPID):
+                if anchor is None:
+                    yield step
+                    anchor = step.position
+                    continue
+                if pending and ((step.action != pending[0].action)
+                                or (len(pending) >= self.WINDOW_SIZE)
+                                or any(_get_distance_to_segment(other.position, anchor,
+                                                                step.position) > tolerance
+                                       for other in pending)):
+                    yield pending[-1]
+                    anchor = pending[-1].position
+                    pending = []
+                pending.append(step)
+            else:
+                if pending:
+                    yield pending[-1]
+                    anchor = pending[-1].position
+                    pending = []
+                if step.action == MOVE_SAFETY:
+                    # the position after a safety move is not known yet
+                    anchor = None
+                elif step.action == MOVE_ARC:
+                    anchor = step.position
+                yield step
+        if pending:
+            yield pending[-1]
+
+
+class FitArcs(BaseFilter):
+    """ replace sequences of straight moves with circular arcs
+
+    The arcs are located in the xy, xz or yz plane.  Neither the positions of the replaced moves
+    nor the straight lines between them deviate from the arc by more than the given tolerance.
+    At least MIN_MOVES and at most WINDOW_SIZE moves are replaced by a single arc.
+    """
+
+    PARAMS = ("tolerance", )
+    # after all other filters changing the position of moves (e.g. "Crop")
+    WEIGHT = 92
+    STREAMING = True
+    EXPENSIVE = True
+    MIN_MOVES = 3
+    WINDOW_SIZE = 64
+
+    def iter_filtered_steps(self, steps):
+        tolerance = self.settings["tolerance"]
+        # the position of the last emitted move
+        anchor = None
+        # the straight moves following the anchor
+        pending = []
+        # the arc from the anchor through all pending moves (or None)
+        pending_arc = None
+        for step in steps:
+            if (step.action == MOVE_STRAIGHT) and (anchor is not None):
+                pending.append(step)
+                if len(pending) < self.MIN_MOVES:
+                    continue
+                if len(pending) <= self.WINDOW_SIZE:
+                    arc = _fit_arc(anchor, [move.position for move in pending], tolerance)
+                else:
+                    arc = None
+                if arc is not None:
+                    pending_arc = arc
+                elif pending_arc is not None:
+                    # the previous moves form an arc - the new move starts the next one
+                    yield ToolpathSteps.MoveArc(pending[-2].position, *pending_arc)
+                    anchor = pending[-2].position
+                    pending = [step]
+                    pending_arc = None
+                else:
+                    # the first pending move is not part of an arc
+                    yield pending[0]
+                    anchor = pending[0].position
+                    pending = pending[1:]
+                    if len(pending) >= self.MIN_MOVES:
+                        pending_arc = _fit_arc(anchor, [move.position for move in pending],
+                                               tolerance)
+            else:
+                if pending_arc is not None:
+                    yield ToolpathSteps.MoveArc(pending[-1].position, *pending_arc)
+                else:
+                    yield from pending
+                pending = []
+                pending_arc = None
+                if step.action in MOVES_LIST:
+                    anchor = step.position
+                elif step.action == MOVE_SAFETY:
+                    # the position after a safety move is not known yet
+                    anchor = None
+                yield step
+        if pending_arc is not None:
+            yield ToolpathSteps.MoveArc(pending[-1].position, *pending_arc)
+        else:
+            yield from pending
+
+
+def _fit_arc(start, positions, tolerance):
+    """ find a circular arc starting at "start" and passing all positions (within the tolerance)
+
+    The arc is defined by its start, the middle position and the last position.
+    @returns: tuple of center, plane and direction (clockwise) or None (if no arc fits)
+    """
+    end = positions[-1]
+    middle = positions[len(positions) // 2]
+    for plane, (first, second, normal) in ARC_PLANES.items():
+        if any(abs(position[normal] - start[normal]) > tolerance for position in positions):
+            continue
+        ax, ay = start[first], start[second]
+        bx, by = middle[first], middle[second]
+        cx, cy = end[first], end[second]
+        divisor = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        if abs(divisor) < epsilon:
+            # the points are located on a straight line
+            continue
+        a_square, b_square, c_square = ax ** 2 + ay ** 2, bx ** 2 + by ** 2, cx ** 2 + cy ** 2
+        ux = (a_square * (by - cy) + b_square * (cy - ay) + c_square * (ay - by)) / divisor
+        uy = (a_square * (cx - bx) + b_square * (ax - cx) + c_square * (bx - ax)) / divisor
+        radius = math.hypot(ax - ux, ay - uy)
+        previous = (ax, ay)
+        counterclockwise = None
+        total_angle = 0
+        for position in positions:
+            px, py = position[first], position[second]
+            if abs(math.hypot(px - ux, py - uy) - radius) > tolerance:
+                return None
+            chord = math.hypot(px - previous[0], py - previous[1])
+            if chord == 0:
+                continue
+            if chord >= 2 * radius:
+                return None
+            # the deviation of the straight move from the arc
+            if radius - math.sqrt(radius ** 2 - (chord / 2) ** 2) > tolerance:
+                return None
+            angle = math.atan2((previous[0] - ux) * (py - uy) - (previous[1] - uy) * (px - ux),
+                               (previous[0] - ux) * (px - ux) + (previous[1] - uy) * (py - uy))
+            if counterclockwise is None:
+                counterclockwise = angle > 0
+            elif counterclockwise != (angle > 0):
+                return None
+            total_angle += abs(angle)
+            previous = (px, py)
+        if total_angle >= 2 * math.pi - epsilon:
+            # full circles are ambiguous
+            return None
+        if all(_get_distance_to_segment(position, start, end) <= tolerance
+               for position in positions):
+            # this is (almost) a straight line
+            return None
+        center = [None, None, None]
+        center[first] = ux
+        center[second] = uy
+        center[normal] = start[normal]
+        return tuple(center), plane, not counterclockwise
+    return None
+
+
+def _get_distance_to_segment(point, start, end):
+    """ calculate the distance between a point and the closest point of a line segment """
+    direction = psub(end, start)
+    length_squared = pdot(direction, direction)
+    if length_squared == 0:
+        return pdist(point, start)
+    factor = min(1, max(0, pdot(psub(point, start), direction) / length_squared))
+    return pdist(point, padd(start, pmul(direction, factor)))
 
 
 class Crop(BaseFilter):
 
     PARAMS = ("polygons", )
     WEIGHT = 90
+    STREAMING = True
+    EXPENSIVE = True
 
-    def filter_toolpath(self, toolpath):
-        new_path = []
+    def iter_filtered_steps(self, steps):
+        # index the lines of the polygons - each move needs to be compared with nearby lines only
+        polygons = [PolygonEdgeIndex(polygon) if PolygonEdgeIndex.is_suitable(polygon) else polygon
+                    for polygon in self.settings["polygons"]]
         last_pos = None
         optional_moves = []
-        for step in toolpath:
+        for step in steps:
             if step.action in MOVES_LIST:
                 if last_pos:
                     # find all remaining pieces of this line
                     inner_lines = []
-                    for polygon in self.settings["polygons"]:
+                    for polygon in polygons:
                         inner, outer = polygon.split_line(Line(last_pos, step.position))
                         inner_lines.extend(inner)
                     # turn these lines into moves
                     for line in inner_lines:
                         if pdist(line.p1, last_pos) > epsilon:
-                            new_path.append(ToolpathSteps.MoveSafety())
-                            new_path.append(
-                                ToolpathSteps.get_step_class_by_action(step.action)(line.p1))
+                            yield ToolpathSteps.MoveSafety()
+                            yield ToolpathSteps.get_step_class_by_action(step.action)(line.p1)
                         else:
                             # we continue where we left
                             if optional_moves:
-                                new_path.extend(optional_moves)
+                                yield from optional_moves
                                 optional_moves = []
-                        new_path.append(
-                            ToolpathSteps.get_step_class_by_action(step.action)(line.p2))
+                        yield ToolpathSteps.get_step_class_by_action(step.action)(line.p2)
                         last_pos = line.p2
                     optional_moves = []
                     # finish the line by moving to its end (if necessary)
@@ -391,8 +631,7 @@ class Crop(BaseFilter):
             elif step.action == MOVE_SAFETY:
                 optional_moves = []
             else:
-                new_path.append(step)
-        return new_path
+                yield step
 
 
 class TransformPosition(BaseFilter):
@@ -401,16 +640,15 @@ class TransformPosition(BaseFilter):
 
     PARAMS = ("matrix", )
     WEIGHT = 85
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        new_path = []
-        for step in toolpath:
+    def iter_filtered_steps(self, steps):
+        for step in steps:
             if step.action in MOVES_LIST:
                 new_pos = ptransform_by_matrix(step.position, self.settings["matrix"])
-                new_path.append(ToolpathSteps.get_step_class_by_action(step.action)(new_pos))
+                yield ToolpathSteps.get_step_class_by_action(step.action)(new_pos)
             else:
-                new_path.append(step)
-        return new_path
+                yield step
 
 
 class TimeLimit(BaseFilter):
@@ -420,14 +658,14 @@ class TimeLimit(BaseFilter):
 
     PARAMS = ("timelimit", )
     WEIGHT = 100
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
+    def iter_filtered_steps(self, steps):
         feedrate = min_feedrate = 1
-        new_path = []
         last_pos = None
         limit = self.settings["timelimit"]
         duration = 0
-        for step in toolpath:
+        for step in steps:
             if step.action in MOVES_LIST:
                 if last_pos:
                     new_distance = pdist(step.position, last_pos)
@@ -441,13 +679,12 @@ class TimeLimit(BaseFilter):
                         duration += new_duration
                 else:
                     destination = step.position
-                new_path.append(ToolpathSteps.get_step_class_by_action(step.action)(destination))
+                yield ToolpathSteps.get_step_class_by_action(step.action)(destination)
                 last_pos = step.position
             if (step.action == MACHINE_SETTING) and (step.key == "feedrate"):
                 feedrate = step.value
             if duration >= limit:
                 break
-        return new_path
 
 
 class MovesOnly(BaseFilter):
@@ -456,17 +693,19 @@ class MovesOnly(BaseFilter):
     """
 
     WEIGHT = 95
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        return [step for step in toolpath if step.action in MOVES_LIST]
+    def iter_filtered_steps(self, steps):
+        return (step for step in steps if step.action in MOVES_LIST)
 
 
 class Copy(BaseFilter):
 
     WEIGHT = 100
+    STREAMING = True
 
-    def filter_toolpath(self, toolpath):
-        return list(toolpath)
+    def iter_filtered_steps(self, steps):
+        return iter(steps)
 
 
 def _get_num_of_significant_digits(number):
@@ -488,14 +727,28 @@ def _get_num_of_significant_digits(number):
         return MAX_DIGITS
 
 
-def _get_num_converter(step_width):
-    """ Return a float-to-decimal conversion function with a prevision suitable
-    for the given step width.
+def _get_unit_count(value, scale):
+    """ Return the number of units (1 / scale) of a value - rounded exactly like "%.Nf" % value.
+
+    The float product of the value and the scale may be rounded to the wrong side near half a
+    unit (e.g. 2.675 * 100).  Only these rare cases are calculated exactly.
     """
-    digits = _get_num_of_significant_digits(step_width)
-    format_string = "%%.%df" % digits
-    conv_func = lambda number: decimal.Decimal(format_string % number)
-    return conv_func, format_string
+    product = value * scale
+    if abs(abs(product) % 1 - 0.5) < 1e-9 * max(1, abs(product)):
+        return round(fractions.Fraction(value) * scale)
+    return round(product)
+
+
+def _get_step_quantization(step_width):
+    """ Return a scale factor and a minimum difference for the given step width.
+
+    Multiplying a value with the scale factor and rounding it results in the number of units of
+    the smallest significant digit of the step width.  Two values differ by at least the step
+    width, if the difference of their unit counts reaches the minimum difference.
+    """
+    scale = 10 ** _get_num_of_significant_digits(step_width)
+    # The exact value of the float may exceed the rounded step width (e.g. 0.1).
+    return scale, math.ceil(fractions.Fraction(step_width) * scale)
 
 
 class StepWidth(BaseFilter):
@@ -503,49 +756,48 @@ class StepWidth(BaseFilter):
     PARAMS = ("step_width", )
     NUM_OF_AXES = 3
     WEIGHT = 60
+    STREAMING = True
+    EXPENSIVE = True
 
-    def filter_toolpath(self, toolpath):
-        minimum_steps = []
-        conv = []
-        for key in "xyz":
-            minimum_steps.append(self.settings["step_width"][key])
-        for step_width in minimum_steps:
-            conv.append(_get_num_converter(step_width)[0])
+    def iter_filtered_steps(self, steps):
+        scales, min_differences = zip(*[_get_step_quantization(self.settings["step_width"][key])
+                                        for key in "xyz"])
         last_pos = None
-        path = []
-        for step in toolpath:
+        last_counts = None
+        for step in steps:
             if step.action in MOVES_LIST:
+                # compare integer counts of step units instead of rounded decimal numbers
+                counts = [_get_unit_count(value, scale)
+                          for value, scale in zip(step.position, scales)]
                 if last_pos:
                     real_target_position = []
-                    diff = [(abs(a_conv(a_last_pos) - a_conv(a_pos)))
-                            for a_conv, a_last_pos, a_pos in zip(conv, last_pos, step.position)]
+                    real_target_counts = []
                     position_changed = False
                     # For every axis: if the new position is closer than the defined step width,
                     # then stay at the previous position.
                     # see https://sf.net/p/pycam/discussion/860184/thread/930b1c7f/
-                    for axis_distance, min_distance, axis_last, axis_wanted in zip(
-                            diff, minimum_steps, last_pos, step.position):
-                        if axis_distance >= min_distance:
+                    for count, last_count, min_difference, axis_last, axis_wanted in zip(
+                            counts, last_counts, min_differences, last_pos, step.position):
+                        if abs(count - last_count) >= min_difference:
                             real_target_position.append(axis_wanted)
+                            real_target_counts.append(count)
                             position_changed = True
                         else:
                             real_target_position.append(axis_last)
+                            real_target_counts.append(last_count)
                     if not position_changed:
                         # The limitation was not exceeded for any axis.
                         continue
                 else:
                     real_target_position = step.position
-                # TODO: this would also change the GCode output - we want
-                # this, but it sadly breaks other code pieces that rely on
-                # floats instead of decimals at this point. The output
-                # conversion needs to move into the GCode output hook.
-#               destination = [a_conv(a_pos) for a_conv, a_pos in zip(conv, step.position)]
+                    real_target_counts = counts
+                # The rounding of the destination is left to the GCode output.
                 destination = real_target_position
-                path.append(ToolpathSteps.get_step_class_by_action(step.action)(destination))
+                yield ToolpathSteps.get_step_class_by_action(step.action)(destination)
                 # We store the real machine position (instead of the "wanted" position).
                 last_pos = real_target_position
+                last_counts = real_target_counts
             else:
                 # forget "last_pos" - we don't know what happened in between
                 last_pos = None
-                path.append(step)
-        return path
+                yield step
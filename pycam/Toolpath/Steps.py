@@ -17,10 +17,14 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import array
 import collections
+import collections.abc
+import itertools
+import sys
 
 from pycam.Toolpath import MOVE_STRAIGHT, MOVE_STRAIGHT_RAPID, MOVE_ARC, MOVE_SAFETY, \
-        MACHINE_SETTING, COMMENT
+        MACHINE_SETTING, COMMENT, MOVES_LIST, get_arc_limits
 
 
 def get_step_class_by_action(action):
@@ -35,13 +39,210 @@ def get_step_class_by_action(action):
 
 
 MoveClass = collections.namedtuple("Move", ("action", "position"))
+# circular move around "center" within one of the "pycam.Toolpath.ARC_PLANES"
+# (without a center: a straight move)
+ArcClass = collections.namedtuple("Arc", ("action", "position", "center", "plane", "clockwise"),
+                                  defaults=(None, None, False))
 MachineSettingClass = collections.namedtuple("MachineSetting", ("action", "key", "value"))
 CommentClass = collections.namedtuple("Comment", ("action", "text"))
 
 
 MoveStraight = lambda position: MoveClass(MOVE_STRAIGHT, position)
 MoveStraightRapid = lambda position: MoveClass(MOVE_STRAIGHT_RAPID, position)
-MoveArc = lambda position: MoveClass(MOVE_ARC, position)
+MoveArc = lambda position, center=None, plane=None, clockwise=False: ArcClass(
+    MOVE_ARC, position, center, plane, clockwise)
 MoveSafety = lambda: MoveClass(MOVE_SAFETY, None)
 MachineSetting = lambda key, value: MachineSettingClass(MACHINE_SETTING, key, value)
 Comment = lambda text: CommentClass(COMMENT, text)
+
+
+def get_step_from_values(values):
+    """ restore a step from its plain tuple representation (e.g. "tuple(step)") """
+    action = values[0]
+    if action == MACHINE_SETTING:
+        return MachineSettingClass(*values)
+    elif action == COMMENT:
+        return CommentClass(*values)
+    elif action == MOVE_ARC:
+        return ArcClass(*values)
+    else:
+        return MoveClass(*values)
+
+
+# placeholder for steps without a position (e.g. comments)
+_EMPTY_POSITION = (0.0, 0.0, 0.0)
+
+
+class CompactPath(collections.abc.Sequence):
+    """ an immutable sequence of toolpath steps with a compact memory layout
+
+    The steps are stored in columns: an array of action codes and an array of positions (three
+    floats per step).  Machine settings, comments and arcs are rare - they are kept in a separate
+    dictionary indexed by their position in the sequence.  Thus a move occupies 25 bytes instead
+    of more than 200 bytes for a namedtuple containing a tuple of three floats.
+    Accessing the items of the sequence returns the usual step objects (e.g. "MoveStraight").
+    """
+
+    def __init__(self, steps=()):
+        if isinstance(steps, CompactPath):
+            # the content is immutable - it can be shared
+            self._actions = steps._actions
+            self._positions = steps._positions
+            self._other_steps = steps._other_steps
+            return
+        actions = array.array("B")
+        positions = array.array("d")
+        other_steps = {}
+        for index, step in enumerate(steps):
+            action = step[0]
+            actions.append(action)
+            if action in MOVES_LIST:
+                positions.extend(step[1])
+                if action == MOVE_ARC:
+                    # the position is available for calculations - the step keeps the details
+                    other_steps[index] = step
+            else:
+                positions.extend(_EMPTY_POSITION)
+                if action != MOVE_SAFETY:
+                    other_steps[index] = step
+        self._actions = actions
+        self._positions = positions
+        self._other_steps = other_steps
+
+    @classmethod
+    def _from_columns(cls, actions, positions, other_steps):
+        result = cls()
+        result._actions = actions
+        result._positions = positions
+        result._other_steps = other_steps
+        return result
+
+    def __len__(self):
+        return len(self._actions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, stride = index.indices(len(self))
+            if stride != 1:
+                return type(self)(self[index] for index in range(start, stop, stride))
+            stop = max(start, stop)
+            other_steps = {key - start: step for key, step in self._other_steps.items()
+                           if start <= key < stop}
+            return self._from_columns(self._actions[start:stop],
+                                      self._positions[3 * start:3 * stop], other_steps)
+        if index < 0:
+            index += len(self)
+        action = self._actions[index]
+        if action == MOVE_ARC:
+            return self._other_steps[index]
+        elif action in MOVES_LIST:
+            offset = 3 * index
+            return MoveClass(action, (self._positions[offset], self._positions[offset + 1],
+                                      self._positions[offset + 2]))
+        elif action == MOVE_SAFETY:
+            return MoveClass(MOVE_SAFETY, None)
+        else:
+            return self._other_steps[index]
+
+    def __iter__(self):
+        other_steps = self._other_steps
+        for index, action, position in self.iter_columns():
+            if action == MOVE_ARC:
+                yield other_steps[index]
+            elif position is not None:
+                yield MoveClass(action, position)
+            elif action == MOVE_SAFETY:
+                yield MoveClass(MOVE_SAFETY, None)
+            else:
+                yield other_steps[index]
+
+    def __eq__(self, other):
+        if isinstance(other, CompactPath):
+            return ((self._actions == other._actions) and (self._positions == other._positions)
+                    and (self._other_steps == other._other_steps))
+        elif isinstance(other, (list, tuple)):
+            return (len(self) == len(other)) and all(a == b for a, b in zip(self, other))
+        else:
+            return NotImplemented
+
+    def __add__(self, other):
+        if not isinstance(other, CompactPath):
+            if not isinstance(other, (list, tuple)):
+                return NotImplemented
+            other = CompactPath(other)
+        offset = len(self)
+        other_steps = dict(self._other_steps)
+        other_steps.update((index + offset, step) for index, step in other._other_steps.items())
+        return self._from_columns(self._actions + other._actions,
+                                  self._positions + other._positions, other_steps)
+
+    # the sequence is not supposed to be used as a key - equality is based on its content
+    __hash__ = None
+
+    def __sizeof__(self):
+        return (super().__sizeof__() + sys.getsizeof(self._actions)
+                + sys.getsizeof(self._positions) + sys.getsizeof(self._other_steps))
+
+    def __reduce__(self):
+        # the step classes cannot be pickled by name - thus we store their plain values
+        other_steps = {index: tuple(step) for index, step in self._other_steps.items()}
+        return (_restore_compact_path, (self._actions, self._positions, other_steps))
+
+    def __repr__(self):
+        return "CompactPath(<{:d} steps>)".format(len(self))
+
+    def iter_columns(self):
+        """ iterate over all steps without creating step objects
+
+        @returns: tuples of index, action and position (None for steps other than moves)
+        """
+        positions = iter(self._positions)
+        for index, (action, x, y, z) in enumerate(zip(self._actions, positions, positions,
+                                                      positions)):
+            if action in MOVES_LIST:
+                yield index, action, (x, y, z)
+            else:
+                yield index, action, None
+
+    def get_other_steps(self):
+        """ return a dictionary of all machine settings, comments and arcs indexed by position """
+        return dict(self._other_steps)
+
+    def get_limits(self):
+        """ return the lower and upper corner of the box containing all moves
+
+        Circular moves may exceed the box of their start and end position.
+        @returns: tuple of two positions or None (if the path does not contain moves)
+        """
+        mask = [action in MOVES_LIST for action in self._actions]
+        if not any(mask):
+            return None
+        lower = []
+        upper = []
+        for axis in range(3):
+            values = list(itertools.compress(self._positions[axis::3], mask))
+            lower.append(min(values))
+            upper.append(max(values))
+        for index, step in self._other_steps.items():
+            if (step.action == MOVE_ARC) and (step.center is not None):
+                start = self._get_previous_position(index)
+                if start is not None:
+                    arc_lower, arc_upper = get_arc_limits(start, step)
+                    lower = [min(values) for values in zip(lower, arc_lower)]
+                    upper = [max(values) for values in zip(upper, arc_upper)]
+        return tuple(lower), tuple(upper)
+
+    def _get_previous_position(self, index):
+        """ return the position of the machine before the given step (None: unknown) """
+        for previous in range(index - 1, -1, -1):
+            action = self._actions[previous]
+            if action in MOVES_LIST:
+                return tuple(self._positions[3 * previous:3 * previous + 3])
+            elif action == MOVE_SAFETY:
+                return None
+        return None
+
+
+def _restore_compact_path(actions, positions, other_steps):
+    other_steps = {index: get_step_from_values(values) for index, values in other_steps.items()}
+    return CompactPath._from_columns(actions, positions, other_steps)
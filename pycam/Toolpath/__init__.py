@@ -17,10 +17,14 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import array
+import bisect
+import collections
 from enum import Enum
-from itertools import groupby
+from itertools import count, groupby
 import math
 import os
+import sys
 
 try:
     import numpy
@@ -39,6 +43,98 @@ _log = pycam.Utils.log.get_logger()
 
 MOVE_STRAIGHT, MOVE_STRAIGHT_RAPID, MOVE_ARC, MOVE_SAFETY, MACHINE_SETTING, COMMENT = range(6)
 MOVES_LIST = (MOVE_STRAIGHT, MOVE_STRAIGHT_RAPID, MOVE_ARC)
+# the planes of circular moves: the indices of the two axes within the plane (in the order used by
+# GCode: G17, G18 and G19) and the index of the normal axis
+ARC_PLANES = {"xy": (0, 1, 2), "xz": (2, 0, 1), "yz": (1, 2, 0)}
+# maximum angle between two neighbouring points of an arc approximated by straight lines
+ARC_SEGMENT_ANGLE = math.pi / 36
+
+# every change of a toolpath is marked with a new revision number
+_toolpath_revisions = count()
+# the results of filter chains kept by a toolpath may use at most this multiple of the memory
+# used by the toolpath itself
+FILTER_STAGES_CACHE_RATIO = 4
+
+
+def get_arc_sweep(start, arc):
+    """ return the radius, the start angle and the sweep angle of a circular move
+
+    The angles refer to the two axes of the plane of the arc (see ARC_PLANES).  The sweep angle is
+    negative for clockwise arcs.
+    """
+    first, second, normal = ARC_PLANES[arc.plane]
+    center = arc.center
+    start_angle = math.atan2(start[second] - center[second], start[first] - center[first])
+    end_angle = math.atan2(arc.position[second] - center[second],
+                           arc.position[first] - center[first])
+    radius = math.hypot(start[first] - center[first], start[second] - center[second])
+    if arc.clockwise:
+        sweep = -((start_angle - end_angle) % (2 * math.pi))
+    else:
+        sweep = (end_angle - start_angle) % (2 * math.pi)
+    return radius, start_angle, sweep
+
+
+def get_arc_length(start, arc):
+    """ return the length of a circular move (including a change along its normal axis) """
+    radius, start_angle, sweep = get_arc_sweep(start, arc)
+    normal = ARC_PLANES[arc.plane][2]
+    return math.hypot(radius * sweep, arc.position[normal] - start[normal])
+
+
+def _get_arc_point(arc, radius, angle, normal_value):
+    first, second, normal = ARC_PLANES[arc.plane]
+    point = [None, None, None]
+    point[first] = arc.center[first] + radius * math.cos(angle)
+    point[second] = arc.center[second] + radius * math.sin(angle)
+    point[normal] = normal_value
+    return tuple(point)
+
+
+def get_arc_points(start, arc, max_angle=ARC_SEGMENT_ANGLE):
+    """ approximate a circular move by straight lines with equal lengths
+
+    @returns: list of positions along the arc (excluding the start, including the end)
+    """
+    radius, start_angle, sweep = get_arc_sweep(start, arc)
+    normal = ARC_PLANES[arc.plane][2]
+    count = max(1, math.ceil(abs(sweep) / max_angle))
+    points = []
+    for index in range(1, count):
+        fraction = index / count
+        normal_value = start[normal] + fraction * (arc.position[normal] - start[normal])
+        points.append(_get_arc_point(arc, radius, start_angle + fraction * sweep, normal_value))
+    points.append(tuple(arc.position))
+    return points
+
+
+def get_arc_limits(start, arc):
+    """ return the lower and upper corner of the box containing a circular move """
+    radius, start_angle, sweep = get_arc_sweep(start, arc)
+    points = [tuple(start), tuple(arc.position)]
+    # the extremes of the circle along the axes of its plane - if they are part of the arc
+    for quarter in range(4):
+        angle = quarter * math.pi / 2
+        if sweep >= 0:
+            offset = (angle - start_angle) % (2 * math.pi)
+        else:
+            offset = (start_angle - angle) % (2 * math.pi)
+        if offset <= abs(sweep):
+            points.append(_get_arc_point(arc, radius, angle, start[ARC_PLANES[arc.plane][2]]))
+    return (tuple(min(point[axis] for point in points) for axis in range(3)),
+            tuple(max(point[axis] for point in points) for axis in range(3)))
+
+
+def _get_feedrates_and_arcs(moves):
+    """ return the feedrate changes and the circular moves of a CompactPath indexed by position """
+    feedrate_changes = {}
+    arcs = {}
+    for index, step in moves.get_other_steps().items():
+        if (step.action == MACHINE_SETTING) and (step.key == "feedrate"):
+            feedrate_changes[index] = step.value
+        elif (step.action == MOVE_ARC) and (step.center is not None):
+            arcs[index] = step
+    return feedrate_changes, arcs
 
 
 class ToolpathPathMode(Enum):
@@ -62,19 +158,21 @@ def simplify_toolpath(path):
     This reduces memory consumption and avoids a severe slow-down of the machine
     when moving along very small steps.
     The toolpath is simplified _in_place_.
+    See "pycam.Toolpath.Filters.Simplify" for a simplification with a tolerance.
     @value path: a single separate segment of a toolpath
     @type path: list of points
     """
-    index = 1
     # stay compatible with pycam.Geometry.Path objects
     if hasattr(path, "points"):
         path = path.points
-    while index < len(path) - 1:
-        if _check_colinearity(path[index-1], path[index], path[index+1]):
-            path.pop(index)
-            # don't increase the counter - otherwise we skip one point
+    # collect the remaining points in a single pass (instead of removing them one by one)
+    result = path[:1]
+    for point in path[1:]:
+        if (len(result) > 1) and _check_colinearity(result[-2], result[-1], point):
+            result[-1] = point
         else:
-            index += 1
+            result.append(point)
+    path[:] = result
 
 
 class Toolpath(DimensionalObject):
@@ -94,9 +192,11 @@ class Toolpath(DimensionalObject):
         return self.__path
 
     def __set_path(self, new_path):
-        # use a read-only tuple instead of a list
+        # late import due to dependency cycle
+        from pycam.Toolpath.Steps import CompactPath
+        # use a read-only sequence instead of a list
         # (otherwise we can't detect changes)
-        self.__path = tuple(new_path)
+        self.__path = CompactPath(new_path)
         self.clear_cache()
 
     def __get_filters(self):
@@ -113,14 +213,20 @@ class Toolpath(DimensionalObject):
     filters = property(__get_filters, __set_filters)
 
     def copy(self):
-        return type(self)(toolpath_path=self.path, toolpath_filters=self.filters, tool=self.tool)
+        result = type(self)(toolpath_path=self.path, toolpath_filters=self.filters,
+                            tool=self.tool)
+        # the content is the same
+        result._revision = self._revision
+        return result
 
     def clear_cache(self):
+        self._revision = next(_toolpath_revisions)
         self.opengl_safety_height = None
-        self._cache_basic_moves = None
-        self._cache_visual_filters_string = None
+        # the results of filter chains indexed by the cache keys of their filters
+        self._cache_filter_stages = collections.OrderedDict()
         self._cache_visual_filters = None
         self._cache_machine_distance_and_time = None
+        self._cache_time_index = None
         self._minx = None
         self._maxx = None
         self._miny = None
@@ -129,11 +235,15 @@ class Toolpath(DimensionalObject):
         self._maxz = None
 
     def __hash__(self):
-        return hash((self.__path, self.__filters))
+        """ hash the current revision - without traversing all moves """
+        return hash(self._revision)
 
     def _get_limit_generic(self, idx, func):
-        values = [step.position[idx] for step in self.path if step.action in MOVES_LIST]
-        return func(values)
+        limits = self.path.get_limits()
+        if limits is None:
+            # no moves: mimic the behaviour of "min" and "max" for empty sequences
+            raise ValueError("The toolpath does not contain moves")
+        return limits[0][idx] if func is min else limits[1][idx]
 
     @property
     def minx(self):
@@ -178,13 +288,80 @@ class Toolpath(DimensionalObject):
         return os.linesep.join((start_marker, meta, end_marker))
 
     def get_moves(self, max_time=None):
-        moves = self.get_basic_moves()
         if max_time is None:
-            return moves
+            return self.get_basic_moves()
+        else:
+            return self.get_progress(max_time)[0]
+
+    def get_progress(self, max_time):
+        """ determine the moves processed by the machine within the given time (in minutes)
+
+        The result matches the "TimeLimit" filter (apart from the start: the first move is always
+        included).  But the cumulative machine times of the moves are calculated only once -
+        afterwards a binary search locates the current move.
+        @returns: tuple of the processed moves (the last one may be interrupted) and the current
+            position of the machine (None for toolpaths without moves)
+        """
+        moves, times = self._get_time_index()
+        if not moves:
+            return moves, None
+        index = bisect.bisect_left(times, max_time)
+        if index >= len(times):
+            # the machine is finished
+            return moves, moves[-1].position
+        elif (index == 0) or (times[index] == max_time):
+            # the end of a move is reached exactly
+            return moves[:index + 1], moves[index].position
         else:
             # late import due to dependency cycle
-            import pycam.Toolpath.Filters
-            return moves | pycam.Toolpath.Filters.TimeLimit(max_time)
+            from pycam.Toolpath.Steps import get_step_class_by_action
+            start = moves[index - 1].position
+            end = moves[index].position
+            partial = (max_time - times[index - 1]) / (times[index] - times[index - 1])
+            position = padd(start, pmul(psub(end, start), partial))
+            current_move = get_step_class_by_action(moves[index].action)(position)
+            return moves[:index] + [current_move], position
+
+    def _get_time_index(self):
+        """ return the basic moves (without other steps) and the machine time of their ends
+
+        Circular moves are approximated by straight moves (see "get_arc_points").
+        """
+        basic_moves = self.get_basic_moves()
+        if (self._cache_time_index is None) or (self._cache_time_index[0] is not basic_moves):
+            # late import due to dependency cycle
+            from pycam.Toolpath.Steps import CompactPath, MoveClass
+            feedrate_changes, arcs = _get_feedrates_and_arcs(basic_moves)
+            times = array.array("d")
+
+            def get_moves():
+                min_feedrate = 1
+                feedrate = min_feedrate
+                duration = 0
+                last_position = None
+                for index, action, position in basic_moves.iter_columns():
+                    if position is not None:
+                        if (index in arcs) and (last_position is not None):
+                            points = get_arc_points(last_position, arcs[index])
+                            segment_duration = (get_arc_length(last_position, arcs[index])
+                                                / len(points) / max(feedrate, min_feedrate))
+                            for point in points:
+                                duration += segment_duration
+                                times.append(duration)
+                                yield MoveClass(MOVE_STRAIGHT, point)
+                            last_position = position
+                            continue
+                        if last_position is not None:
+                            duration += (pdist(position, last_position)
+                                         / max(feedrate, min_feedrate))
+                        times.append(duration)
+                        last_position = position
+                        yield MoveClass(action, position)
+                    elif index in feedrate_changes:
+                        feedrate = feedrate_changes[index]
+
+            self._cache_time_index = (basic_moves, CompactPath(get_moves()), times)
+        return self._cache_time_index[1:]
 
     def _rotate_point(self, rp, sp, v, angle):
         vx = v[0]
@@ -343,16 +520,21 @@ class Toolpath(DimensionalObject):
             duration = 0
             feedrate = min_feedrate
             current_position = None
+            moves = self.get_basic_moves()
+            feedrate_changes, arcs = _get_feedrates_and_arcs(moves)
             # go through all points of the path
-            for step in self.get_basic_moves():
-                if (step.action == MACHINE_SETTING) and (step.key == "feedrate"):
-                    feedrate = step.value
-                elif step.action in MOVES_LIST:
+            for index, action, position in moves.iter_columns():
+                if position is not None:
                     if current_position is not None:
-                        distance = pdist(step.position, current_position)
+                        if index in arcs:
+                            distance = get_arc_length(current_position, arcs[index])
+                        else:
+                            distance = pdist(position, current_position)
                         duration += distance / max(feedrate, min_feedrate)
                         length += distance
-                    current_position = step.position
+                    current_position = position
+                elif index in feedrate_changes:
+                    feedrate = feedrate_changes[index]
             self._cache_machine_distance_and_time = length, duration
         return self._cache_machine_distance_and_time
 
@@ -360,20 +542,47 @@ class Toolpath(DimensionalObject):
         if filters is None:
             # implicitly assume that we use the default (latest) filters if nothing is given
             filters = self._cache_visual_filters or []
-        if reset_cache or not self._cache_basic_moves or \
-                (str(filters) != self._cache_visual_filters_string):
+        if reset_cache:
+            self._cache_filter_stages.clear()
+        self._cache_visual_filters = filters
+        all_filters = sorted(tuple(self.filters) + tuple(filters))
+        stage_keys = tuple(one_filter.get_cache_key() for one_filter in all_filters)
+        # continue with the longest prefix of the filter chain that was applied before
+        moves = self.path
+        done_count = 0
+        for stage_count in range(len(all_filters), 0, -1):
+            cached = self._cache_filter_stages.get(stage_keys[:stage_count])
+            if cached is not None:
+                self._cache_filter_stages.move_to_end(stage_keys[:stage_count])
+                moves = cached
+                done_count = stage_count
+                break
+        if done_count < len(all_filters):
             # late import due to dependency cycle
-            import pycam.Toolpath.Filters
-            all_filters = tuple(self.filters) + tuple(filters)
-            self._cache_basic_moves = pycam.Toolpath.Filters.get_filtered_moves(self.path,
-                                                                                all_filters)
-            self._cache_visual_filters_string = str(filters)
-            self._cache_visual_filters = filters
+            from pycam.Toolpath.Steps import CompactPath
             _log.debug("Applying toolpath filters: %s",
-                       ", ".join([str(fil) for fil in all_filters]))
+                       ", ".join([str(fil) for fil in all_filters[done_count:]]))
+            original_length = len(moves)
+            # Cheap filters are chained into a single pass.  Only the results of expensive
+            # filters and the final result are stored.
+            steps = iter(moves)
+            for index in range(done_count, len(all_filters)):
+                one_filter = all_filters[index]
+                steps = one_filter.iter_filtered_steps(steps)
+                if (one_filter.EXPENSIVE or not one_filter.STREAMING
+                        or (index == len(all_filters) - 1)):
+                    moves = CompactPath(steps)
+                    self._cache_filter_stages[stage_keys[:index + 1]] = moves
+                    steps = iter(moves)
+            # forget the least recently used results - but keep the current one
+            max_size = FILTER_STAGES_CACHE_RATIO * sys.getsizeof(self.path)
+            while ((len(self._cache_filter_stages) > 1)
+                   and (sum(sys.getsizeof(cached)
+                            for cached in self._cache_filter_stages.values()) > max_size)):
+                self._cache_filter_stages.popitem(last=False)
             _log.debug("Toolpath step changes: %d (before) -> %d (after)",
-                       len(self.path), len(self._cache_basic_moves))
-        return self._cache_basic_moves
+                       original_length, len(moves))
+        return moves
 
 
 class Bounds:
@@ -18,15 +18,16 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import enum
+import functools
+import importlib
 import os
 import re
 import socket
 import sys
 import traceback
-import urllib
 from urllib.parse import urlparse
-from urllib.request import url2pathname
-# this is imported below on demand
+# these are imported below on demand
+# import urllib.request
 # import win32com
 # import win32api
 
@@ -79,6 +80,20 @@ def get_application_key():
     return __application_key[0] if __application_key else None
 
 
+@functools.lru_cache(maxsize=None)
+def get_optional_module(name):
+    """ import an optional module (e.g. "OpenGL.GL") on demand
+
+    Expensive optional modules should be imported only where they are used.
+    Failed imports are not repeated.
+    @returns: the module or None (if it is not available)
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
 def get_case_insensitive_file_pattern(pattern):
     """ Convert something like "*.svg" into "*.[sS][vV][gG]" - as it is
         required for GTK's FileFilter.
@@ -162,6 +177,7 @@ class URIHandler:
             # prepend "netloc" (the drive letter - e.g. "c:")
             encoded_path = self._uri.netloc + encoded_path
         # decode all special characters like "%20" and replace "/" with "\\" (Windows)
+        from urllib.request import url2pathname
         return url2pathname(encoded_path)
 
     def get_url(self):
@@ -171,15 +187,17 @@ class URIHandler:
         if self.is_local():
             return open(self.get_local_path(), "rb")
         else:
-            return urllib.urlopen(self._uri.geturl())
+            import urllib.request
+            return urllib.request.urlopen(self._uri.geturl())
 
     def retrieve_remote_file(self, destination, callback=None):
         if callback:
             download_callback = lambda current_blocks, block_size, num_of_blocks: callback()
         else:
             download_callback = None
+        import urllib.request
         try:
-            urllib.urlretrieve(self.get_url(), destination, download_callback)
+            urllib.request.urlretrieve(self.get_url(), destination, download_callback)
             return True
         except IOError:
             return False
@@ -0,0 +1,860 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Streaming task protocol for the distribution of parallel jobs via TCP.
+
+Three kinds of peers are involved:
+    * the server: collects the tasks of all jobs and distributes them among the workers
+    * workers: execute tasks (each worker process uses a single connection)
+    * clients: submit jobs and receive their results
+
+Every connection starts with a mutual HMAC challenge (based on the shared secret).  Afterwards
+pickled messages are exchanged - each of them is prefixed with its length.  Tasks are sent to
+workers in advance (pipelining), results are sent back in batches and carry the statistics of
+the worker.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import hmac
+import itertools
+import logging
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import traceback
+
+from pycam.errors import CommunicationError
+import pycam.Utils.log
+from pycam.Utils.threading import (PendingTasks, ProcessDataCache, ProcessDataCacheItemID,
+                                   ProcessStatistics)
+
+log = pycam.Utils.log.get_logger()
+
+
+_HEADER = struct.Struct("!I")
+_CHALLENGE_SIZE = 32
+_DIGEST_NAME = "sha256"
+_WELCOME = b"#WELCOME#"
+_FAILURE = b"#FAILURE#"
+_CONNECT_TIMEOUT = 10
+# number of tasks handed to a worker in advance - this hides the network latency
+DEFAULT_PREFETCH = 4
+# workers send heartbeats regularly - silent workers are considered to be dead
+HEARTBEAT_INTERVAL = 2
+HEARTBEAT_TIMEOUT = 5 * HEARTBEAT_INTERVAL
+# the client transmits a job in multiple parts - the server starts processing immediately
+SUBMIT_BATCH_SIZE = 64
+
+
+class _Connection:
+    """ exchange length-prefixed pickled messages via an asyncio stream """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, *message):
+        data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        async with self._send_lock:
+            self._writer.write(_HEADER.pack(len(data)))
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def receive(self):
+        length, = _HEADER.unpack(await self._reader.readexactly(_HEADER.size))
+        return pickle.loads(await self._reader.readexactly(length))
+
+    async def deliver_challenge(self, authkey):
+        challenge = os.urandom(_CHALLENGE_SIZE)
+        self._writer.write(challenge)
+        await self._writer.drain()
+        digest = await self._reader.readexactly(hmac.new(b"", digestmod=_DIGEST_NAME).digest_size)
+        if hmac.compare_digest(digest, hmac.new(authkey, challenge, _DIGEST_NAME).digest()):
+            self._writer.write(_WELCOME)
+            await self._writer.drain()
+        else:
+            self._writer.write(_FAILURE)
+            await self._writer.drain()
+            raise CommunicationError("The remote peer failed to authenticate")
+
+    async def answer_challenge(self, authkey):
+        challenge = await self._reader.readexactly(_CHALLENGE_SIZE)
+        self._writer.write(hmac.new(authkey, challenge, _DIGEST_NAME).digest())
+        await self._writer.drain()
+        if await self._reader.readexactly(len(_WELCOME)) != _WELCOME:
+            raise CommunicationError("The remote peer rejected the authentication key")
+
+    def get_peer_name(self):
+        return self._writer.get_extra_info("peername")
+
+    def close(self):
+        self._writer.close()
+
+
+async def _open_connection(address, authkey):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(*address),
+                                            timeout=_CONNECT_TIMEOUT)
+    connection = _Connection(reader, writer)
+    try:
+        await connection.answer_challenge(authkey)
+        await connection.deliver_challenge(authkey)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        connection.close()
+        raise CommunicationError("The remote server closed the connection during authentication")
+    except CommunicationError:
+        connection.close()
+        raise
+    return connection
+
+
+def _get_cache_item_ids(args):
+    """ return the IDs of all cached items referenced by the arguments of a task """
+    result = []
+    for arg in args:
+        if isinstance(arg, ProcessDataCacheItemID):
+            result.append(arg.value)
+        elif isinstance(arg, list):
+            result.extend(item.value for item in arg if isinstance(item, ProcessDataCacheItemID))
+    return result
+
+
+class _Job:
+
+    def __init__(self, job_id, func, client):
+        self.job_id = job_id
+        self.func = func
+        self.client = client
+        # unfinished tasks: task_id -> args
+        self.tasks = {}
+        # cache items pinned by this job
+        self.items = set()
+        # tasks waiting for the transfer of missing cache items
+        self.missing_items = set()
+        self.waiting_tasks = []
+        # tasks that were handed to a second worker
+        self.speculated = set()
+        self.finished_count = 0
+        self.finished_time = 0
+
+    def get_average_task_duration(self):
+        if self.finished_count > 0:
+            return self.finished_time / self.finished_count
+        else:
+            return None
+
+
+class _WorkerState:
+
+    def __init__(self, name, connection):
+        self.name = name
+        self.connection = connection
+        # tasks sent to the worker, but not finished, yet
+        self.assigned = set()
+        # cache items that were transferred to the worker
+        self.known_items = set()
+        self.cache_statistics = {}
+        self.last_seen = time.time()
+
+
+class TaskServer:
+    """ distribute the tasks of submitted jobs among all connected workers
+
+    Tasks of workers missing their heartbeat are handed to other workers.  Near the end of a job
+    (no more waiting tasks) idle workers run a copy of slow tasks, if these take significantly
+    longer than the average task of the job.  The first result wins.
+
+    All methods need to be called within the thread of the event loop.
+    """
+
+    def __init__(self, authkey, prefetch=DEFAULT_PREFETCH, stale_timeout=300,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, speculation_factor=2.0,
+                 min_speculation_age=1.0):
+        self._authkey = authkey or b""
+        self._prefetch = prefetch
+        self._heartbeat_timeout = heartbeat_timeout
+        self._speculation_factor = speculation_factor
+        self._min_speculation_age = min_speculation_age
+        self._jobs = {}
+        # tasks waiting for a worker: (job_id, task_id)
+        self._queue = collections.deque()
+        self._workers = {}
+        self._server = None
+        self._housekeeping = None
+        self.cache = ProcessDataCache()
+        self.statistics = ProcessStatistics()
+        self.pending_tasks = PendingTasks(stale_timeout=stale_timeout)
+
+    async def start(self, host, port):
+        self._server = await asyncio.start_server(self._handle_connection, host or None, port)
+        self._housekeeping = asyncio.ensure_future(self._run_housekeeping())
+
+    def get_port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._housekeeping is not None:
+            self._housekeeping.cancel()
+        if self._server is not None:
+            self._server.close()
+        for worker in list(self._workers.values()):
+            worker.connection.close()
+
+    async def _run_housekeeping(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.time()
+            for worker in list(self._workers.values()):
+                if worker.last_seen + self._heartbeat_timeout < now:
+                    log.warning("Worker %s missed its heartbeat - reassigning %d tasks",
+                                worker.name, len(worker.assigned))
+                    self._release_worker(worker)
+                    worker.connection.close()
+            # last resort: re-inject tasks exceeding the stale timeout
+            for job_id, task_id, worker_name in self.pending_tasks.get_stale_tasks():
+                log.debug("Reinjecting stale task: %s / %s (%s)", job_id, task_id, worker_name)
+                self.pending_tasks.remove(job_id, task_id)
+                if job_id in self._jobs:
+                    self._queue.appendleft((job_id, task_id))
+            self._dispatch()
+
+    def _release_worker(self, worker):
+        """ forget a worker and hand its unfinished tasks over to the other workers """
+        self._workers.pop(worker.name, None)
+        for job_id, task_id in worker.assigned:
+            job = self._jobs.get(job_id)
+            if (job is None) or (task_id not in job.tasks):
+                continue
+            if any((job_id, task_id) in other.assigned for other in self._workers.values()):
+                # a speculative copy is still running
+                continue
+            self.pending_tasks.remove(job_id, task_id)
+            self._queue.appendleft((job_id, task_id))
+        worker.assigned.clear()
+        self._dispatch()
+
+    async def _handle_connection(self, reader, writer):
+        connection = _Connection(reader, writer)
+        peer_name = connection.get_peer_name()
+        try:
+            await connection.deliver_challenge(self._authkey)
+            await connection.answer_challenge(self._authkey)
+            message_type, info = await connection.receive()
+            if message_type != "hello":
+                raise CommunicationError("Unexpected initial message: {}".format(message_type))
+            if info["role"] == "worker":
+                await self._serve_worker(connection, info["name"])
+            elif info["role"] == "client":
+                await self._serve_client(connection)
+            else:
+                raise CommunicationError("Unknown role of peer: {}".format(info["role"]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            log.debug("Connection closed: %s", peer_name)
+        except CommunicationError as exc:
+            log.warning("Connection to %s failed: %s", peer_name, exc)
+        except asyncio.CancelledError:
+            # The server is shutting down.  Some versions of asyncio fail to handle a cancelled
+            # connection handler - thus we finish quietly.
+            log.debug("Connection cancelled: %s", peer_name)
+        finally:
+            connection.close()
+
+    async def _serve_worker(self, connection, name):
+        worker = _WorkerState(name, connection)
+        self._workers[name] = worker
+        self.statistics.worker_notification(name)
+        log.debug("Worker connected: %s", name)
+        try:
+            self._dispatch()
+            while True:
+                message = await connection.receive()
+                worker.last_seen = time.time()
+                if message[0] == "heartbeat":
+                    self.statistics.worker_notification(name)
+                elif message[0] == "results":
+                    self._handle_results(worker, message[1], message[2])
+                elif message[0] == "fetch":
+                    items = {}
+                    for item_id in message[1]:
+                        try:
+                            items[item_id] = (self.cache.get(item_id),
+                                              self.cache.get_size(item_id))
+                        except KeyError:
+                            pass
+                    await connection.send("items", items)
+                else:
+                    raise CommunicationError("Unexpected message from worker: {}"
+                                             .format(message[0]))
+        finally:
+            log.debug("Worker disconnected: %s (%d unfinished tasks)", name, len(worker.assigned))
+            self._release_worker(worker)
+
+    async def _serve_client(self, connection):
+        job_ids = set()
+        try:
+            while True:
+                message = await connection.receive()
+                if message[0] == "submit":
+                    job_id, func, tasks, items = message[1:]
+                    if job_id not in self._jobs:
+                        self._jobs[job_id] = _Job(job_id, func, connection)
+                        job_ids.add(job_id)
+                    self._add_cache_items(items, self._jobs[job_id])
+                    self._add_tasks(self._jobs[job_id], tasks)
+                elif message[0] == "items":
+                    # the client transmitted items that were missing
+                    self._add_cache_items(message[1])
+                elif message[0] == "cancel":
+                    self._remove_job(message[1])
+                    job_ids.discard(message[1])
+                elif message[0] == "statistics":
+                    await connection.send("statistics", message[1], self.get_statistics())
+                else:
+                    raise CommunicationError("Unexpected message from client: {}"
+                                             .format(message[0]))
+        finally:
+            for job_id in job_ids:
+                self._remove_job(job_id)
+
+    def _add_cache_items(self, items, job=None):
+        """ store the transmitted items and pin them for the jobs using them """
+        for item_id, value in items.items():
+            self.cache.add(item_id, value)
+            # pin the item immediately - otherwise it could be evicted by the next one
+            for other_job in self._jobs.values():
+                if (other_job is job) or (item_id in other_job.missing_items):
+                    if item_id not in other_job.items:
+                        self.cache.pin(item_id)
+                        other_job.items.add(item_id)
+                    other_job.missing_items.discard(item_id)
+        # release the tasks that were waiting for these items
+        for other_job in self._jobs.values():
+            if other_job.waiting_tasks and not other_job.missing_items:
+                waiting_tasks = other_job.waiting_tasks
+                other_job.waiting_tasks = []
+                self._add_tasks(other_job, waiting_tasks)
+
+    def _add_tasks(self, job, tasks):
+        # the items of active jobs are pinned in the cache
+        missing_items = set()
+        for task_id, args in tasks:
+            for item_id in _get_cache_item_ids(args):
+                if (item_id not in job.items) and (item_id not in job.missing_items):
+                    if self.cache.contains(item_id):
+                        self.cache.pin(item_id)
+                        job.items.add(item_id)
+                    else:
+                        missing_items.add(item_id)
+        if missing_items:
+            # the items were evicted from the cache - request them from the client
+            job.missing_items.update(missing_items)
+            asyncio.ensure_future(self._send_safely(job.client, "resend", job.job_id,
+                                                    list(missing_items)))
+        if job.missing_items:
+            job.waiting_tasks.extend(tasks)
+        else:
+            for task_id, args in tasks:
+                job.tasks[task_id] = args
+                self._queue.append((job.job_id, task_id))
+            self._dispatch()
+
+    def _remove_job(self, job_id):
+        job = self._jobs.pop(job_id, None)
+        if job is not None:
+            for item_id in job.items:
+                self.cache.unpin(item_id)
+            self.pending_tasks.remove(job_id)
+            # the workers may skip the remaining tasks of this job
+            for worker in self._workers.values():
+                cancelled = [key for key in worker.assigned if key[0] == job_id]
+                if cancelled:
+                    worker.assigned.difference_update(cancelled)
+                    self._cancel_tasks(worker, cancelled)
+
+    def _cancel_tasks(self, worker, keys):
+        asyncio.ensure_future(self._send_safely(worker.connection, "cancel", keys))
+
+    def _handle_results(self, worker, results, statistics):
+        client_results = {}
+        for (job_id, task_id, result, error), (transfer_time, process_time) in zip(
+                results, statistics["times"]):
+            self.statistics.add_transfer_time(worker.name, transfer_time)
+            self.statistics.add_process_time(worker.name, process_time)
+            key = (job_id, task_id)
+            worker.assigned.discard(key)
+            job = self._jobs.get(job_id)
+            if (job is None) or (task_id not in job.tasks):
+                # the job was cancelled or the task was finished by a different worker
+                continue
+            self.pending_tasks.remove(job_id, task_id)
+            del job.tasks[task_id]
+            job.finished_count += 1
+            job.finished_time += process_time
+            if task_id in job.speculated:
+                # the first result wins - other copies of this task are obsolete
+                for other in self._workers.values():
+                    if key in other.assigned:
+                        other.assigned.discard(key)
+                        self._cancel_tasks(other, [key])
+            client_results.setdefault(job.client, {}).setdefault(job_id, []).append(
+                (task_id, result, error))
+        worker.cache_statistics = statistics["cache"]
+        self.statistics.worker_notification(worker.name)
+        for client, jobs in client_results.items():
+            for job_id, job_results in jobs.items():
+                asyncio.ensure_future(self._send_safely(client, "results", job_id, job_results))
+        self._dispatch()
+
+    async def _send_safely(self, connection, *message):
+        try:
+            await connection.send(*message)
+        except ConnectionError:
+            # the connection handler takes care for the cleanup
+            pass
+
+    def _send_tasks(self, worker, keys):
+        tasks = []
+        items = {}
+        for job_id, task_id in keys:
+            job = self._jobs[job_id]
+            args = job.tasks[task_id]
+            for item_id in _get_cache_item_ids(args):
+                if item_id not in worker.known_items:
+                    items[item_id] = (self.cache.get(item_id), self.cache.get_size(item_id))
+                    worker.known_items.add(item_id)
+            tasks.append((job_id, task_id, job.func, args))
+            worker.assigned.add((job_id, task_id))
+        asyncio.ensure_future(self._send_safely(worker.connection, "tasks", tasks, items))
+
+    def _dispatch(self):
+        """ hand out waiting tasks to all workers with free capacity """
+        for worker in self._workers.values():
+            keys = []
+            while self._queue and (len(worker.assigned) + len(keys) < self._prefetch):
+                job_id, task_id = self._queue.popleft()
+                job = self._jobs.get(job_id)
+                if (job is None) or (task_id not in job.tasks):
+                    # cancelled or already finished
+                    continue
+                keys.append((job_id, task_id))
+                self.pending_tasks.add(job_id, task_id, worker.name)
+            if keys:
+                self._send_tasks(worker, keys)
+            if not self._queue:
+                break
+        if not self._queue:
+            self._speculate()
+
+    def _speculate(self):
+        """ run copies of slow tasks on idle workers """
+        idle_workers = [worker for worker in self._workers.values() if not worker.assigned]
+        if not idle_workers:
+            return
+        for job_id, task_id, worker_name in self.pending_tasks.get_oldest_tasks(
+                min_age=self._min_speculation_age):
+            job = self._jobs.get(job_id)
+            if (job is None) or (task_id not in job.tasks) or (task_id in job.speculated):
+                continue
+            average_duration = job.get_average_task_duration()
+            if ((average_duration is None) or (self.pending_tasks.get_age(job_id, task_id)
+                                               < self._speculation_factor * average_duration)):
+                # the oldest tasks come first - thus all remaining tasks are too young
+                break
+            worker = idle_workers.pop()
+            log.debug("Speculative execution of slow task %s / %s (running on %s) on %s",
+                      job_id, task_id, worker_name, worker.name)
+            job.speculated.add(task_id)
+            self._send_tasks(worker, [(job_id, task_id)])
+            if not idle_workers:
+                break
+
+    def get_statistics(self):
+        result = {"workers": self.statistics.get_worker_statistics(),
+                  "tasks": len(self._queue),
+                  "results": 0,
+                  "pending": self.pending_tasks.length(),
+                  "cache": self.cache.length()}
+        for key, value in self.cache.get_statistics().items():
+            result["cache_" + key] = value
+        for key in ("hits", "misses", "evictions"):
+            result["worker_cache_" + key] = sum(worker.cache_statistics.get(key, 0)
+                                                for worker in self._workers.values())
+        return result
+
+
+class TaskWorker:
+    """ execute the tasks handed out by a server and send back the results in batches """
+
+    def __init__(self, address, authkey, name, max_batch_size=32, max_batch_delay=0.5,
+                 heartbeat_interval=HEARTBEAT_INTERVAL):
+        self._address = address
+        self._authkey = authkey or b""
+        self.name = name
+        self._max_batch_size = max_batch_size
+        self._max_batch_delay = max_batch_delay
+        self._heartbeat_interval = heartbeat_interval
+        self._connection = None
+        self._tasks = None
+        self._cache = ProcessDataCache()
+        self._items_arrived = None
+        # keys of the tasks waiting in the local queue
+        self._queued = set()
+        # queued tasks that were finished by a different worker or belong to a cancelled job
+        self._cancelled = set()
+        # finished tasks waiting to be sent to the server
+        self._results = []
+        self._result_statistics = []
+        self._results_changed = None
+
+    async def run(self):
+        self._connection = await _open_connection(self._address, self._authkey)
+        self._tasks = asyncio.Queue()
+        self._items_arrived = asyncio.Event()
+        self._results_changed = asyncio.Event()
+        try:
+            await self._connection.send("hello", {"role": "worker", "name": self.name})
+            receiver = asyncio.ensure_future(self._receive_messages())
+            processor = asyncio.ensure_future(self._process_tasks())
+            sender = asyncio.ensure_future(self._send_results())
+            heartbeat = asyncio.ensure_future(self._send_heartbeats())
+            done, pending = await asyncio.wait((receiver, processor, sender, heartbeat),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for future in pending:
+                future.cancel()
+            for future in done:
+                # raise exceptions (if any)
+                future.result()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            log.info("Worker %s lost the connection to the server", self.name)
+        finally:
+            self._connection.close()
+
+    async def _send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            await self._connection.send("heartbeat")
+
+    async def _receive_messages(self):
+        while True:
+            message = await self._connection.receive()
+            if message[0] == "cancel":
+                # running or finished tasks cannot be skipped anymore
+                self._cancelled.update(key for key in map(tuple, message[1])
+                                       if key in self._queued)
+            elif message[0] == "tasks":
+                tasks, items = message[1:]
+                for item_id, (value, size) in items.items():
+                    self._cache.add(item_id, value, size=size)
+                for task in tasks:
+                    # keep the items of queued tasks
+                    for item_id in _get_cache_item_ids(task[3]):
+                        self._cache.pin(item_id)
+                    self._queued.add((task[0], task[1]))
+                    self._tasks.put_nowait(task)
+            elif message[0] == "items":
+                for item_id, (value, size) in message[1].items():
+                    self._cache.add(item_id, value, size=size)
+                self._items_arrived.set()
+            else:
+                raise CommunicationError("Unexpected message from server: {}".format(message[0]))
+
+    async def _get_cached_items(self, item_ids):
+        missing = [item_id for item_id in item_ids if not self._cache.contains(item_id)]
+        if missing:
+            # the local copy expired in the meantime
+            self._items_arrived.clear()
+            await self._connection.send("fetch", missing)
+            await self._items_arrived.wait()
+        return {item_id: self._cache.get(item_id) for item_id in item_ids}
+
+    async def _resolve_args(self, args):
+        items = await self._get_cached_items(_get_cache_item_ids(args))
+        real_args = []
+        for arg in args:
+            if isinstance(arg, ProcessDataCacheItemID):
+                real_args.append(items[arg.value])
+            elif isinstance(arg, list):
+                real_args.append([items[item.value] if isinstance(item, ProcessDataCacheItemID)
+                                  else item for item in arg])
+            else:
+                real_args.append(arg)
+        return real_args
+
+    async def _process_tasks(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            job_id, task_id, func, args = await self._tasks.get()
+            self._queued.discard((job_id, task_id))
+            if self._tasks.empty():
+                # the server waits for results before handing out new tasks
+                self._results_changed.set()
+            if (job_id, task_id) in self._cancelled:
+                for item_id in _get_cache_item_ids(args):
+                    self._cache.unpin(item_id)
+                self._cancelled.discard((job_id, task_id))
+                continue
+            start_time = time.time()
+            try:
+                real_args = await self._resolve_args(args)
+            except KeyError:
+                result, error = None, "Cached data item expired on server: {}".format(task_id)
+                transfer_time = time.time() - start_time
+                process_time = 0
+            else:
+                transfer_time = time.time() - start_time
+                start_time = time.time()
+                try:
+                    # run the task in a separate thread - the connection stays responsive
+                    result, error = await loop.run_in_executor(None, func, real_args), None
+                except Exception:
+                    result, error = None, traceback.format_exc()
+                process_time = time.time() - start_time
+            for item_id in _get_cache_item_ids(args):
+                self._cache.unpin(item_id)
+            self._results.append((job_id, task_id, result, error))
+            self._result_statistics.append((transfer_time, process_time))
+            self._results_changed.set()
+
+    async def _send_results(self):
+        """ send finished tasks in batches - independent of the tasks being processed
+
+        A batch is sent as soon as it is full, the local queue of tasks runs empty or the first
+        result of the batch waited for "max_batch_delay" seconds.  Thus the server can hand out
+        further tasks, while the remaining tasks of the worker are still running.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            while not self._results:
+                self._results_changed.clear()
+                await self._results_changed.wait()
+            deadline = loop.time() + self._max_batch_delay
+            while (len(self._results) < self._max_batch_size) and not self._tasks.empty():
+                self._results_changed.clear()
+                try:
+                    await asyncio.wait_for(self._results_changed.wait(),
+                                           max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            results, statistics = self._results, self._result_statistics
+            self._results, self._result_statistics = [], []
+            await self._connection.send("results", results,
+                                        {"times": statistics,
+                                         "cache": self._cache.get_statistics()})
+
+
+def run_worker(address, authkey, name, reconnect=False, reconnect_delay=3):
+    """ connect to a server and process its tasks until the connection is closed
+
+    @param reconnect: try to (re-)connect to the server forever (e.g. for standalone workers)
+    """
+    log.debug("Worker process started: %s", name)
+    try:
+        while True:
+            try:
+                asyncio.run(TaskWorker(address, authkey, name).run())
+            except (CommunicationError, OSError, asyncio.TimeoutError) as exc:
+                log.log(logging.DEBUG if reconnect else logging.ERROR,
+                        "Worker %s failed to connect to server %s: %s", name, address, exc)
+            if not reconnect:
+                break
+            time.sleep(reconnect_delay)
+    except KeyboardInterrupt:
+        pass
+    log.debug("Worker process finished: %s", name)
+
+
+class _EventLoopThread:
+    """ run an asyncio event loop in a separate thread """
+
+    def __init__(self, name):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(name=name, target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def call(self, coroutine, timeout=None):
+        """ run a coroutine in the event loop and wait for its result """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def join(self):
+        self._thread.join()
+
+    def stop(self):
+        if self._loop.is_running():
+            try:
+                self.call(self._cancel_tasks(), timeout=_CONNECT_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                log.warning("Failed to finish pending network operations")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+
+    @staticmethod
+    async def _cancel_tasks():
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class TaskServerThread(_EventLoopThread):
+    """ run a task server in the background """
+
+    def __init__(self, address, authkey):
+        super().__init__("task-server")
+        self.address = address
+        self.server = TaskServer(authkey)
+
+    def start(self):
+        self.call(self.server.start(*self.address), timeout=_CONNECT_TIMEOUT)
+
+    def stop(self):
+        if self._loop.is_running():
+            self.call(self.server.stop(), timeout=_CONNECT_TIMEOUT)
+        super().stop()
+
+
+class TaskClient(_EventLoopThread):
+    """ submit jobs to a task server and wait for their results
+
+    The methods of this class are supposed to be called from any thread except for the event loop
+    thread.
+    """
+
+    def __init__(self, address, authkey):
+        super().__init__("task-client")
+        self.address = address
+        self._authkey = authkey or b""
+        self._connection = None
+        self._receiver = None
+        self._result_queues = {}
+        self._statistics_requests = {}
+        self._request_counter = itertools.count()
+        self._closing = False
+        # cache items are transmitted only once - unless the server requests them again
+        self._transmitted_items = set()
+        self._job_items = {}
+
+    def connect(self):
+        self.call(self._connect(), timeout=2 * _CONNECT_TIMEOUT)
+
+    async def _connect(self):
+        self._connection = await _open_connection(self.address, self._authkey)
+        await self._connection.send("hello", {"role": "client"})
+        self._receiver = asyncio.ensure_future(self._receive_messages())
+
+    async def _receive_messages(self):
+        try:
+            while True:
+                message = await self._connection.receive()
+                if message[0] == "results":
+                    try:
+                        self._result_queues[message[1]].put(message[2])
+                    except KeyError:
+                        # the job was finished or cancelled
+                        pass
+                elif message[0] == "resend":
+                    job_items = self._job_items.get(message[1], {})
+                    await self._connection.send(
+                        "items", {item_id: job_items[item_id] for item_id in message[2]
+                                  if item_id in job_items})
+                elif message[0] == "statistics":
+                    future = self._statistics_requests.pop(message[1], None)
+                    if future is not None:
+                        future.set_result(message[2])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            if not self._closing:
+                log.warning("Lost the connection to the task server")
+        finally:
+            self._connection = None
+            # wake up all waiting jobs
+            for result_queue in list(self._result_queues.values()):
+                result_queue.put(None)
+            for future in self._statistics_requests.values():
+                future.cancel()
+
+    def is_connected(self):
+        return self._connection is not None
+
+    async def _send(self, *message):
+        if self._connection is None:
+            raise CommunicationError("Not connected to the task server")
+        await self._connection.send(*message)
+
+    def prepare_cache_item(self, job_id, item_id, value, items):
+        """ add a value to the dictionary of items to be transmitted (if necessary) """
+        self._job_items[job_id][item_id] = value
+        if item_id not in self._transmitted_items:
+            items[item_id] = value
+            self._transmitted_items.add(item_id)
+
+    def register_job(self, job_id):
+        self._result_queues[job_id] = queue.Queue()
+        self._job_items[job_id] = {}
+
+    def submit_tasks(self, job_id, func, tasks, items):
+        """ transmit a batch of tasks (task_id, args) of a job """
+        self.call(self._send("submit", job_id, func, tasks, items))
+
+    def get_results(self, job_id, timeout=None):
+        """ wait for the next batch of results of a job: a list of (task_id, result, error) """
+        try:
+            results = self._result_queues[job_id].get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if results is None:
+            raise CommunicationError("Lost the connection to the task server")
+        return results
+
+    def finish_job(self, job_id):
+        self._result_queues.pop(job_id, None)
+        self._job_items.pop(job_id, None)
+        if self.is_connected():
+            try:
+                self.call(self._send("cancel", job_id), timeout=_CONNECT_TIMEOUT)
+            except (CommunicationError, ConnectionError, concurrent.futures.TimeoutError):
+                pass
+
+    def get_statistics(self):
+        async def request_statistics():
+            request_id = next(self._request_counter)
+            future = asyncio.get_event_loop().create_future()
+            self._statistics_requests[request_id] = future
+            await self._send("statistics", request_id)
+            return await future
+
+        try:
+            return self.call(request_statistics(), timeout=_CONNECT_TIMEOUT)
+        except (CommunicationError, ConnectionError, concurrent.futures.TimeoutError,
+                concurrent.futures.CancelledError):
+            return {}
+
+    def stop(self):
+        self._closing = True
+        if self._loop.is_running() and (self._connection is not None):
+            self._loop.call_soon_threadsafe(self._connection.close)
+        super().stop()
@@ -19,40 +19,34 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 # multiprocessing is imported later
 # import multiprocessing
+import collections
+import concurrent.futures
+from enum import Enum
 import os
+import pickle
 import platform
 import queue
-import random
-import signal
-import socket
 import sys
+import threading
 import time
 import uuid
 
-from pycam.errors import CommunicationError
+from pycam.errors import AbortOperationException, CommunicationError, InvalidKeyError
 import pycam.Utils
 import pycam.Utils.log
 log = pycam.Utils.log.get_logger()
 
 
-try:
-    from multiprocessing.managers import SyncManager as _SyncManager
-except ImportError as msg:
-    log.debug("Failed to import multiprocessing.managers.SyncMananger: %s", msg)
-else:
-    # this class definition needs to be at the top level - for pyinstaller
-    class TaskManager(_SyncManager):
-        @classmethod
-        def _run_server(cls, *args):
-            # make sure that the server ignores SIGINT (KeyboardInterrupt)
-            signal.signal(signal.SIGINT, signal.SIG_IGN)
-            # prevent connection errors to trigger exceptions
-            try:
-                _SyncManager._run_server(*args)
-            except socket.error:
-                pass
-
 DEFAULT_PORT = 1250
+# memory budget of the data cache (in bytes) of every server and worker
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+
+class ExecutorBackend(Enum):
+    SERIAL = "serial"
+    THREAD = "thread"
+    PROCESS = "process"
+    REMOTE = "remote"
 
 
 # TODO: create one or two classes for these functions (to get rid of the globals)
@@ -66,27 +60,34 @@ __multiprocessing = None
 # needs to be initialized, if multiprocessing is enabled
 __num_of_processes = None
 
-__manager = None
-__closing = None
-__task_source_uuid = None
-__finished_jobs = []
+# the local task server (if enabled)
+__server = None
+# the connection to the local or remote task server
+__task_client = None
+# local worker processes (connected to a local or remote task server)
+__workers = []
 __issued_warnings = []
+# instances of executors (by ExecutorBackend) - they are created on demand
+__executors = {}
+# configured executor backends by call site ("None" is the default for all call sites)
+__executor_backends = {}
 
 
-def run_in_parallel(*args, **kwargs):
-    global __manager
-    if __manager is None:
-        if pycam.Utils.log.is_debug():
-            # force serial processing in debug mode
-            kwargs = dict(kwargs)
-            kwargs["disable_multiprocessing"] = True
-        return run_in_parallel_local(*args, **kwargs)
-    else:
-        return run_in_parallel_remote(*args, **kwargs)
+def run_in_parallel(func, args, unordered=False, disable_multiprocessing=False, callback=None,
+                    backend=None, call_site=None):
+    """ process a list of tasks with a suitable executor backend
+
+    @param backend: explicitly chosen executor backend (ExecutorBackend or its name)
+    @param call_site: name of the caller (e.g. "drop_cutter") - used for looking up the backend
+        configured for this call site (see "set_executor_backend")
+    """
+    executor = get_executor(backend=backend, call_site=call_site,
+                            disable_multiprocessing=disable_multiprocessing)
+    return executor.run(func, args, unordered=unordered, callback=callback)
 
 
 def is_pool_available():
-    return __manager is not None
+    return __task_client is not None
 
 
 def is_multiprocessing_available():
@@ -137,61 +138,153 @@ def get_number_of_cores():
 
 
 def get_pool_statistics():
-    global __manager
-    if __manager is None:
+    if __task_client is None:
         return []
     else:
-        return __manager.statistics().get_worker_statistics()
+        return __task_client.get_statistics().get("workers", [])
 
 
 def get_task_statistics():
-    global __manager
     result = {}
-    if __manager is not None:
-        try:
-            result["tasks"] = __manager.tasks().qsize()
-            result["results"] = __manager.results().qsize()
-        except NotImplementedError:
-            # this can happen on MacOS (see multiprocessing doc)
-            pass
-        result["pending"] = __manager.pending_tasks().length()
-        result["cache"] = __manager.cache().length()
+    if __task_client is not None:
+        result.update(__task_client.get_statistics())
+        result.pop("workers", None)
     return result
 
 
-class ManagerInfo:
-    """ this separate class allows proper pickling for "multiprocesssing"
+def _get_executor_backend_value(backend):
+    if isinstance(backend, ExecutorBackend):
+        return backend
+    try:
+        return ExecutorBackend(backend)
+    except ValueError:
+        raise InvalidKeyError(backend, ExecutorBackend)
+
+
+def set_executor_backend(backend, call_site=None):
+    """ configure the executor backend for a call site or the default for all call sites
+
+    @param backend: ExecutorBackend (or its name) - None restores the automatic selection
+    @param call_site: name of a call site (e.g. "push_cutter") or None for the default
     """
+    if backend is None:
+        __executor_backends.pop(call_site, None)
+    else:
+        __executor_backends[call_site] = _get_executor_backend_value(backend)
 
-    def __init__(self, tasks, results, stats, cache, pending):
-        self.tasks_queue = tasks
-        self.results_queue = results
-        self.statistics = stats
-        self.cache = cache
-        self.pending_tasks = pending
 
-    def get_tasks_queue(self):
-        return self.tasks_queue
+def parse_executor_backend_setting(text):
+    """ parse a backend setting given as "BACKEND" or "CALL_SITE=BACKEND"
 
-    def get_results_queue(self):
-        return self.results_queue
+    @returns: tuple of call site (None for the default) and ExecutorBackend
+    """
+    if "=" in text:
+        call_site, backend = text.split("=", 1)
+        call_site = call_site.strip() or None
+    else:
+        call_site, backend = None, text
+    return call_site, _get_executor_backend_value(backend.strip())
 
-    def get_statistics(self):
-        return self.statistics
 
-    def get_cache(self):
-        return self.cache
+def get_executor_backends():
+    """ return the configured backends by call site (the default is stored as "None") """
+    return dict(__executor_backends)
+
+
+def reset_executor_backends():
+    __executor_backends.clear()
+
+
+def _warn_once(key, message, *args):
+    if key not in __issued_warnings:
+        log.warning(message, *args)
+        __issued_warnings.append(key)
+
 
-    def get_pending_tasks(self):
-        return self.pending_tasks
+def _get_automatic_executor_backend():
+    if __task_client is not None:
+        return ExecutorBackend.REMOTE
+    elif pycam.Utils.log.is_debug():
+        # force serial processing in debug mode
+        return ExecutorBackend.SERIAL
+    elif __multiprocessing:
+        return ExecutorBackend.PROCESS
+    else:
+        return ExecutorBackend.SERIAL
+
+
+def get_executor(backend=None, call_site=None, disable_multiprocessing=False):
+    """ return the executor for an explicitly requested backend or for a call site
+
+    Unavailable backends (e.g. "remote" without a task server) are replaced with the best
+    available alternative.
+    """
+    if __multiprocessing is None:
+        # threading was not configured before
+        init_threading()
+    if disable_multiprocessing:
+        backend = ExecutorBackend.SERIAL
+    elif backend is None:
+        backend = __executor_backends.get(call_site, __executor_backends.get(None))
+    if backend is None:
+        backend = _get_automatic_executor_backend()
+    else:
+        backend = _get_executor_backend_value(backend)
+    if (backend == ExecutorBackend.REMOTE) and (__task_client is None):
+        _warn_once("executor_remote_missing", "The 'remote' executor requires server mode - "
+                   "falling back to local processing")
+        backend = ExecutorBackend.PROCESS
+    if (backend == ExecutorBackend.PROCESS) and not (__multiprocessing and __num_of_processes):
+        backend = ExecutorBackend.SERIAL
+    try:
+        return __executors[backend]
+    except KeyError:
+        pass
+    if backend == ExecutorBackend.SERIAL:
+        executor = SerialExecutor()
+    elif backend == ExecutorBackend.THREAD:
+        executor = ThreadExecutor(__num_of_processes or get_number_of_cores() or 1)
+    elif backend == ExecutorBackend.PROCESS:
+        executor = ProcessExecutor(__multiprocessing, __num_of_processes)
+    elif backend == ExecutorBackend.REMOTE:
+        executor = RemoteExecutor(__task_client)
+    else:
+        raise InvalidKeyError(backend, ExecutorBackend)
+    __executors[backend] = executor
+    return executor
+
+
+def _shutdown_executors():
+    for executor in __executors.values():
+        executor.shutdown()
+    __executors.clear()
+
+
+def parse_server_address(remote):
+    """ split a server address ("HOST" or "HOST:PORT") into host and port """
+    if ":" in remote:
+        host, port = remote.split(":", 1)
+        try:
+            port = int(port)
+        except ValueError:
+            log.warning("Invalid port specified: '%s' - using default port (%d) instead",
+                        port, DEFAULT_PORT)
+            port = DEFAULT_PORT
+    else:
+        host = remote
+        port = DEFAULT_PORT
+    return host, port
 
 
 def init_threading(number_of_processes=None, enable_server=False, remote=None, run_server=False,
                    server_credentials="", local_port=DEFAULT_PORT):
-    global __multiprocessing, __num_of_processes, __manager, __closing, __task_source_uuid
+    global __multiprocessing, __num_of_processes, __server, __task_client
     if __multiprocessing:
         # kill the manager and clean everything up for a re-initialization
         cleanup()
+    else:
+        # the executors depend on the settings below
+        _shutdown_executors()
     if (not is_server_mode_available()) and (enable_server or run_server):
         # server mode is disabled for the Windows pyinstaller standalone
         # due to "pickle errors". How to reproduce: run the standalone binary
@@ -247,20 +340,17 @@ def init_threading(number_of_processes=None, enable_server=False, remote=None, r
         else:
             __multiprocessing = multiprocessing
             __num_of_processes = number_of_processes
-    # initialize the manager
+    # initialize the task server
     if not __multiprocessing:
-        __manager = None
         log.info("Disabled parallel processing")
     elif not enable_server and not run_server:
-        __manager = None
         log.info("Enabled %d parallel local processes", __num_of_processes)
     else:
+        # the remote module is only required for server mode
+        import pycam.Utils.remote
         # with multiprocessing
         log.info("Enabled %d parallel local processes", __num_of_processes)
         log.info("Allow remote processing")
-        # initialize the uuid list for all workers
-        worker_uuid_list = [str(uuid.uuid1()) for index in range(__num_of_processes)]
-        __task_source_uuid = str(uuid.uuid1())
         if remote is None:
             # try to guess an appropriate interface for binding
             if pycam.Utils.get_platform() == pycam.Utils.OSPlatform.WINDOWS:
@@ -271,392 +361,432 @@ def init_threading(number_of_processes=None, enable_server=False, remote=None, r
                     log.info("Binding to local interface with IP %s", str(all_ips[0]))
                 else:
                     raise CommunicationError("Failed to find any local IP")
+                connect_address = address
             else:
                 # empty hostname -> wildcard interface
                 # (this does not work with Windows - see above)
                 address = ('', local_port)
+                connect_address = ("localhost", local_port)
         else:
-            if ":" in remote:
-                host, port = remote.split(":", 1)
-                try:
-                    port = int(port)
-                except ValueError:
-                    log.warning("Invalid port specified: '%s' - using default port (%d) instead",
-                                port, DEFAULT_PORT)
-                    port = DEFAULT_PORT
-            else:
-                host = remote
-                port = DEFAULT_PORT
-            address = (host, port)
-        if remote is None:
-            tasks_queue = multiprocessing.Queue()
-            results_queue = multiprocessing.Queue()
-            statistics = ProcessStatistics()
-            cache = ProcessDataCache()
-            pending_tasks = PendingTasks()
-            info = ManagerInfo(tasks_queue, results_queue, statistics, cache, pending_tasks)
-            TaskManager.register("tasks", callable=info.get_tasks_queue)
-            TaskManager.register("results", callable=info.get_results_queue)
-            TaskManager.register("statistics", callable=info.get_statistics)
-            TaskManager.register("cache", callable=info.get_cache)
-            TaskManager.register("pending_tasks", callable=info.get_pending_tasks)
-        else:
-            TaskManager.register("tasks")
-            TaskManager.register("results")
-            TaskManager.register("statistics")
-            TaskManager.register("cache")
-            TaskManager.register("pending_tasks")
-        __manager = TaskManager(address=address, authkey=server_credentials)
+            address = parse_server_address(remote)
+            connect_address = address
         # run the local server, connect to a remote one or begin serving
         try:
             if remote is None:
-                __manager.start()
+                __server = pycam.Utils.remote.TaskServerThread(address, server_credentials)
+                __server.start()
                 log.info("Started a local server.")
-            else:
-                __manager.connect()
-                log.info("Connected to a remote task server.")
-        except (multiprocessing.AuthenticationError, socket.error) as err_msg:
-            __manager = None
+            if not run_server:
+                __task_client = pycam.Utils.remote.TaskClient(connect_address, server_credentials)
+                __task_client.connect()
+                if remote is not None:
+                    log.info("Connected to a remote task server.")
+        except (CommunicationError, OSError) as err_msg:
+            cleanup()
             return err_msg
-        except EOFError:
-            __manager = None
-            raise CommunicationError("Failed to bind to socket for unknown reasons")
-        # create the spawning process
-        __closing = __manager.Value("b", False)
-        if __num_of_processes > 0:
-            # only start the spawner, if we want to use local workers
-            spawner = __multiprocessing.Process(name="spawn", target=_spawn_daemon,
-                                                args=(__manager, __num_of_processes,
-                                                      worker_uuid_list))
-            spawner.start()
-        else:
-            spawner = None
+        # start the local workers - each of them uses its own connection to the server
+        # use only the hostname (for brevity) - no domain part
+        hostname = platform.node().split(".", 1)[0]
+        for index in range(__num_of_processes):
+            worker_name = "%s-%s" % (hostname, uuid.uuid1())
+            worker = __multiprocessing.Process(
+                name=worker_name, target=pycam.Utils.remote.run_worker,
+                args=(connect_address, server_credentials, worker_name),
+                # standalone workers wait for their server
+                kwargs={"reconnect": run_server and (remote is not None)}, daemon=True)
+            worker.start()
+            __workers.append(worker)
         # wait forever - in case of a server
         if run_server:
             log.info("Running a local server and waiting for remote connections.")
             # the server can be stopped via CTRL-C - it is caught later
-            if spawner is not None:
-                spawner.join()
+            if __server is not None:
+                __server.join()
+            else:
+                for worker in __workers:
+                    worker.join()
 
 
 def cleanup():
-    global __multiprocessing, __manager, __closing
-    if __multiprocessing and __closing:
-        log.debug("Shutting down process handler")
-        try:
-            __closing.set(True)
-        except (IOError, EOFError):
-            log.debug("Connection to manager lost during cleanup")
-        # Only managers that were started via ".start()" implement a "shutdown".
-        # Managers started via ".connect" may skip this.
-        if hasattr(__manager, "shutdown"):
-            # wait for the spawner and the worker threads to go down
-            time.sleep(2.5)
-            # __manager.shutdown()
-            time.sleep(0.1)
-            # check if it is still alive and kill it if necessary
-            if __manager._process.is_alive():
-                __manager._process.terminate()
-    __manager = None
-    __closing = None
+    global __multiprocessing, __server, __task_client, __workers
+    _shutdown_executors()
+    if __task_client is not None:
+        log.debug("Closing connection to task server")
+        __task_client.stop()
+    for worker in __workers:
+        if worker.is_alive():
+            worker.terminate()
+        worker.join()
+    if __server is not None:
+        log.debug("Shutting down task server")
+        __server.stop()
+    __server = None
+    __task_client = None
+    __workers = []
     __multiprocessing = None
 
 
-def _spawn_daemon(manager, number_of_processes, worker_uuid_list):
-    """ wait for items in the 'tasks' queue to appear and then spawn workers
+def _get_shutdown_exception():
+    return AbortOperationException("Parallel processing was aborted: the executor was shut down")
+
+
+def _process_chunk(func_and_args):
+    """ process a chunk of tasks within a worker and measure the time spent for all of them """
+    func, args_chunk = func_and_args
+    start_time = time.time()
+    results = [func(args) for args in args_chunk]
+    return results, time.time() - start_time
+
+
+class AdaptiveTaskChunker:
+    """ split a list of tasks into chunks based on the measured runtime of previous tasks
+
+    Cheap tasks (e.g. grid lines above empty stock) are grouped into larger chunks in order to
+    reduce the transfer overhead, while expensive tasks are handed out one by one.  Chunks are
+    never bigger than a fraction of the remaining work.  Thus the final chunks get smaller and
+    idle workers can pick up (steal) the pending work instead of waiting for a single busy
+    worker.
     """
-    global __multiprocessing, __closing
-    tasks = manager.tasks()
-    results = manager.results()
-    stats = manager.statistics()
-    cache = manager.cache()
-    pending_tasks = manager.pending_tasks()
-    log.debug("Spawner daemon started with %d processes", number_of_processes)
-    log.debug("Registering %d worker threads: %s", len(worker_uuid_list), worker_uuid_list)
-    last_cache_update = time.time()
-    # use only the hostname (for brevity) - no domain part
-    hostname = platform.node().split(".", 1)[0]
-    try:
-        while not __closing.get():
-            # check the expire timeout of the cache from time to time
-            if last_cache_update + 30 < time.time():
-                cache.expire_cache_items()
-                last_cache_update = time.time()
-            if not tasks.empty():
-                workers = []
-                for task_id in worker_uuid_list:
-                    task_name = "%s-%s" % (hostname, task_id)
-                    worker = __multiprocessing.Process(name=task_name, target=_handle_tasks,
-                                                       args=(tasks, results, stats, cache,
-                                                             pending_tasks, __closing))
-                    worker.start()
-                    workers.append(worker)
-                # wait until all workers are finished
-                for worker in workers:
-                    worker.join()
-            else:
-                time.sleep(1.0)
-    except KeyboardInterrupt:
-        log.info("Spawner daemon killed by keyboard interrupt")
-        # set the "closing" flag and just exit
-        try:
-            __closing.set(True)
-        except (IOError, EOFError):
-            pass
-    except (IOError, EOFError):
-        # the connection was closed
-        log.info("Spawner daemon lost connection to server")
-
-
-def _handle_tasks(tasks, results, stats, cache, pending_tasks, closing):
-    global __multiprocessing
-    name = __multiprocessing.current_process().name
-    local_cache = ProcessDataCache()
-    timeout_limit = 60
-    timeout_counter = 0
-    last_worker_notification = 0
-    log.debug("Worker thread started: %s" % name)
-    try:
-        while (timeout_counter < timeout_limit) and not closing.get():
-            if last_worker_notification + 30 < time.time():
-                stats.worker_notification(name)
-                last_worker_notification = time.time()
-            start_time = time.time()
-            try:
-                job_id, task_id, func, args = tasks.get(timeout=0.2)
-            except queue.Empty:
-                time.sleep(1.8)
-                timeout_counter += 1
-                continue
-            # TODO: if the client aborts/disconnects between "tasks.get" and
-            # "pending_tasks.add", the task is lost. We should better use some
-            # backup.
-            pending_tasks.add(job_id, task_id, (func, args))
-            log.debug("Worker %s processes %s / %s", name, job_id, task_id)
-            # reset the timeout counter, if we found another item in the queue
-            timeout_counter = 0
-            real_args = []
-            for arg in args:
-                if isinstance(arg, ProcessDataCacheItemID):
-                    try:
-                        value = local_cache.get(arg)
-                    except KeyError:
-                        # TODO: we will break hard, if the item is expired
-                        value = cache.get(arg)
-                        local_cache.add(arg, value)
-                    real_args.append(value)
-                elif isinstance(arg, list) and [True for item in arg
-                                                if isinstance(item, ProcessDataCacheItemID)]:
-                    # check if any item in the list is cacheable
-                    args_list = []
-                    for item in arg:
-                        if isinstance(item, ProcessDataCacheItemID):
-                            try:
-                                value = local_cache.get(item)
-                            except KeyError:
-                                value = cache.get(item)
-                                local_cache.add(item, value)
-                            args_list.append(value)
-                        else:
-                            args_list.append(item)
-                    real_args.append(args_list)
-                else:
-                    real_args.append(arg)
-            stats.add_transfer_time(name, time.time() - start_time)
-            start_time = time.time()
-            results.put((job_id, task_id, func(real_args)))
-            pending_tasks.remove(job_id, task_id)
-            stats.add_process_time(name, time.time() - start_time)
-    except KeyboardInterrupt:
+
+    def __init__(self, args, number_of_workers, target_chunk_duration=0.25, max_chunk_size=64):
+        self._args = list(args)
+        self._number_of_workers = max(1, number_of_workers)
+        self._target_chunk_duration = target_chunk_duration
+        self._max_chunk_size = max_chunk_size
+        self._next_index = 0
+        self._processed_count = 0
+        self._processed_time = 0.0
+
+    def __len__(self):
+        return len(self._args)
+
+    def is_finished(self):
+        return self._next_index >= len(self._args)
+
+    def add_measurement(self, task_count, duration):
+        self._processed_count += task_count
+        self._processed_time += duration
+
+    def get_average_task_duration(self):
+        if self._processed_count == 0:
+            return None
+        else:
+            return self._processed_time / self._processed_count
+
+    def get_chunk_size(self):
+        remaining = len(self._args) - self._next_index
+        # leave enough work for all other workers (guided scheduling)
+        fair_share = max(1, remaining // (2 * self._number_of_workers))
+        average_duration = self.get_average_task_duration()
+        if average_duration is None:
+            # no measurements, yet: start with single tasks
+            wanted = 1
+        elif average_duration <= 0:
+            wanted = self._max_chunk_size
+        else:
+            wanted = int(self._target_chunk_duration / average_duration)
+        return max(1, min(wanted, fair_share, self._max_chunk_size))
+
+    def get_next_chunk(self):
+        """ return the index of the first task and a list of tasks (or None if finished) """
+        if self.is_finished():
+            return None
+        start_index = self._next_index
+        self._next_index += self.get_chunk_size()
+        return start_index, self._args[start_index:self._next_index]
+
+
+class BaseExecutor:
+    """ interface of all executor backends
+
+    An executor processes a list of tasks and yields their results.  Executors may keep their
+    resources (e.g. a pool of processes) between calls.
+    """
+
+    def run(self, func, args, unordered=False, callback=None):
+        """ return a generator of the results of "func" applied to every item of "args"
+
+        @param unordered: the results may be returned in any order
+        @param callback: function to be called for every result - a non-False return value
+            indicates a cancel request
+        """
+        raise NotImplementedError
+
+    def shutdown(self):
+        """ release all resources of the executor """
         pass
-    log.debug("Worker thread finished after %d seconds of inactivity: %s", timeout_counter, name)
 
 
-def run_in_parallel_remote(func, args_list, unordered=False, disable_multiprocessing=False,
-                           callback=None):
-    global __multiprocessing, __num_of_processes, __manager, __task_source_uuid, __finished_jobs
-    if __multiprocessing is None:
-        # threading was not configured before
-        init_threading()
-    if __multiprocessing and not disable_multiprocessing:
-        job_id = str(uuid.uuid1())
-        log.debug("Starting parallel tasks: %s", job_id)
-        tasks_queue = __manager.tasks()
-        results_queue = __manager.results()
-        remote_cache = __manager.cache()
-        stats = __manager.statistics()
-        pending_tasks = __manager.pending_tasks()
-        # add all tasks of this job to the queue
-        for index, args in enumerate(args_list):
-            if callback:
-                callback()
-            start_time = time.time()
-            result_args = []
-            for arg in args:
-                # add the argument to the cache if possible
-                if hasattr(arg, "uuid"):
-                    data_uuid = ProcessDataCacheItemID(arg.uuid)
-                    if not remote_cache.contains(data_uuid):
-                        log.debug("Adding cache item for job %s: %s - %s",
-                                  job_id, arg.uuid, arg.__class__)
-                        remote_cache.add(data_uuid, arg)
-                    result_args.append(data_uuid)
-                elif isinstance(arg, (list, set, tuple)):
-                    # a list with - maybe containing cacheable items
-                    new_arg_list = []
-                    for item in arg:
-                        try:
-                            data_uuid = ProcessDataCacheItemID(item.uuid)
-                        except AttributeError:
-                            # non-cacheable item
-                            new_arg_list.append(item)
-                            continue
-                        if not remote_cache.contains(data_uuid):
-                            log.debug("Adding cache item from list for job %s: %s - %s",
-                                      job_id, item.uuid, item.__class__)
-                            remote_cache.add(data_uuid, item)
-                        new_arg_list.append(data_uuid)
-                    result_args.append(new_arg_list)
-                else:
-                    result_args.append(arg)
-            tasks_queue.put((job_id, index, func, result_args))
-            stats.add_queueing_time(__task_source_uuid, time.time() - start_time)
-        log.debug("Added %d tasks for job %s", len(args_list), job_id)
-        result_buffer = {}
-        index = 0
-        cancelled = False
-        # wait for all results of this job
-        while (index < len(args_list)) and not cancelled:
+class SerialExecutor(BaseExecutor):
+    """ process all tasks one after another within the current thread """
+
+    def run(self, func, args, unordered=False, callback=None):
+        for arg in args:
             if callback and callback():
                 # cancel requested
-                cancelled = True
                 break
-            # re-inject stale tasks if necessary
-            stale_task = pending_tasks.get_stale_task()
-            if stale_task:
-                stale_job_id, stale_task_id = stale_task[:2]
-                if stale_job_id in __finished_jobs:
-                    log.debug("Throwing away stale task of an old job: %s", stale_job_id)
-                    pending_tasks.remove(stale_job_id, stale_task_id)
-                elif stale_job_id == job_id:
-                    log.debug("Reinjecting stale task: %s / %s", job_id, stale_task_id)
-                    stale_func, stale_args = stale_task[2]
-                    tasks_queue.put((job_id, stale_task_id, stale_func, stale_args))
-                    pending_tasks.remove(job_id, stale_task_id)
+            yield func(arg)
+
+
+class _ChunkingExecutor(BaseExecutor):
+    """ base class for executors handing out chunks of tasks to a pool of local workers
+
+    Multiple runs may use the executor at the same time (e.g. for concurrent steps of a
+    processing flow).  The pool is shared between them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active_runs = 0
+
+    def _get_number_of_workers(self):
+        raise NotImplementedError
+
+    def _submit_chunk(self, func, args_chunk, deliver):
+        """ process a chunk of tasks and call "deliver(result, exception)" when it is finished """
+        raise NotImplementedError
+
+    def _abort(self):
+        """ discard the chunks of an interrupted run """
+        raise NotImplementedError
+
+    def run(self, func, args, unordered=False, callback=None):
+        with self._lock:
+            self._active_runs += 1
+        number_of_workers = self._get_number_of_workers()
+        chunker = AdaptiveTaskChunker(args, number_of_workers)
+        # The workers deliver finished chunks via this queue.
+        finished_chunks = queue.Queue()
+        # keep a few chunks queued for every worker - idle workers pick them up immediately
+        max_pending_chunks = 2 * number_of_workers
+        pending_chunks = 0
+
+        def submit_chunk():
+            start_index, args_chunk = chunker.get_next_chunk()
+            self._submit_chunk(func, args_chunk,
+                               lambda result, exc: finished_chunks.put(
+                                   (start_index, len(args_chunk), result, exc)))
+
+        is_complete = False
+        try:
+            result_buffer = {}
+            next_index = 0
+            # "next_index" counts the results that were already delivered
+            while next_index < len(chunker):
+                while (pending_chunks < max_pending_chunks) and not chunker.is_finished():
+                    submit_chunk()
+                    pending_chunks += 1
+                start_index, task_count, result, exc = finished_chunks.get()
+                pending_chunks -= 1
+                if exc is not None:
+                    raise exc
+                results, duration = result
+                chunker.add_measurement(task_count, duration)
+                if unordered:
+                    ready_results = results
+                    next_index += task_count
                 else:
-                    # non-local task
-                    log.debug("Ignoring stale non-local task: %s / %s",
-                              stale_job_id, stale_task_id)
-            try:
-                result_job_id, task_id, result = results_queue.get(timeout=1.0)
-            except queue.Empty:
-                time.sleep(1.0)
-                continue
-            if result_job_id == job_id:
-                log.debug("Received the result of a task: %s / %s", job_id, task_id)
-                try:
+                    result_buffer[start_index] = results
+                    ready_results = []
+                    while next_index in result_buffer:
+                        chunk_results = result_buffer.pop(next_index)
+                        ready_results.extend(chunk_results)
+                        next_index += len(chunk_results)
+                for result in ready_results:
+                    if callback and callback():
+                        # cancel requested
+                        return
+                    yield result
+            is_complete = True
+        finally:
+            # This is also reached via GeneratorExit - i.e. when the caller stops requesting
+            # more items from the generator.
+            with self._lock:
+                self._active_runs -= 1
+                # the pool may not be discarded while other runs are using it
+                if not is_complete and (self._active_runs == 0):
+                    self._abort()
+
+
+class ThreadExecutor(_ChunkingExecutor):
+    """ process tasks in a pool of threads within the current process
+
+    The arguments and results of the tasks are not pickled.  This is efficient for functions
+    releasing the GIL - otherwise the threads merely interleave.
+    """
+
+    def __init__(self, number_of_workers):
+        super().__init__()
+        self._number_of_workers = max(1, number_of_workers)
+        self._pool = None
+
+    def _get_number_of_workers(self):
+        return self._number_of_workers
+
+    def _submit_chunk(self, func, args_chunk, deliver):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._number_of_workers, thread_name_prefix="pycam-executor")
+            pool = self._pool
+
+        def handle_finished_chunk(future):
+            if future.cancelled():
+                # the executor was shut down before the chunk was started
+                deliver(None, _get_shutdown_exception())
+            else:
+                exc = future.exception()
+                deliver(None if exc else future.result(), exc)
+
+        pool.submit(_process_chunk, (func, args_chunk)).add_done_callback(
+            handle_finished_chunk)
+
+    def _abort(self):
+        # running threads cannot be stopped - but pending chunks are dropped
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class ProcessExecutor(_ChunkingExecutor):
+    """ process tasks in a pool of local processes
+
+    The pool is kept alive between calls.  It is only restarted after an interrupted run.
+    """
+
+    def __init__(self, multiprocessing_module, number_of_workers):
+        super().__init__()
+        self._multiprocessing = multiprocessing_module
+        self._number_of_workers = max(1, number_of_workers)
+        self._pool = None
+        # A terminated pool does not report its unfinished chunks.  Thus we need to keep track
+        # of them (see "shutdown").  This lock is separate, since "_abort" is called while
+        # holding "_lock".
+        self._unfinished_lock = threading.Lock()
+        self._unfinished_chunks = {}
+
+    def _get_number_of_workers(self):
+        return self._number_of_workers
+
+    def _submit_chunk(self, func, args_chunk, deliver):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._multiprocessing.Pool(self._number_of_workers)
+            pool = self._pool
+        chunk_id = uuid.uuid4()
+
+        def deliver_once(result, exc):
+            with self._unfinished_lock:
+                if self._unfinished_chunks.pop(chunk_id, None) is None:
+                    # the chunk was already reported as cancelled
+                    return
+            deliver(result, exc)
+
+        with self._unfinished_lock:
+            self._unfinished_chunks[chunk_id] = deliver
+        pool.apply_async(_process_chunk, ((func, args_chunk), ),
+                         callback=lambda result: deliver_once(result, None),
+                         error_callback=lambda exc: deliver_once(None, exc))
+
+    def _abort(self):
+        # stop the remaining chunks of this run - a new pool is started for the next run
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        with self._unfinished_lock:
+            cancelled_chunks = list(self._unfinished_chunks.values())
+            self._unfinished_chunks.clear()
+        for deliver in cancelled_chunks:
+            deliver(None, _get_shutdown_exception())
+
+
+class RemoteExecutor(BaseExecutor):
+    """ submit tasks to a task server - they are processed by local or remote workers """
+
+    def __init__(self, task_client):
+        self._task_client = task_client
+
+    def run(self, func, args, unordered=False, callback=None):
+        import pycam.Utils.remote
+        task_client = self._task_client
+        job_id = str(uuid.uuid1())
+        log.debug("Starting parallel tasks: %s", job_id)
+        task_client.register_job(job_id)
+        try:
+            # add all tasks of this job in batches - the workers start immediately
+            tasks = []
+            items = {}
+            for index, task_args in enumerate(args):
+                if callback and callback():
+                    # cancel requested - the remaining tasks are not submitted
+                    log.debug("Parallel processing cancelled during submission: %s", job_id)
+                    return
+                result_args = []
+                for arg in task_args:
+                    # add the argument to the cache if possible
+                    if hasattr(arg, "uuid"):
+                        task_client.prepare_cache_item(job_id, arg.uuid, arg, items)
+                        result_args.append(ProcessDataCacheItemID(arg.uuid))
+                    elif (isinstance(arg, (list, set, tuple))
+                          and any(hasattr(item, "uuid") for item in arg)):
+                        # a list containing cacheable items (other lists are kept unchanged)
+                        new_arg_list = []
+                        for item in arg:
+                            if hasattr(item, "uuid"):
+                                task_client.prepare_cache_item(job_id, item.uuid, item, items)
+                                new_arg_list.append(ProcessDataCacheItemID(item.uuid))
+                            else:
+                                # non-cacheable item
+                                new_arg_list.append(item)
+                        result_args.append(new_arg_list)
+                    else:
+                        result_args.append(arg)
+                tasks.append((index, result_args))
+                if len(tasks) >= pycam.Utils.remote.SUBMIT_BATCH_SIZE:
+                    task_client.submit_tasks(job_id, func, tasks, items)
+                    tasks = []
+                    items = {}
+            if tasks:
+                task_client.submit_tasks(job_id, func, tasks, items)
+            log.debug("Added %d tasks for job %s", len(args), job_id)
+            result_buffer = {}
+            index = 0
+            # wait for all results of this job
+            while index < len(args):
+                if callback and callback():
+                    # cancel requested
+                    log.debug("Parallel processing cancelled: %s", job_id)
+                    break
+                # Block until results are available.  The timeout just allows us to react on
+                # cancel requests.
+                for task_id, result, error in task_client.get_results(job_id, timeout=1.0):
+                    if error is not None:
+                        raise CommunicationError("Remote task %s / %s failed: %s"
+                                                 % (job_id, task_id, error))
+                    log.debug("Received the result of a task: %s / %s", job_id, task_id)
                     if unordered:
                         # just return the values in any order
                         yield result
                         index += 1
                     else:
                         # return the results in order (based on task_id)
-                        if task_id == index:
-                            yield result
+                        result_buffer[task_id] = result
+                        while index in result_buffer:
+                            yield result_buffer.pop(index)
                             index += 1
-                            while index in result_buffer.keys():
-                                yield result_buffer[index]
-                                del result_buffer[index]
-                                index += 1
-                        else:
-                            result_buffer[task_id] = result
-                except GeneratorExit:
-                    # This exception is triggered when the caller stops
-                    # requesting more items from the generator.
-                    log.debug("Parallel processing cancelled: %s", job_id)
-                    _cleanup_job(job_id, tasks_queue, pending_tasks, __finished_jobs)
-                    # re-raise the GeneratorExit exception to finish destruction
-                    raise
-            elif result_job_id in __finished_jobs:
-                # throw away this result of an old job
-                log.debug("Throwing away one result of an old job: %s", result_job_id)
             else:
-                log.debug("Skipping result of non-local job: %s", result_job_id)
-                # put the result back to the queue for the next manager
-                results_queue.put((result_job_id, task_id, result))
-                # wait a little bit to get some idle CPU cycles
-                time.sleep(0.2)
-        _cleanup_job(job_id, tasks_queue, pending_tasks, __finished_jobs)
-        if cancelled:
-            log.debug("Parallel processing cancelled: %s", job_id)
-        else:
-            log.debug("Parallel processing finished: %s", job_id)
-    else:
-        for args in args_list:
-            yield func(args)
-
-
-def _cleanup_job(job_id, tasks_queue, pending_tasks, finished_jobs):
-    # flush the task queue
-    try:
-        queue_len = tasks_queue.qsize()
-    except NotImplementedError:
-        # this can happen on MacOS (according to the multiprocessing doc)
-        # -> no cleanup of old processes
-        queue_len = 0
-    # remove all remaining tasks with the current job id
-    removed_job_counter = 0
-    for index in range(queue_len):
-        try:
-            this_job_id, task_id, func, args = tasks_queue.get(timeout=0.1)
-        except queue.Empty:
-            break
-        if this_job_id != job_id:
-            tasks_queue.put((this_job_id, task_id, func, args))
-        else:
-            removed_job_counter += 1
-    if removed_job_counter > 0:
-        log.debug("Removed %d remaining tasks for %s", removed_job_counter, job_id)
-    # remove all stale tasks
-    pending_tasks.remove(job_id)
-    # limit the number of stored finished jobs
-    finished_jobs.append(job_id)
-    while len(finished_jobs) > 30:
-        finished_jobs.pop(0)
-
-
-def run_in_parallel_local(func, args, unordered=False, disable_multiprocessing=False,
-                          callback=None):
-    global __multiprocessing, __num_of_processes
-    if __multiprocessing is None:
-        # threading was not configured before
-        init_threading()
-    if __multiprocessing and not disable_multiprocessing:
-        # use the number of CPUs as the default number of worker threads
-        pool = __multiprocessing.Pool(__num_of_processes)
-        if unordered:
-            imap_func = pool.imap_unordered
-        else:
-            imap_func = pool.imap
-        # We need to use try/finally here to ensure the garbage collection
-        # of "pool". Otherwise a memory overflow is caused for Python 2.7.
-        try:
-            # Beware: we may not return "pool.imap" or "pool.imap_unordered"
-            # directly. It would somehow loose the focus and just hang infinitely.
-            # Thus we wrap our own generator around it.
-            for result in imap_func(func, args):
-                if callback and callback():
-                    # cancel requested
-                    break
-                yield result
+                log.debug("Parallel processing finished: %s", job_id)
         finally:
-            pool.terminate()
-    else:
-        for arg in args:
-            if callback and callback():
-                # cancel requested
-                break
-            yield func(arg)
+            # This is also reached via GeneratorExit - i.e. when the caller stops requesting
+            # more items from the generator.
+            task_client.finish_job(job_id)
 
 
 class OneProcess:
@@ -757,113 +887,139 @@ class ProcessStatistics:
 
 
 class PendingTasks:
+    """ tasks that were handed out to a worker, but did not deliver a result, yet """
 
     def __init__(self, stale_timeout=300):
-        # we assume that multiprocessing was imported before
-        import multiprocessing
-        self._lock = multiprocessing.Lock()
+        # (job_id, task_id) -> (start_time, info)
         self._jobs = {}
         self._stale_timeout = stale_timeout
-        # necessary in case of a lost connection
-        self._lock_timeout = 3
 
     def add(self, job_id, task_id, info):
-        # no acquire and release: be as quick as possible (avoid lost tasks)
         self._jobs[(job_id, task_id)] = (time.time(), info)
 
     def remove(self, job_id, task_id=None):
-        self._lock.acquire(block=True, timeout=self._lock_timeout)
         if task_id is None:
             # remove all tasks of this job
-            remove_keys = []
-            for key in list(self._jobs.keys()):
-                if key[0] == job_id:
-                    remove_keys.append(key)
-            for key in remove_keys:
-                try:
-                    del self._jobs[key]
-                except KeyError:
-                    # maybe they were removed in between
-                    pass
+            for key in [key for key in self._jobs if key[0] == job_id]:
+                del self._jobs[key]
         else:
             # remove only a specific task
-            if (job_id, task_id) in self._jobs:
-                del self._jobs[(job_id, task_id)]
-        self._lock.release()
-
-    def get_stale_task(self):
-        self._lock.acquire(block=True, timeout=self._lock_timeout)
-        stale_start_time = time.time() - self._stale_timeout
-        stale_tasks = []
-        # use a copy to prevent "dictionary changed size in iteration" errors
-        current_jobs = list(self._jobs.items())
-        for (job_id, task_id), (start_time, info) in current_jobs:
-            if start_time < stale_start_time:
-                stale_tasks.append((job_id, task_id, info))
-        if stale_tasks:
-            # pick a random task - otherwise some old tasks stop everything
-            result_index = random.randrange(0, len(stale_tasks))
-            result = stale_tasks[result_index]
-        else:
-            result = None
-        self._lock.release()
-        return result
+            self._jobs.pop((job_id, task_id), None)
+
+    def get_age(self, job_id, task_id):
+        return time.time() - self._jobs[(job_id, task_id)][0]
+
+    def get_oldest_tasks(self, min_age=0):
+        """ return all tasks (job_id, task_id, info) running longer than 'min_age' (oldest first)
+        """
+        latest_start_time = time.time() - min_age
+        result = [(start_time, key, info) for key, (start_time, info) in self._jobs.items()
+                  if start_time <= latest_start_time]
+        result.sort(key=lambda item: item[0])
+        return [(job_id, task_id, info) for start_time, (job_id, task_id), info in result]
+
+    def get_stale_tasks(self):
+        """ return the tasks that exceeded the timeout (oldest first) """
+        return self.get_oldest_tasks(min_age=self._stale_timeout)
 
     def length(self):
         return len(self._jobs)
 
 
 class ProcessDataCache:
+    """ least-recently-used cache for data items (e.g. models) with a memory budget
 
-    def __init__(self, timeout=600):
-        self.cache = {}
-        self.timeout = timeout
+    Pinned items (e.g. used by active jobs) are never evicted.  Thus the budget may be exceeded
+    temporarily, if too many items are pinned.
+    """
 
-    def _update_timestamp(self, name):
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        # name -> (value, size)
+        self.cache = collections.OrderedDict()
+        self.max_size = max_size
+        self.size = 0
+        self._pins = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _get_key(name):
         if isinstance(name, ProcessDataCacheItemID):
-            name = name.value
-        now = time.time()
-        try:
-            self.cache[name][1] = now
-        except KeyError:
-            # the item was deleted meanwhile
-            pass
-
-    def expire_cache_items(self):
-        expired = time.time() - self.timeout
-        # use a copy in order to avoid "changed size during iteration" errors
-        for key in list(self.cache):
-            try:
-                if self.cache[key][1] < expired:
-                    del self.cache[key]
-            except KeyError:
-                # ignore removed items
-                pass
+            return name.value
+        else:
+            return name
+
+    def _evict(self, reserved=0):
+        excess = self.size + reserved - self.max_size
+        if excess <= 0:
+            return
+        victims = []
+        # the least recently used items come first
+        for key, (value, size) in self.cache.items():
+            if excess <= 0:
+                break
+            if key not in self._pins:
+                victims.append(key)
+                excess -= size
+        for key in victims:
+            self.size -= self.cache.pop(key)[1]
+            self.evictions += 1
 
     def contains(self, name):
-        if isinstance(name, ProcessDataCacheItemID):
-            name = name.value
-        self._update_timestamp(name)
-        self.expire_cache_items()
-        return name in self.cache.keys()
-
-    def add(self, name, value):
-        now = time.time()
-        if isinstance(name, ProcessDataCacheItemID):
-            name = name.value
-        self.expire_cache_items()
-        self.cache[name] = [value, now]
+        return self._get_key(name) in self.cache
+
+    def add(self, name, value, size=None):
+        """ add an item to the cache
+
+        @param size: the size of the item in bytes (calculated via pickle, if missing)
+        """
+        key = self._get_key(name)
+        if size is None:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if key in self.cache:
+            self.size -= self.cache.pop(key)[1]
+        # make room for the new item - it is kept even if it exceeds the budget on its own
+        self._evict(reserved=size)
+        self.cache[key] = (value, size)
+        self.size += size
 
     def get(self, name):
-        if isinstance(name, ProcessDataCacheItemID):
-            name = name.value
-        self._update_timestamp(name)
-        self.expire_cache_items()
-        return self.cache[name][0]
+        key = self._get_key(name)
+        try:
+            value = self.cache[key][0]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_size(self, name):
+        return self.cache[self._get_key(name)][1]
+
+    def pin(self, name):
+        """ protect an item against eviction - every call requires a matching call of 'unpin' """
+        key = self._get_key(name)
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, name):
+        key = self._get_key(name)
+        count = self._pins.get(key, 0) - 1
+        if count > 0:
+            self._pins[key] = count
+        else:
+            self._pins.pop(key, None)
+            self._evict()
 
     def length(self):
         return len(self.cache)
 
+    def get_statistics(self):
+        return {"items": len(self.cache), "size": self.size, "max_size": self.max_size,
+                "pinned": len(self._pins), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
 
 class ProcessDataCacheItemID:
 
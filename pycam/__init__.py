@@ -18,17 +18,27 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
-import os
-import subprocess
-import re
+import functools
 
 
-try:
-    from Version import VERSION
+@functools.lru_cache(maxsize=None)
+def get_version():
+    """ determine the version of PyCAM
+
+    The version is taken from "Version.py" (if available) or from the git repository.  The
+    latter requires calls of external programs.  Thus the version is determined on first access.
+    """
+    try:
+        from Version import VERSION
+        return VERSION
+    except ImportError:
+        pass
 
-except ImportError:
     # Failed to import Version.py, we must be running out of a git
     # checkout, so generate the version info from git tags.
+    import os
+    import re
+    import subprocess
 
     #
     # These variables should only be changed by the release manager when
@@ -73,23 +83,30 @@ except ImportError:
         if current_branch == parent_branch:
             # We're on master or on a stable/release branch, so the
             # version number is just the 'git describe' output.
-            VERSION = git_describe
+            version = git_describe
 
         else:
             # We're on a temporary branch, so make a version number that
             # sorts as *older than* nearby release versions.
             parts = git_describe.split('-')
             parts[0] = parts[0] + '~' + current_branch
-            VERSION = '-'.join(parts)
+            version = '-'.join(parts)
 
         # No matter how we made the version string, replace every "-"
         # with ".", because that's what Debian version numbers expect.
         # https://www.debian.org/doc/debian-policy/ch-controlfields.html#s-f-Version
-        VERSION = VERSION.replace('-', '.')
+        return version.replace('-', '.')
 
     except (subprocess.CalledProcessError, OSError):
         # No pycam/Version.py and git failed to give us a version number, give up.
-        VERSION = "0.0-unknown"
+        return "0.0-unknown"
+
+
+def __getattr__(name):
+    # "VERSION" is determined on first access (see "get_version")
+    if name == "VERSION":
+        return get_version()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 DOC_BASE_URL = "http://pycam.sourceforge.net/%s/"
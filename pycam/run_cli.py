@@ -23,20 +23,27 @@ import argparse
 import logging
 import os
 import sys
+import time
+
+import yaml
 
 try:
-    from pycam import VERSION
+    import pycam
 except ImportError:
     # running locally (without a proper PYTHONPATH) requires manual intervention
     sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
                                                      os.pardir)))
-    from pycam import VERSION
+    import pycam
 
 import pycam.errors
-from pycam.Flow.parser import parse_yaml
+from pycam.Flow.parser import parse_yaml, update_from_yaml
+from pycam.Flow.scheduler import FlowScheduler, get_affected_keys, get_dependency_graph
 import pycam.Utils
 import pycam.Utils.log
+import pycam.Utils.threading
+from pycam.workspace import CollectionName
 import pycam.workspace.data_models
+import pycam.workspace.persistent_cache
 
 
 _log = pycam.Utils.log.get_logger()
@@ -46,6 +53,21 @@ LOG_LEVELS = {"debug": logging.DEBUG,
               "warning": logging.WARNING,
               "error": logging.ERROR, }
 
+# seconds between two checks for changed flow description files (see "--watch")
+WATCH_INTERVAL = 1
+
+
+class ShowVersionAction(argparse.Action):
+    """ show the version of PyCAM - it is determined only on demand (see "pycam.get_version") """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS,
+                 help="show program's version number and exit"):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0,
+                         help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        parser.exit(message="{} {}\n".format(parser.prog, pycam.get_version()))
+
 
 def get_args():
     parser = argparse.ArgumentParser(prog="PyCAM", description="scriptable PyCAM processing flow",
@@ -54,8 +76,155 @@ def get_args():
                         help="choose the verbosity of log messages")
     parser.add_argument("sources", metavar="FLOW_SPEC", type=argparse.FileType('r'), nargs="+",
                         help="processing flow description files in yaml format")
-    parser.add_argument("--version", action="version", version="%(prog)s {}".format(VERSION))
-    return parser.parse_args()
+    parser.add_argument("--version", action=ShowVersionAction)
+    parser.add_argument(
+        "--validate", dest="validate", default=False, action="store_true",
+        help=("check the structure of the flow description (e.g. references and parameter "
+              "ranges) without calculating anything"))
+    parser.add_argument(
+        "--watch", dest="watch", default=False, action="store_true",
+        help=("keep running and process the flow description files again after every change - "
+              "only the exports affected by the changes are calculated again"))
+    group_processing = parser.add_argument_group("Processing")
+    group_processing.add_argument(
+        "--number-of-processes", dest="parallel_processes", default=None, type=int,
+        help="override the default detection of multiple CPU cores")
+    group_processing.add_argument(
+        "--enable-server", dest="enable_server", default=False, action="store_true",
+        help="enable a local server and (optionally) remote worker servers")
+    group_processing.add_argument(
+        "--remote-server", dest="remote_server", default=None,
+        help=("Connect to a remote task server to distribute the processing load. "
+              "The server is given as an IP or a hostname with an optional port (default: 1250) "
+              "separated by a colon."))
+    group_processing.add_argument(
+        "--server-auth-key", dest="server_authkey", default="",
+        help=("Secret used for connecting to a remote server or for granting access to remote "
+              "clients."))
+    group_processing.add_argument(
+        "--executor-backend", dest="executor_backends", default=[], action="append",
+        metavar="[CALL_SITE=]BACKEND",
+        help=("Choose the executor backend for parallel calculations: serial, thread, process or "
+              "remote. The backend can be restricted to a specific call site (e.g. "
+              "'push_cutter=thread'). This option may be specified multiple times."))
+    group_processing.add_argument(
+        "--concurrent-steps", dest="concurrent_steps", default=None, type=int,
+        help=("maximum number of independent steps of the processing flow (e.g. toolpaths or "
+              "exports) to be calculated at the same time (default: number of processes)"))
+    group_cache = parser.add_argument_group("Cache")
+    group_cache.add_argument(
+        "--toolpath-cache", dest="toolpath_cache_dir", action="store_const",
+        const=os.path.join(pycam.workspace.persistent_cache.get_default_cache_directory(),
+                           "toolpaths"),
+        help=("Store calculated toolpaths in %(const)s. Unchanged tasks are not calculated "
+              "again in later runs - even if their export settings changed. The cache is "
+              "disabled by default."))
+    group_cache.add_argument(
+        "--toolpath-cache-dir", dest="toolpath_cache_dir", default=None, metavar="DIRECTORY",
+        help="store calculated toolpaths in the given directory (see --toolpath-cache)")
+    group_cache.add_argument(
+        "--disable-toolpath-cache", dest="toolpath_cache_dir", action="store_const", const=None,
+        help="calculate all toolpaths - without storing them for later runs (default)")
+    group_cache.add_argument(
+        "--cache-memory-limit", dest="cache_memory_limit", default=None, type=float,
+        metavar="MEGABYTES",
+        help=("memory budget for intermediate results (e.g. models and toolpaths) kept during "
+              "processing (default: {:d})").format(
+                  pycam.workspace.data_models.DEFAULT_RESULT_CACHE_SIZE // 1024 ** 2))
+    group_cache.add_argument(
+        "--show-cache-statistics", dest="show_cache_statistics", default=False,
+        action="store_true", help="print the hit, miss and eviction counters of the cache")
+    args = parser.parse_args()
+    if args.validate and args.watch:
+        parser.error("The options '--validate' and '--watch' cannot be combined.")
+    args.enable_server = args.enable_server or (args.remote_server is not None)
+    if args.enable_server and not args.server_authkey:
+        parser.error("You need to supply a shared secret for server mode (--server-auth-key).")
+    executor_backends = []
+    for setting in args.executor_backends:
+        try:
+            executor_backends.append(pycam.Utils.threading.parse_executor_backend_setting(setting))
+        except pycam.errors.InvalidKeyError as exc:
+            parser.error("Invalid executor backend ({}): {}".format(setting, exc))
+    args.executor_backends = executor_backends
+    if args.watch and any(source is sys.stdin for source in args.sources):
+        parser.error("The flow description cannot be read from stdin in watch mode (--watch).")
+    return args
+
+
+def _apply_executor_backend_settings(args):
+    # settings from the command line take precedence over the flow description
+    for call_site, backend in args.executor_backends:
+        pycam.Utils.threading.set_executor_backend(backend, call_site=call_site)
+
+
+def validate_flow():
+    """ verify all items required for the exports - without calculating them """
+    for node in get_dependency_graph().values():
+        node.item.validate()
+
+
+def _get_modification_times(filenames):
+    result = []
+    for filename in filenames:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            result.append(None)
+        else:
+            result.append((stat.st_mtime_ns, stat.st_size))
+    return result
+
+
+def _update_flow(args, filenames):
+    """ synchronize the collections with the changed flow description and calculate the exports
+    depending on the changed items
+    """
+    try:
+        old_graph = get_dependency_graph()
+    except pycam.errors.PycamBaseException:
+        # the previous state was not usable - only the new state is relevant
+        old_graph = {}
+    sources = [open(filename, "r") for filename in filenames]
+    try:
+        changed = update_from_yaml(sources)
+    finally:
+        for source in sources:
+            source.close()
+    _apply_executor_backend_settings(args)
+    new_graph = get_dependency_graph()
+    affected = get_affected_keys(old_graph, changed) | get_affected_keys(new_graph, changed)
+    exports = [new_graph[key].item for key in sorted(affected, key=lambda key: key[1])
+               if (key[0] == CollectionName.EXPORTS) and (key in new_graph)]
+    if exports:
+        print("Processing changed exports: {}".format(
+            ", ".join(export.get_id() for export in exports)), file=sys.stderr)
+        FlowScheduler(max_workers=args.concurrent_steps).run(items=exports)
+    else:
+        print("No export is affected by the changes", file=sys.stderr)
+
+
+def _watch_sources(args):
+    """ process the flow description again after every change of its files
+
+    The collections (including their cached results) and the pool of worker processes are kept
+    between the runs.  Thus unchanged models are not loaded again and unchanged toolpaths are not
+    calculated again.  The loop is stopped via CTRL-C.
+    """
+    filenames = [source.name for source in args.sources]
+    last_times = _get_modification_times(filenames)
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        current_times = _get_modification_times(filenames)
+        if (current_times == last_times) or (None in current_times):
+            # unchanged or incomplete (e.g. an editor is replacing a file)
+            continue
+        last_times = current_times
+        try:
+            _update_flow(args, filenames)
+        except (OSError, yaml.YAMLError, pycam.errors.PycamBaseException) as exc:
+            print("Failed to process the changed flow description: {}".format(exc),
+                  file=sys.stderr)
 
 
 def main_func():
@@ -67,9 +236,45 @@ def main_func():
         except pycam.errors.PycamBaseException as exc:
             print("Flow description parse failure ({}): {}".format(fname, exc), file=sys.stderr)
             sys.exit(1)
+    if args.validate:
+        try:
+            validate_flow()
+        except pycam.errors.PycamBaseException as exc:
+            print("Flow description validation failure: {}".format(exc), file=sys.stderr)
+            sys.exit(1)
+        return
+    _apply_executor_backend_settings(args)
+    error = pycam.Utils.threading.init_threading(
+        args.parallel_processes, enable_server=args.enable_server, remote=args.remote_server,
+        server_credentials=args.server_authkey.encode("utf-8"))
+    if error:
+        print("Failed to initialize parallel processing: {}".format(error), file=sys.stderr)
+        sys.exit(1)
     pycam.Utils.set_application_key("pycam-cli")
-    for export in pycam.workspace.data_models.Export.get_collection():
-        export.run_export()
+    pycam.workspace.persistent_cache.set_toolpath_cache_directory(args.toolpath_cache_dir)
+    if args.cache_memory_limit is not None:
+        pycam.workspace.data_models.set_cache_memory_limit(
+            int(args.cache_memory_limit * 1024 ** 2))
+    try:
+        try:
+            FlowScheduler(max_workers=args.concurrent_steps).run()
+        except pycam.errors.PycamBaseException as exc:
+            if not args.watch:
+                raise
+            print("Failed to process the flow description: {}".format(exc), file=sys.stderr)
+        if args.watch:
+            _watch_sources(args)
+    except KeyboardInterrupt:
+        if not args.watch:
+            raise
+    finally:
+        pycam.Utils.threading.cleanup()
+        if args.show_cache_statistics:
+            stats = pycam.workspace.data_models.get_cache_statistics()
+            print("Cache statistics: {items:d} items ({size_mb:.1f} of {max_size_mb:.0f} MB), "
+                  "{hits:d} hits, {misses:d} misses, {evictions:d} evictions"
+                  .format(size_mb=stats["size"] / 1024 ** 2,
+                          max_size_mb=stats["max_size"] / 1024 ** 2, **stats))
 
 
 if __name__ == "__main__":
@@ -44,7 +44,7 @@ except ImportError:
                                                      os.pardir)))
     from pycam import VERSION
 
-from pycam.errors import InitializationError
+from pycam.errors import InitializationError, InvalidKeyError
 from pycam.Flow.history import DataHistory, merge_history_and_block_events
 from pycam.Gui import QuestionStatus
 import pycam.Gui.common as GuiCommon
@@ -225,6 +225,13 @@ def execute(parser, args, pycam):
             "'--server-auth-key' argument followed by a shared secret password.")
         return EXIT_CODES["server_without_password"]
 
+    for setting in args.executor_backends:
+        try:
+            call_site, backend = pycam.Utils.threading.parse_executor_backend_setting(setting)
+        except InvalidKeyError as exc:
+            parser.error("Invalid executor backend ({}): {}".format(setting, exc))
+        pycam.Utils.threading.set_executor_backend(backend, call_site=call_site)
+
     # initialize multiprocessing
     try:
         if args.server_authkey is None:
@@ -280,6 +287,12 @@ def get_args_parser():
         "--server-auth-key", dest="server_authkey", default="", action="store",
         help=("Secret used for connecting to a remote server or for granting access to remote "
               "clients."))
+    group_processing.add_argument(
+        "--executor-backend", dest="executor_backends", default=[], action="append",
+        metavar="[CALL_SITE=]BACKEND",
+        help=("Choose the executor backend for parallel calculations: serial, thread, process or "
+              "remote. The backend can be restricted to a specific call site (e.g. "
+              "'push_cutter=thread'). This option may be specified multiple times."))
     group_workspace = parser.add_argument_group("Workspace")
     group_workspace.add_argument(
         "--workspace-file", dest="workspace_filename",
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import uuid
+
+# The worker imports only the modules required for processing tasks (no GUI, no flow parser).
+try:
+    import pycam.Utils.log
+except ImportError:
+    # running locally (without a proper PYTHONPATH) requires manual intervention
+    sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                     os.pardir)))
+    import pycam.Utils.log
+import pycam.errors
+import pycam.Utils.remote
+import pycam.Utils.threading
+
+
+_log = pycam.Utils.log.get_logger()
+
+LOG_LEVELS = {"debug": logging.DEBUG,
+              "info": logging.INFO,
+              "warning": logging.WARNING,
+              "error": logging.ERROR, }
+
+# modules containing the functions of parallel tasks - they are loaded before starting workers
+TASK_MODULES = ("pycam.Geometry.Model",
+                "pycam.Cutters.CylindricalCutter",
+                "pycam.Cutters.SphericalCutter",
+                "pycam.Cutters.ToroidalCutter",
+                "pycam.PathGenerators.ContourFollow",
+                "pycam.PathGenerators.DropCutter",
+                "pycam.PathGenerators.PushCutter")
+
+
+class AutoScaler:
+    """ choose the number of local worker processes based on the task queue of the server
+
+    Additional workers are started as long as tasks are waiting for a worker.  One worker is
+    stopped whenever the queue stayed empty for a while.
+    """
+
+    def __init__(self, min_processes, max_processes, scale_down_delay=30):
+        self.min_processes = min_processes
+        self.max_processes = max(min_processes, max_processes)
+        self._scale_down_delay = scale_down_delay
+        self._last_busy = time.time()
+
+    def get_wanted_count(self, current_count, waiting_tasks, now=None):
+        if now is None:
+            now = time.time()
+        if waiting_tasks > 0:
+            self._last_busy = now
+            wanted = current_count + waiting_tasks
+        elif now - self._last_busy >= self._scale_down_delay:
+            self._last_busy = now
+            wanted = current_count - 1
+        else:
+            wanted = current_count
+        return max(self.min_processes, min(self.max_processes, wanted))
+
+
+class WorkerProcesses:
+    """ manage local worker processes connected to a task server """
+
+    def __init__(self, address, authkey, context=None):
+        self._address = address
+        self._authkey = authkey
+        self._context = context or multiprocessing.get_context()
+        self._processes = []
+        # use only the hostname (for brevity) - no domain part
+        self._hostname = platform.node().split(".", 1)[0]
+
+    def __len__(self):
+        return len(self._processes)
+
+    def scale_to(self, count):
+        # forget about crashed workers - they are replaced below
+        self._processes = [process for process in self._processes if process.is_alive()]
+        while len(self._processes) < count:
+            name = "%s-%s" % (self._hostname, uuid.uuid1())
+            process = self._context.Process(
+                name=name, target=pycam.Utils.remote.run_worker,
+                args=(self._address, self._authkey, name), kwargs={"reconnect": True},
+                daemon=True)
+            process.start()
+            self._processes.append(process)
+            _log.info("Started worker process %s", name)
+        while len(self._processes) > count:
+            process = self._processes.pop()
+            # the server hands the unfinished tasks of this worker to other workers
+            process.terminate()
+            process.join()
+            _log.info("Stopped worker process %s", process.name)
+
+    def stop(self):
+        self.scale_to(0)
+
+
+def get_process_context():
+    """ return a multiprocessing context for fast start-up of additional workers
+
+    The "forkserver" method starts new processes from a clean server process with all task
+    modules loaded in advance.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(list(TASK_MODULES))
+        return context
+    else:
+        return multiprocessing.get_context()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(prog="pycam-worker",
+                                     description="worker processes for a PyCAM task server",
+                                     epilog="PyCAM website: https://github.com/SebKuzminsky/pycam")
+    parser.add_argument("--log-level", choices=LOG_LEVELS.keys(), default="warning",
+                        help="choose the verbosity of log messages")
+    parser.add_argument(
+        "--remote-server", dest="remote_server", required=True,
+        help=("The task server is given as an IP or a hostname with an optional port "
+              "(default: 1250) separated by a colon."))
+    parser.add_argument(
+        "--server-auth-key", dest="server_authkey", required=True,
+        help="Secret used for connecting to the task server.")
+    parser.add_argument(
+        "--number-of-processes", dest="parallel_processes", default=None, type=int,
+        help=("number of worker processes (default: number of CPU cores) - this is the upper "
+              "limit in case of '--auto-scale'"))
+    parser.add_argument(
+        "--auto-scale", dest="auto_scale", default=False, action="store_true",
+        help=("adjust the number of worker processes to the queue of waiting tasks of the "
+              "server"))
+    parser.add_argument(
+        "--min-processes", dest="min_processes", default=1, type=int,
+        help="minimum number of worker processes in case of '--auto-scale' (default: 1)")
+    parser.add_argument(
+        "--scale-down-delay", dest="scale_down_delay", default=30, type=float,
+        help=("stop a worker process after the task queue of the server stayed empty for this "
+              "number of seconds (default: 30)"))
+    return parser.parse_args()
+
+
+def main_func():
+    args = get_args()
+    _log.setLevel(LOG_LEVELS[args.log_level])
+    address = pycam.Utils.threading.parse_server_address(args.remote_server)
+    authkey = args.server_authkey.encode("utf-8")
+    max_processes = args.parallel_processes
+    if max_processes is None:
+        max_processes = pycam.Utils.threading.get_number_of_cores() or 1
+    if args.auto_scale:
+        scaler = AutoScaler(args.min_processes, max_processes,
+                            scale_down_delay=args.scale_down_delay)
+        wanted_count = scaler.min_processes
+    else:
+        scaler = None
+        wanted_count = max_processes
+    workers = WorkerProcesses(address, authkey, context=get_process_context())
+    # the connection for monitoring the task queue of the server (only for auto-scaling)
+    monitor = None
+    try:
+        while True:
+            workers.scale_to(wanted_count)
+            time.sleep(pycam.Utils.remote.HEARTBEAT_INTERVAL)
+            if scaler is not None:
+                if (monitor is not None) and not monitor.is_connected():
+                    monitor.stop()
+                    monitor = None
+                if monitor is None:
+                    monitor = pycam.Utils.remote.TaskClient(address, authkey)
+                    try:
+                        monitor.connect()
+                    except (pycam.errors.CommunicationError, OSError) as exc:
+                        _log.debug("Failed to connect to task server %s: %s", address, exc)
+                        monitor.stop()
+                        monitor = None
+                if monitor is None:
+                    # the server is not available - no work is waiting for us
+                    waiting_tasks = 0
+                else:
+                    waiting_tasks = monitor.get_statistics().get("tasks", 0)
+                wanted_count = scaler.get_wanted_count(len(workers), waiting_tasks)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        workers.stop()
+
+
+if __name__ == "__main__":
+    main_func()
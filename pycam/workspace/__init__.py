@@ -128,6 +128,8 @@ class ToolpathFilter(Enum):
     SAFETY_HEIGHT = "safety_height"
     PLUNGE_FEEDRATE = "plunge_feedrate"
     STEP_WIDTH = "step_width"
+    SIMPLIFY_TOLERANCE = "simplify_tolerance"
+    ARC_TOLERANCE = "arc_tolerance"
     CORNER_STYLE = "corner_style"
     FILENAME_EXTENSION = "filename_extension"
     TOUCH_OFF = "touch_off"
@@ -23,13 +23,18 @@ from enum import Enum
 import functools
 import io
 import os.path
-import time
+import sys
+import threading
 import uuid
 
 from pycam.Cutters.CylindricalCutter import CylindricalCutter
 from pycam.Cutters.SphericalCutter import SphericalCutter
 from pycam.Cutters.ToroidalCutter import ToroidalCutter
 from pycam.Geometry import Box3D, Point3D
+from pycam.Geometry.Matrix import (get_affine_matrix, get_rotation_matrix_around_point,
+                                   get_scale_matrix, get_transformed_box, get_translation_matrix,
+                                   is_axis_aligned_matrix, multiply_affine_matrices,
+                                   TRANSFORMATIONS)
 import pycam.Geometry.Model
 from pycam.Geometry.Plane import Plane
 from pycam.PathGenerators import UpdateToolView
@@ -39,6 +44,7 @@ import pycam.PathGenerators.PushCutter
 import pycam.Toolpath
 import pycam.Toolpath.Filters as tp_filters
 import pycam.Toolpath.MotionGrid as MotionGrid
+from pycam.Toolpath.Steps import get_step_from_values
 import pycam.Toolpath.SupportGrid
 from pycam.Importers import detect_file_type
 from pycam.Utils import get_application_key, get_type_name, MultiLevelDictionaryAccess
@@ -51,6 +57,7 @@ from pycam.workspace import (
     ModelScaleTarget, ModelTransformationAction, ModelType, LengthUnit, PathPattern,
     PositionShiftTarget, ProcessStrategy, SourceType, SupportBridgesLayout, TargetType, TaskType,
     ToolBoundaryMode, ToolpathFilter, ToolpathTransformationAction, ToolShape)
+from pycam.workspace.persistent_cache import get_content_key, get_toolpath_cache
 from pycam.errors import (LoadFileError, PycamBaseException, InvalidDataError, InvalidKeyError,
                           MissingAttributeError, MissingDependencyError, UnexpectedAttributeError)
 
@@ -59,7 +66,12 @@ _log = pycam.Utils.log.get_logger()
 
 # dictionary of all collections by name
 _data_collections = {}
-_cache = {}
+
+# default memory budget for cached results (in bytes)
+DEFAULT_RESULT_CACHE_SIZE = 512 * 1024 * 1024
+# rough estimates of the memory consumption of large values (in bytes)
+_ESTIMATED_TRIANGLE_SIZE = 1500
+_ESTIMATED_POINT_SIZE = 100
 
 
 APPLICATION_ATTRIBUTES_KEY = "X-Application"
@@ -120,7 +132,6 @@ class LimitSingle(collections.namedtuple("LimitSingle", ("value", "is_relative")
 
 Limit3D = collections.namedtuple("Limit3D", ("x", "y", "z"))
 AxesValues = collections.namedtuple("AxesValues", ("x", "y", "z"))
-CacheItem = collections.namedtuple("CacheItem", ("timestamp", "content"))
 
 
 def _limit3d_converter(point):
@@ -226,6 +237,26 @@ def _get_collection_resolver(collection_name, many=False):
     return functools.partial(_get_from_collection, collection_name, many=many)
 
 
+def _validate_references(collection_name, wanted, many=False):
+    """ verify the existence of one or more items in a collection - without retrieving them
+
+    @param collection_name: identifier of the relevant collection
+    @param wanted: ID (or list of IDs) of the referenced items
+    @param many: expect "wanted" to be a list
+    """
+    if many:
+        if not isinstance(wanted, (list, tuple)):
+            raise InvalidDataError("Expected a list of '{}' items, but received: {}"
+                                   .format(collection_name.value, wanted))
+    else:
+        wanted = [wanted]
+    collection = _data_collections.get(collection_name, ())
+    missing = [str(item_id) for item_id in wanted if item_id not in collection]
+    if missing:
+        raise InvalidDataError("Missing item(s) in '{}': {}"
+                               .format(collection_name.value, " / ".join(missing)))
+
+
 def _set_parser_context(description):
     """ store a string describing the current parser context (useful for error messages) """
     def wrap(func):
@@ -274,6 +305,166 @@ def _require_model_type(wanted_type):
     return wrap
 
 
+def _estimate_size(value):
+    """ guess the memory consumption of a cached value
+
+    The exact size of complex objects (e.g. models) would be too expensive to determine.
+    Only the compact storage of toolpath steps is able to report its size exactly.
+    """
+    if isinstance(value, pycam.Toolpath.Toolpath):
+        return sys.getsizeof(value.path)
+    elif isinstance(value, pycam.Geometry.Model.Model):
+        return _ESTIMATED_TRIANGLE_SIZE * len(value)
+    elif isinstance(value, pycam.Geometry.Model.ContourModel):
+        return _ESTIMATED_POINT_SIZE * sum(len(polygon) for polygon in value.get_polygons())
+    elif isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    else:
+        return sys.getsizeof(value)
+
+
+class ResultCache:
+    """ least-recently-used cache for the results of "CacheStorage" methods
+
+    All items share a memory budget.  Every item belongs to an owner (the instance providing the
+    cached method).  The items of an owner are released together, when the owner is deleted.
+    The items of pinned owners are never evicted due to the memory budget (see "pin").
+    All operations take constant time - unless pinned items need to be skipped during eviction.
+    """
+
+    def __init__(self, max_size=DEFAULT_RESULT_CACHE_SIZE):
+        # (owner, key) -> (value, size) - the least recently used item comes first
+        self.cache = collections.OrderedDict()
+        # owner -> keys of its items (ordered like "cache")
+        self._owner_keys = {}
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # owner -> number of pins
+        self._pinned = collections.Counter()
+        # concurrent flow steps access the cache
+        self._lock = threading.Lock()
+
+    def get(self, owner, key):
+        with self._lock:
+            try:
+                value = self.cache[(owner, key)][0]
+            except KeyError:
+                self.misses += 1
+                raise
+            self.cache.move_to_end((owner, key))
+            self._owner_keys[owner].move_to_end(key)
+            self.hits += 1
+            return value
+
+    def add(self, owner, key, value, max_owner_items=None):
+        """ store a value - the least recently used items are evicted, if necessary
+
+        @param max_owner_items: maximum number of items of this owner
+        """
+        size = _estimate_size(value)
+        with self._lock:
+            self._remove(owner, key)
+            owner_keys = self._owner_keys.setdefault(owner, collections.OrderedDict())
+            self.cache[(owner, key)] = (value, size)
+            owner_keys[key] = None
+            self.size += size
+            if max_owner_items is not None:
+                while len(owner_keys) > max_owner_items:
+                    self._remove(owner, next(iter(owner_keys)))
+                    self.evictions += 1
+            # the new item is kept even if it exceeds the budget on its own
+            while self.size > self.max_size:
+                victim = next((item_key for item_key in self.cache
+                               if (item_key[0] not in self._pinned)
+                               and (item_key != (owner, key))), None)
+                if victim is None:
+                    break
+                self._remove(*victim)
+                self.evictions += 1
+
+    def _remove(self, owner, key):
+        try:
+            self.size -= self.cache.pop((owner, key))[1]
+        except KeyError:
+            return
+        owner_keys = self._owner_keys[owner]
+        del owner_keys[key]
+        if not owner_keys:
+            del self._owner_keys[owner]
+
+    def release(self, owner):
+        """ remove all items of an owner """
+        with self._lock:
+            for key in list(self._owner_keys.get(owner, ())):
+                self._remove(owner, key)
+
+    def pin(self, owner):
+        """ protect the items of an owner against eviction until "unpin" is called
+
+        Pins are counted - every call of "pin" requires a matching call of "unpin".
+        """
+        with self._lock:
+            self._pinned[owner] += 1
+
+    def unpin(self, owner):
+        with self._lock:
+            self._pinned[owner] -= 1
+            if self._pinned[owner] <= 0:
+                del self._pinned[owner]
+
+    def clear(self):
+        with self._lock:
+            self.cache.clear()
+            self._owner_keys.clear()
+            self.size = 0
+
+    def get_statistics(self):
+        with self._lock:
+            return {"items": len(self.cache), "size": self.size, "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+_cache = ResultCache()
+
+
+def get_cache_statistics():
+    """ return the number of items, their estimated size and the counters of the result cache """
+    return _cache.get_statistics()
+
+
+def _release_cached_results(item):
+    """ discard the cached results of methods of a deleted item """
+    try:
+        _cache.release(hash(item))
+    except TypeError:
+        # non-hashable items are never cached
+        pass
+
+
+def pin_cached_results(item):
+    """ keep the cached results of an item's methods until "unpin_cached_results" is called """
+    try:
+        _cache.pin(hash(item))
+    except TypeError:
+        # non-hashable items are never cached
+        pass
+
+
+def unpin_cached_results(item):
+    try:
+        _cache.unpin(hash(item))
+    except TypeError:
+        pass
+
+
+def set_cache_memory_limit(max_size):
+    """ change the memory budget (in bytes) of the result cache """
+    _cache.max_size = max_size
+
+
 class CacheStorage:
     """ cache result values of a method
 
@@ -308,7 +499,7 @@ class CacheStorage:
         elif value is None:
             yield hash(None)
         elif isinstance(value, BaseDataContainer):
-            yield from cls._get_stable_hashs_for_value(value.get_dict())
+            yield value.get_content_hash()
         elif isinstance(value, Enum):
             yield hash(value.value)
         else:
@@ -334,24 +525,15 @@ class CacheStorage:
             _log.info("Directly serving value due to non-hashable instance (skipping the cache): "
                       "%s", inst)
             return calc_function(inst, *args, **kwargs)
-        try:
-            my_cache = _cache[hash(inst)]
-        except KeyError:
-            my_cache = {}
-            _cache[hash(inst)] = my_cache
+        owner = hash(inst)
         cache_key = self._get_cache_key(inst, args, kwargs)
         try:
-            return my_cache[cache_key].content
+            return _cache.get(owner, cache_key)
         except KeyError:
             pass
-        cache_item = CacheItem(time.time(), calc_function(inst, *args, **kwargs))
-        my_cache[cache_key] = cache_item
-        if len(my_cache) > self._max_cache_size:
-            # remove the oldest cache item
-            item_list = [(key, value.timestamp) for key, value in my_cache.items()]
-            item_list.sort(key=lambda item: item[1])
-            my_cache.pop(item_list[0][0])
-        return cache_item.content
+        result = calc_function(inst, *args, **kwargs)
+        _cache.add(owner, cache_key, result, max_owner_items=self._max_cache_size)
+        return result
 
 
 class BaseDataContainer:
@@ -367,6 +549,8 @@ class BaseDataContainer:
         self._application_attributes = data.pop(APPLICATION_ATTRIBUTES_KEY, {})
         self._data = data
         self._multi_level_dict = MultiLevelDictionaryAccess(self._data)
+        self._content_hash = None
+        self._revision = 0
 
     @classmethod
     def parse_from_dict(cls, data):
@@ -516,16 +700,54 @@ class BaseDataContainer:
             raise UnexpectedAttributeError("unexpected attributes were given: {}"
                                            .format(unexpected_attributes_string))
 
+    def get_content_hash(self):
+        """ return a hash of the data (without application-specific attributes)
+
+        The hash is calculated only once - until the next change (see "notify_changed").
+        """
+        if self._content_hash is None:
+            self._content_hash = hash(tuple(
+                CacheStorage._get_stable_hashs_for_value(self.get_dict())))
+        return self._content_hash
+
+    def get_revision(self):
+        """ return a number that is increased with every change (see "notify_changed") """
+        return self._revision
+
     def notify_changed(self):
+        self._content_hash = None
+        self._revision += 1
         if self.changed_event:
             get_event_handler().emit_event(self.changed_event)
 
+    def _validate_value_range(self, key, minimum=None, maximum=None, allow_minimum=True,
+                              allow_maximum=True):
+        """ verify that a numeric value is within the given limits """
+        value = self.get_value(key)
+        if isinstance(key, tuple):
+            key = "->".join(key)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise InvalidDataError("Value of '{}' is not a number: {}".format(key, value))
+        if minimum is not None:
+            if (value < minimum) or ((value == minimum) and not allow_minimum):
+                raise InvalidDataError("Value of '{}' is out of range: {:g} (expected: {} {:g})"
+                                       .format(key, value, ">=" if allow_minimum else ">",
+                                               minimum))
+        if maximum is not None:
+            if (value > maximum) or ((value == maximum) and not allow_maximum):
+                raise InvalidDataError("Value of '{}' is out of range: {:g} (expected: {} {:g})"
+                                       .format(key, value, "<=" if allow_maximum else "<",
+                                               maximum))
+
     def validate(self):
         """ try to verify the validity of a data item
 
-        All operations of the items are executed (avoiding permanent side-effects).  Most problems
-        of the data structure should be discovered during this operation.  Non-trivial problems
-        (e.g. missing permissions for file operations) are not guaranteed to be detected.
+        Only the structure of the data is checked: references to other items, enum values and
+        ranges of parameters.  Nothing is calculated (e.g. models are not loaded).  Thus the
+        validation is cheap.  Problems depending on the content of models or files (e.g. a 3D
+        model used for cropping a toolpath) are not detected.
 
         throws PycamBaseException in case of errors
         """
@@ -551,11 +773,12 @@ class BaseCollection:
     def clear(self):
         if self._data:
             while self._data:
-                self._data.pop()
+                _release_cached_results(self._data.pop())
             self.notify_list_changed()
 
     def __setitem__(self, index, value):
         if self._data[index] != value:
+            _release_cached_results(self._data[index])
             self._data[index] = value
             self.notify_list_changed()
 
@@ -563,6 +786,17 @@ class BaseCollection:
         self._data.append(value)
         self.notify_list_changed()
 
+    def set_items(self, items):
+        """ replace the content of the collection - items being part of both are kept """
+        items = list(items)
+        if items != self._data:
+            kept_items = set(items)
+            for item in self._data:
+                if item not in kept_items:
+                    _release_cached_results(item)
+            self._data = items
+            self.notify_list_changed()
+
     def __getitem__(self, index_or_key):
         for item in self._data:
             if index_or_key == item.get_id():
@@ -591,6 +825,7 @@ class BaseCollection:
         except ValueError:
             raise KeyError("Failed to remove '{}' from collection '{}'"
                            .format(item.get_id(), self._name))
+        _release_cached_results(item)
         self.notify_list_changed()
 
     def __iter__(self):
@@ -661,6 +896,10 @@ class BaseCollectionItemDataContainer(BaseDataContainer):
     def get_id(self):
         return self.get_dict()[self.unique_attribute]
 
+    def get_dependencies(self):
+        """ return the collection items required for calculating the result of this item """
+        return ()
+
     @classmethod
     def get_collection(cls):
         try:
@@ -740,6 +979,25 @@ class Source(BaseDataContainer):
         else:
             raise InvalidKeyError(source_type, SourceType)
 
+    @_set_parser_context("Source")
+    def get_dependencies(self, related_collection_name):
+        """ return the collection items required for retrieving this source """
+        source_type = self.get_value("type")
+        if source_type == SourceType.COPY:
+            result = (_get_from_collection(related_collection_name, self.get_value("original")), )
+        elif source_type == SourceType.MODEL:
+            result = self._get_source_model()
+        elif source_type == SourceType.TASK:
+            result = (self._get_source_task(), )
+        elif source_type == SourceType.TOOLPATH:
+            result = self._get_source_toolpath()
+        elif source_type == SourceType.SUPPORT_BRIDGES:
+            result = self.get_value("models")
+        else:
+            result = ()
+        # references to missing items are reported later by the calculation itself
+        return tuple(item for item in result if item is not None)
+
     @_set_parser_context("Source 'copy'")
     @_set_allowed_attributes({"type", "original"})
     def _get_source_copy(self, related_collection_name):
@@ -815,11 +1073,13 @@ class Source(BaseDataContainer):
         while True:
             yield value
 
-    @_set_parser_context("Source 'support_bridges'")
-    @_set_allowed_attributes({
+    _support_bridges_attributes = {
         "type", "models", "layout", "distribution", ("grid", "distances"),
         "average_distance", "minimum_count", ("grid", "offsets", "x"), ("grid", "offsets", "y"),
-        ("shape", "height"), ("shape", "width"), ("shape", "length")})
+        ("shape", "height"), ("shape", "width"), ("shape", "length")}
+
+    @_set_parser_context("Source 'support_bridges'")
+    @_set_allowed_attributes(_support_bridges_attributes)
     def _get_source_support_bridges(self):
         layout = self.get_value("layout")
         models = self.get_value("models")
@@ -869,14 +1129,57 @@ class Source(BaseDataContainer):
         else:
             assert False
 
-    def validate(self):
-        try:
-            # try it with a invalid "related_collection_name" - hopefully it works
-            self.get(None)
-        except ValueError:
-            # The "copy" source requires a suitable "related_collection_name" parameter. Thus we
-            # cannot fully check the validity.
-            pass
+    @_set_parser_context("Source")
+    def validate(self, related_collection_name=None):
+        """ verify the source without retrieving it
+
+        @param related_collection_name: the collection used by the "copy" source (None: the
+            reference is not checked)
+        """
+        source_type = self.get_value("type")
+        if source_type == SourceType.COPY:
+            self.validate_allowed_attributes({"type", "original"})
+            original = self.get_value("original")
+            if related_collection_name is not None:
+                _validate_references(related_collection_name, original)
+        elif source_type in (SourceType.FILE, SourceType.URL):
+            self.validate_allowed_attributes({"type", "location"})
+            location = self.get_value("location")
+            if not isinstance(location, str) or not location:
+                raise InvalidDataError("Invalid location: {}".format(location))
+        elif source_type == SourceType.MODEL:
+            self.validate_allowed_attributes({"type", "items"})
+            _validate_references(CollectionName.MODELS, self.get_value("items"), many=True)
+        elif source_type == SourceType.TASK:
+            self.validate_allowed_attributes({"type", "item"})
+            _validate_references(CollectionName.TASKS, self.get_value("item"))
+        elif source_type == SourceType.TOOLPATH:
+            self.validate_allowed_attributes({"type", "items"})
+            _validate_references(CollectionName.TOOLPATHS, self.get_value("items"), many=True)
+        elif source_type == SourceType.OBJECT:
+            self.validate_allowed_attributes({"type", "data"})
+            self.get_value("data")
+        elif source_type == SourceType.SUPPORT_BRIDGES:
+            self.validate_allowed_attributes(self._support_bridges_attributes)
+            _validate_references(CollectionName.MODELS, self.get_value("models", raw=True),
+                                 many=True)
+            for key in (("shape", "height"), ("shape", "width"), ("shape", "length")):
+                self._validate_value_range(key, minimum=0, allow_minimum=False)
+            layout = self.get_value("layout")
+            if layout == SupportBridgesLayout.GRID:
+                self.get_value(("grid", "distances"))
+                self.get_value(("grid", "offsets", "x"))
+                self.get_value(("grid", "offsets", "y"))
+            elif layout == SupportBridgesLayout.DISTRIBUTED:
+                self.get_value("distribution")
+                self._validate_value_range("minimum_count", minimum=0)
+                if self.get_value("average_distance") is not None:
+                    self._validate_value_range("average_distance", minimum=0,
+                                               allow_minimum=False)
+            else:
+                raise InvalidKeyError(layout, SupportBridgesLayout)
+        else:
+            raise InvalidKeyError(source_type, SourceType)
 
 
 class ModelTransformation(BaseDataContainer):
@@ -889,16 +1192,45 @@ class ModelTransformation(BaseDataContainer):
                             "angle": float,
                             "axes": functools.partial(_axes_values_converter, allow_none=True)}
 
-    def get_transformed_model(self, model):
+    # transformations that can be expressed as a matrix
+    _affine_actions = {ModelTransformationAction.SCALE, ModelTransformationAction.SHIFT,
+                       ModelTransformationAction.ROTATE, ModelTransformationAction.MULTIPLY_MATRIX}
+
+    def is_affine(self):
+        return self.get_value("action") in self._affine_actions
+
+    def is_depending_on_position(self):
+        """ check if the matrix of the transformation depends on the bounding box of the model """
+        action = self.get_value("action")
+        if action == ModelTransformationAction.SCALE:
+            return self.get_value("scale_target") == ModelScaleTarget.SIZE
+        elif action == ModelTransformationAction.SHIFT:
+            return self.get_value("shift_target") != PositionShiftTarget.DISTANCE
+        else:
+            return False
+
+    def get_matrix(self, bounds=None):
+        """ return the 3x4 matrix of an affine transformation (see "is_affine")
+
+        @param bounds: the bounding box of the model (Box3D) - it is required only if the
+            transformation depends on the position of the model (see "is_depending_on_position")
+        """
         action = self.get_value("action")
         if action == ModelTransformationAction.SCALE:
-            return self._get_scaled_model(model)
+            return self._get_scale_matrix(bounds)
         elif action == ModelTransformationAction.SHIFT:
-            return self._get_shifted_model(model)
+            return self._get_shift_matrix(bounds)
         elif action == ModelTransformationAction.ROTATE:
-            return self._get_rotated_model(model)
+            return self._get_rotation_matrix()
         elif action == ModelTransformationAction.MULTIPLY_MATRIX:
-            return self._get_matrix_multiplied_model(model)
+            return self._get_multiplication_matrix()
+        else:
+            raise InvalidKeyError(action, ModelTransformationAction)
+
+    def get_transformed_model(self, model):
+        action = self.get_value("action")
+        if action in self._affine_actions:
+            return get_transformed_model(model, [self])
         elif action == ModelTransformationAction.PROJECTION:
             return self._get_projected_model(model)
         elif action in (ModelTransformationAction.TOGGLE_POLYGON_DIRECTIONS,
@@ -909,70 +1241,55 @@ class ModelTransformation(BaseDataContainer):
 
     @_set_parser_context("Model transformation 'scale'")
     @_set_allowed_attributes({"action", "scale_target", "axes"})
-    def _get_scaled_model(self, model):
+    def _get_scale_matrix(self, bounds):
         target = self.get_value("scale_target")
         axes = self.get_value("axes")
-        kwargs = {}
+        factors = []
         if target == ModelScaleTarget.FACTOR:
-            for key, value in zip(("scale_x", "scale_y", "scale_z"), axes):
-                kwargs[key] = 1.0 if value is None else value
+            for value in axes:
+                factors.append(1.0 if value is None else value)
         elif target == ModelScaleTarget.SIZE:
             for key, current_size, target_size in zip(
-                    ("scale_x", "scale_y", "scale_z"), model.get_dimensions(), axes):
+                    ("scale_x", "scale_y", "scale_z"), bounds.get_dimensions(), axes):
                 if target_size == 0:
                     raise InvalidDataError("Model transformation 'scale' does not accept "
                                            "zero as a target size ({}).".format(key))
                 elif target_size is None:
-                    kwargs[key] = 1.0
+                    factors.append(1.0)
                 elif current_size == 0:
-                    kwargs[key] = 1.0
+                    factors.append(1.0)
                     # don't scale axis if it's flat
                 else:
-                    kwargs[key] = target_size / current_size
+                    factors.append(target_size / current_size)
         else:
             assert False
-        new_model = model.copy()
-        with ProgressContext("Scaling model") as progress:
-            new_model.scale(callback=progress.update, **kwargs)
-        return new_model
+        return get_scale_matrix(*factors)
 
     @_set_parser_context("Model transformation 'shift'")
     @_set_allowed_attributes({"action", "shift_target", "axes"})
-    def _get_shifted_model(self, model):
+    def _get_shift_matrix(self, bounds):
         target = self.get_value("shift_target")
         axes = self.get_value("axes")
-        offset = target._get_shift_offset(target, axes, model)
-        new_model = model.copy()
-        with ProgressContext("Shifting Model") as progress:
-            new_model.shift(*offset, callback=progress.update)
-        return new_model
+        return get_translation_matrix(target._get_shift_offset(target, axes, bounds))
 
     @_set_parser_context("Model transformation 'rotate'")
     @_set_allowed_attributes({"action", "center", "vector", "angle"})
-    def _get_rotated_model(self, model):
+    def _get_rotation_matrix(self):
         center = self.get_value("center")
         vector = self.get_value("vector")
         angle = self.get_value("angle")
-        new_model = model.copy()
-        with ProgressContext("Rotating Model") as progress:
-            new_model.rotate(center, vector, angle, callback=progress.update)
-        return new_model
+        return get_rotation_matrix_around_point(center, vector, angle, use_radians=False)
 
     @_set_parser_context("Model transformation 'matrix multiplication'")
     @_set_allowed_attributes({"action", "matrix"})
-    def _get_matrix_multiplied_model(self, model):
+    def _get_multiplication_matrix(self):
         matrix = self.get_value("matrix")
         lengths = [len(row) for row in matrix]
         if not lengths == [3, 3, 3]:
             raise InvalidDataError("Invalid Matrix row lengths ({}) - expected [3, 3, 3] instead."
                                    .format(lengths))
         # add zero shift offsets (the fourth column)
-        for row in matrix:
-            row.append(0)
-        new_model = model.copy()
-        with ProgressContext("Transform Model") as progress:
-            new_model.transform_by_matrix(matrix, callback=progress.update)
-        return new_model
+        return get_affine_matrix(matrix)
 
     @_set_parser_context("Model transformation 'projection'")
     @_set_allowed_attributes({"action", "center", "vector"})
@@ -1000,9 +1317,88 @@ class ModelTransformation(BaseDataContainer):
             assert False
         return new_model
 
+    @_set_parser_context("Model transformation")
     def validate(self):
-        model = pycam.Geometry.Model.Model()
-        self.get_transformed_model(model)
+        action = self.get_value("action")
+        if action == ModelTransformationAction.SCALE:
+            self.validate_allowed_attributes({"action", "scale_target", "axes"})
+            target = self.get_value("scale_target")
+            axes = self.get_value("axes")
+            if (target == ModelScaleTarget.SIZE) and (0 in axes):
+                raise InvalidDataError("Model transformation 'scale' does not accept zero as a "
+                                       "target size.")
+        elif action == ModelTransformationAction.SHIFT:
+            self.validate_allowed_attributes({"action", "shift_target", "axes"})
+            self.get_value("shift_target")
+            self.get_value("axes")
+        elif action == ModelTransformationAction.ROTATE:
+            self.validate_allowed_attributes({"action", "center", "vector", "angle"})
+            for key in ("center", "vector", "angle"):
+                self.get_value(key)
+        elif action == ModelTransformationAction.MULTIPLY_MATRIX:
+            self.validate_allowed_attributes({"action", "matrix"})
+            lengths = [len(row) for row in self.get_value("matrix")]
+            if not lengths == [3, 3, 3]:
+                raise InvalidDataError("Invalid Matrix row lengths ({}) - expected [3, 3, 3] "
+                                       "instead.".format(lengths))
+        elif action == ModelTransformationAction.PROJECTION:
+            self.validate_allowed_attributes({"action", "center", "vector"})
+            self.get_value("center")
+            self.get_value("vector")
+        elif action in (ModelTransformationAction.TOGGLE_POLYGON_DIRECTIONS,
+                        ModelTransformationAction.REVISE_POLYGON_DIRECTIONS):
+            self.validate_allowed_attributes({"action"})
+        else:
+            raise InvalidKeyError(action, ModelTransformationAction)
+
+
+def get_transformed_model(model, transformations):
+    """ apply a list of transformations (ModelTransformation) to a model
+
+    Consecutive affine transformations (e.g. scale, shift and rotate) are combined into a single
+    matrix.  Thus the model is copied and transformed only once for all of them.  Only a
+    transformation depending on the position of the model after a rotation (e.g. "align_min")
+    requires the preceding transformations to be applied first.
+    """
+    pending_matrix = None
+    for transformation in transformations:
+        if transformation.is_affine():
+            if not transformation.is_depending_on_position():
+                bounds = None
+            elif pending_matrix is None:
+                bounds = model
+            elif is_axis_aligned_matrix(pending_matrix):
+                # the transformed bounding box can be calculated without touching the model
+                bounds = get_transformed_box(Box3D(Point3D(model.minx, model.miny, model.minz),
+                                                   Point3D(model.maxx, model.maxy, model.maxz)),
+                                             pending_matrix)
+            else:
+                model = _get_matrix_transformed_model(model, pending_matrix)
+                pending_matrix = None
+                bounds = model
+            matrix = transformation.get_matrix(bounds)
+            if pending_matrix is None:
+                pending_matrix = matrix
+            else:
+                pending_matrix = multiply_affine_matrices(pending_matrix, matrix)
+        else:
+            if pending_matrix is not None:
+                model = _get_matrix_transformed_model(model, pending_matrix)
+                pending_matrix = None
+            model = transformation.get_transformed_model(model)
+    if pending_matrix is not None:
+        model = _get_matrix_transformed_model(model, pending_matrix)
+    return model
+
+
+def _get_matrix_transformed_model(model, matrix):
+    if get_affine_matrix(matrix) == get_affine_matrix(TRANSFORMATIONS["normal"]):
+        # nothing to be changed
+        return model
+    new_model = model.copy()
+    with ProgressContext("Transforming model") as progress:
+        new_model.transform_by_matrix(matrix, callback=progress.update)
+    return new_model
 
 
 class Model(BaseCollectionItemDataContainer):
@@ -1019,12 +1415,16 @@ class Model(BaseCollectionItemDataContainer):
     def get_model(self):
         _log.debug("Generating model {}".format(self.get_id()))
         model = self.get_value("source").get(CollectionName.MODELS)
-        for transformation in self.get_value("transformations"):
-            model = transformation.get_transformed_model(model)
-        return model
+        return get_transformed_model(model, self.get_value("transformations"))
+
+    def get_dependencies(self):
+        return self.get_value("source").get_dependencies(CollectionName.MODELS)
 
+    @_set_parser_context("Model")
     def validate(self):
-        self.get_model()
+        self.get_value("source").validate(CollectionName.MODELS)
+        for transformation in self.get_value("transformations"):
+            transformation.validate()
 
 
 class Tool(BaseCollectionItemDataContainer):
@@ -1090,8 +1490,21 @@ class Tool(BaseCollectionItemDataContainer):
                 delay=self.get_value(("spindle", "spin_up_delay"))))
         return result
 
+    @_set_parser_context("Tool")
     def validate(self):
-        self.get_tool_geometry()
+        shape = self.get_value("shape")
+        if self.radius <= 0:
+            raise InvalidDataError("The radius of the tool needs to be positive: {:g}"
+                                   .format(self.radius))
+        if shape == ToolShape.TORUS:
+            self._validate_value_range("toroid_radius", minimum=0, maximum=self.radius,
+                                       allow_minimum=False)
+        elif shape not in (ToolShape.FLAT_BOTTOM, ToolShape.BALL_NOSE):
+            raise InvalidKeyError(shape, ToolShape)
+        self._validate_value_range("height", minimum=0, allow_minimum=False)
+        self._validate_value_range("feed", minimum=0, allow_minimum=False)
+        self._validate_value_range(("spindle", "speed"), minimum=0)
+        self._validate_value_range(("spindle", "spin_up_delay"), minimum=0)
         self.get_toolpath_filters()
 
 
@@ -1211,9 +1624,33 @@ class Process(BaseCollectionItemDataContainer):
                 motion_grid = MotionGrid.resolve_multi_level_generator(motion_grid, 2)
         return motion_grid
 
+    def get_dependencies(self):
+        return self.get_value("trace_models", default=[])
+
+    @_set_parser_context("Process")
     def validate(self):
-        self.get_path_generator()
-        self.get_motion_grid(tool_radius=1, box=Box3D(Point3D(0, 0, 0), Point3D(1, 1, 1)))
+        strategy = self.get_value("strategy")
+        self._validate_value_range("overlap", minimum=0, maximum=1, allow_maximum=False)
+        if strategy != ProcessStrategy.SURFACE:
+            self._validate_value_range("step_down", minimum=0, allow_minimum=False)
+        if strategy in (ProcessStrategy.SLICE, ProcessStrategy.SURFACE):
+            self.get_value("milling_style")
+            path_pattern = self.get_value("path_pattern")
+            if path_pattern == PathPattern.SPIRAL:
+                self.get_value("spiral_direction")
+                self.get_value("rounded_corners")
+            elif path_pattern == PathPattern.GRID:
+                self.get_value("grid_direction")
+            else:
+                raise InvalidKeyError(path_pattern, PathPattern)
+        elif strategy == ProcessStrategy.ENGRAVE:
+            self.get_value("milling_style")
+            self.get_value("radius_compensation")
+            _validate_references(CollectionName.MODELS,
+                                 self.get_value("trace_models", raw=True, default=[]), many=True)
+            self.get_value("pocketing_type")
+        elif strategy != ProcessStrategy.CONTOUR:
+            raise InvalidKeyError(strategy, ProcessStrategy)
 
 
 class Boundary(BaseCollectionItemDataContainer):
@@ -1302,8 +1739,22 @@ class Boundary(BaseCollectionItemDataContainer):
                 high[index] += offset
         return Box3D(Point3D(*low), Point3D(*high))
 
+    def get_dependencies(self):
+        return self.get_value("reference_models")
+
+    @_set_parser_context("Boundary")
     def validate(self):
-        self.get_absolute_limits()
+        specification = self.get_value("specification")
+        lower = self.get_value("lower")
+        upper = self.get_value("upper")
+        self.get_value("tool_boundary")
+        _validate_references(CollectionName.MODELS, self.get_value("reference_models", raw=True),
+                             many=True)
+        if specification == BoundsSpecification.ABSOLUTE:
+            if any(limit.is_relative for limit in lower + upper):
+                raise InvalidDataError("Relative (%) values not allowed for absolute boundary")
+        elif specification != BoundsSpecification.MARGINS:
+            raise InvalidKeyError(specification, BoundsSpecification)
 
 
 class Task(BaseCollectionItemDataContainer):
@@ -1338,19 +1789,25 @@ class Task(BaseCollectionItemDataContainer):
                 # issue a warning - and go ahead ...
                 _log.warn("No collision model was selected. This can be intentional, but maybe "
                           "you simply forgot it.")
-            motion_grid = process.get_motion_grid(tool.radius, box, recurse_immediately=True)
-            _log.debug("MotionGrid completed")
-            if motion_grid is None:
-                # we assume that an error message was given already
-                return
-            with ProgressContext("Calculating toolpath") as progress:
-                draw_callback = UpdateToolView(
-                    progress.update,
-                    max_fps=get_event_handler().get("tool_progress_max_fps", 1)).update
-                moves = path_generator.generate_toolpath(
-                    tool.get_tool_geometry(), models, motion_grid, minz=box.lower.z,
-                    maxz=box.upper.z, draw_callback=draw_callback)
-            if not moves:
+            # "moves" is None, if the calculation was cancelled
+            persistent_cache = get_toolpath_cache()
+            if persistent_cache is None:
+                moves = self._calculate_moves(tool, process, path_generator, box, models)
+            else:
+                cache_key = self._get_persistent_cache_key(tool, process, box, models)
+                try:
+                    cached_steps = persistent_cache.get(cache_key)
+                    moves = [get_step_from_values(step) for step in cached_steps]
+                    _log.info("Using cached toolpath for task %s", self.get_id())
+                except KeyError:
+                    moves = self._calculate_moves(tool, process, path_generator, box, models)
+                    if moves is not None:
+                        # store plain tuples - they are independent of the step classes
+                        persistent_cache.set(cache_key, [tuple(step) for step in moves])
+            if moves is None:
+                _log.info("Toolpath calculation of task %s was cancelled", self.get_id())
+                return None
+            elif not moves:
                 _log.info("No valid moves found")
                 return None
             return pycam.Toolpath.Toolpath(toolpath_path=moves, tool=tool,
@@ -1358,14 +1815,64 @@ class Task(BaseCollectionItemDataContainer):
         else:
             raise InvalidKeyError(task_type, TaskType)
 
+    def _calculate_moves(self, tool, process, path_generator, box, models):
+        """ calculate the moves of a milling task (None: the calculation was interrupted) """
+        motion_grid = process.get_motion_grid(tool.radius, box, recurse_immediately=True)
+        _log.debug("MotionGrid completed")
+        if motion_grid is None:
+            # we assume that an error message was given already
+            return None
+        with ProgressContext("Calculating toolpath") as progress:
+            tool_view = UpdateToolView(
+                progress.update, max_fps=get_event_handler().get("tool_progress_max_fps", 1))
+            moves = path_generator.generate_toolpath(
+                tool.get_tool_geometry(), models, motion_grid, minz=box.lower.z,
+                maxz=box.upper.z, draw_callback=tool_view.update)
+        return None if tool_view.cancelled else moves
+
+    def _get_persistent_cache_key(self, tool, process, box, models):
+        """ describe all input values of a toolpath calculation
+
+        Item IDs are not part of the description - only the content is relevant.  The bounds are
+        represented by their absolute limits (based on the tool and the reference models).
+        Machine settings of the tool (e.g. the feedrate) are applied as toolpath filters later.
+        """
+        def get_parameters(item, ignored_keys=()):
+            result = item.get_dict()
+            for key in (item.unique_attribute, ) + ignored_keys:
+                result.pop(key, None)
+            return result
+
+        def get_digest(model):
+            return None if model is None else model.get_content_digest()
+
+        process_parameters = get_parameters(process)
+        if "trace_models" in process_parameters:
+            process_parameters["trace_models"] = [
+                get_digest(m.get_model()) for m in process.get_value("trace_models")]
+        return get_content_key({
+            "version": pycam.get_version(),
+            "type": self.get_value("type").value,
+            "tool": get_parameters(tool, ignored_keys=("tool_id", "feed", "spindle")),
+            "process": process_parameters,
+            "bounds": [tuple(box.lower), tuple(box.upper)],
+            "models": [get_digest(model) for model in models]})
+
+    def get_dependencies(self):
+        result = [self.get_value(key) for key in ("process", "bounds", "tool")]
+        result.extend(self.get_value("collision_models", default=[]))
+        return tuple(item for item in result if item is not None)
+
+    @_set_parser_context("Task")
     def validate(self):
-        # We cannot call "get_toolpath" - this would be too expensive. Use its attribute accesses
-        # directly instead.
-        self.get_value("process")
-        self.get_value("bounds")
         task_type = self.get_value("type")
         if task_type != TaskType.MILLING:
             raise InvalidKeyError(task_type, TaskType)
+        _validate_references(CollectionName.PROCESSES, self.get_value("process", raw=True))
+        _validate_references(CollectionName.BOUNDS, self.get_value("bounds", raw=True))
+        _validate_references(CollectionName.TOOLS, self.get_value("tool", raw=True))
+        _validate_references(CollectionName.MODELS,
+                             self.get_value("collision_models", raw=True, default=[]), many=True)
 
 
 class ToolpathTransformation(BaseDataContainer):
@@ -1443,9 +1950,29 @@ class ToolpathTransformation(BaseDataContainer):
             _log.info("Toolpath cropping: the result is empty")
             return None
 
+    def get_dependencies(self):
+        if self.get_value("action") == ToolpathTransformationAction.CROP:
+            return self.get_value("models")
+        else:
+            return ()
+
+    @_set_parser_context("Toolpath transformation")
     def validate(self):
-        toolpath = pycam.Toolpath.Toolpath()
-        self.get_transformed_toolpath(toolpath)
+        action = self.get_value("action")
+        if action == ToolpathTransformationAction.CROP:
+            self.validate_allowed_attributes({"action", "models"})
+            _validate_references(CollectionName.MODELS, self.get_value("models", raw=True),
+                                 many=True)
+        elif action == ToolpathTransformationAction.CLONE:
+            self.validate_allowed_attributes({"action", "offset", "clone_count"})
+            self.get_value("offset")
+            self._validate_value_range("clone_count", minimum=0)
+        elif action == ToolpathTransformationAction.SHIFT:
+            self.validate_allowed_attributes({"action", "shift_target", "axes"})
+            self.get_value("shift_target")
+            self.get_value("axes")
+        else:
+            raise InvalidKeyError(action, ToolpathTransformationAction)
 
 
 class Toolpath(BaseCollectionItemDataContainer):
@@ -1470,15 +1997,25 @@ class Toolpath(BaseCollectionItemDataContainer):
         return toolpath
 
     def append_transformation(self, transform_dict):
-        current_transformations = self.get_value("transformations", raw=True)
+        # work on a copy - otherwise "set_value" would not detect the change
+        current_transformations = copy.deepcopy(self.get_value("transformations", raw=True))
         current_transformations.append(copy.deepcopy(transform_dict))
         # verify the result (bail out on error)
         self.attribute_converters["transformations"](current_transformations)
         # there was no problem - overwrite the previous transformations
         self.set_value("transformations", current_transformations)
 
+    def get_dependencies(self):
+        result = list(self.get_value("source").get_dependencies(CollectionName.TOOLPATHS))
+        for transformation in self.get_value("transformations"):
+            result.extend(transformation.get_dependencies())
+        return tuple(result)
+
+    @_set_parser_context("Toolpath")
     def validate(self):
-        self.get_toolpath()
+        self.get_value("source").validate(CollectionName.TOOLPATHS)
+        for transformation in self.get_value("transformations"):
+            transformation.validate()
 
 
 class ExportSettings(BaseCollectionItemDataContainer):
@@ -1507,6 +2044,10 @@ class ExportSettings(BaseCollectionItemDataContainer):
                 result.append(tp_filters.PlungeFeedrate(float(parameters)))
             elif filter_name == ToolpathFilter.STEP_WIDTH:
                 result.append(tp_filters.StepWidth({key: float(parameters[key]) for key in "xyz"}))
+            elif filter_name == ToolpathFilter.SIMPLIFY_TOLERANCE:
+                result.append(tp_filters.Simplify(float(parameters)))
+            elif filter_name == ToolpathFilter.ARC_TOLERANCE:
+                result.append(tp_filters.FitArcs(float(parameters)))
             elif filter_name == ToolpathFilter.CORNER_STYLE:
                 mode = _get_enum_value(pycam.Toolpath.ToolpathPathMode, parameters["mode"])
                 motion_tolerance = parameters.get("motion_tolerance", 0)
@@ -1541,7 +2082,7 @@ class Target(BaseDataContainer):
             location = self.get_value("location")
             if dry_run:
                 # run basic checks and raise errors in case of obvious problems
-                if not os.path.isdir(os.path.dirname(location)):
+                if not os.path.isdir(os.path.dirname(location) or os.path.curdir):
                     raise LoadFileError("Directory of target ({}) does not exist"
                                         .format(location))
             else:
@@ -1601,7 +2142,8 @@ class Formatter(BaseDataContainer):
         comment = self.get_value("comment")
         dialect = self.get_value("dialect")
         if dialect == GCodeDialect.LINUXCNC:
-            generator = pycam.Exporters.GCode.LinuxCNC.LinuxCNC(target, comment=comment)
+            from pycam.Exporters.GCode.LinuxCNC import LinuxCNC
+            generator = LinuxCNC(target, comment=comment)
         else:
             raise InvalidKeyError(dialect, GCodeDialect)
         export_settings = self.get_value("export_settings")
@@ -1636,8 +2178,31 @@ class Formatter(BaseDataContainer):
         else:
             raise InvalidKeyError(filetype, FileType)
 
+    def get_dependencies(self):
+        if self.get_value("export_settings", raw=True) is None:
+            # avoid the warning about a missing item
+            return ()
+        export_settings = self.get_value("export_settings")
+        return () if export_settings is None else (export_settings, )
+
+    @_set_parser_context("Export formatter")
     def validate(self):
-        self.write_data([], io.StringIO())
+        format_type = self.get_value("type")
+        if format_type == FormatType.GCODE:
+            self.validate_allowed_attributes({"type", "comment", "dialect", "export_settings"})
+            dialect = self.get_value("dialect")
+            if dialect != GCodeDialect.LINUXCNC:
+                raise InvalidKeyError(dialect, GCodeDialect)
+            export_settings = self.get_value("export_settings", raw=True)
+            if export_settings is not None:
+                _validate_references(CollectionName.EXPORT_SETTINGS, export_settings)
+        elif format_type == FormatType.MODEL:
+            self.validate_allowed_attributes({"type", "filetype"})
+            filetype = self.get_value("filetype")
+            if filetype != FileType.STL:
+                raise InvalidKeyError(filetype, FileType)
+        else:
+            raise InvalidKeyError(format_type, FormatType)
 
 
 class Export(BaseCollectionItemDataContainer):
@@ -1658,5 +2223,22 @@ class Export(BaseCollectionItemDataContainer):
             open_target = target.open()
         formatter.write_data(source, open_target)
 
+    def get_dependencies(self):
+        return (self.get_value("source").get_dependencies(CollectionName.EXPORTS)
+                + self.get_value("format").get_dependencies())
+
+    @_set_parser_context("Export")
     def validate(self):
-        self.run_export(dry_run=True)
+        formatter = self.get_value("format")
+        source = self.get_value("source")
+        formatter.validate()
+        source.validate(CollectionName.EXPORTS)
+        self.get_value("target").validate()
+        # the formatter expects a specific type of items
+        wanted_source_type = {FormatType.GCODE: SourceType.TOOLPATH,
+                              FormatType.MODEL: SourceType.MODEL}[formatter.get_value("type")]
+        if source.get_value("type") != wanted_source_type:
+            raise InvalidDataError("Invalid source type for '{}' export: {} (expected: {})"
+                                   .format(formatter.get_value("type").value,
+                                           source.get_value("type").value,
+                                           wanted_source_type.value))
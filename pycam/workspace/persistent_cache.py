@@ -0,0 +1,120 @@
+"""
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import pycam.Utils.log
+
+
+_log = pycam.Utils.log.get_logger()
+
+CACHE_DIRECTORY_NAME = "pycam"
+# increase this number whenever the format of stored values changes
+CACHE_FORMAT_VERSION = 1
+
+# the cache for results of toolpath calculations (disabled by default)
+_toolpath_cache = None
+
+
+def get_default_cache_directory():
+    """ return the platform-specific location for cached data of the current user """
+    if os.name == "nt":
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base_dir, CACHE_DIRECTORY_NAME, "cache")
+    else:
+        base_dir = (os.environ.get("XDG_CACHE_HOME")
+                    or os.path.join(os.path.expanduser("~"), ".cache"))
+        return os.path.join(base_dir, CACHE_DIRECTORY_NAME)
+
+
+def get_content_key(description):
+    """ calculate a key for a description of the content of a cache item
+
+    @param description: a structure of dictionaries, lists and simple values (suitable for json)
+    """
+    text = json.dumps([CACHE_FORMAT_VERSION, description], sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PersistentCache:
+    """ store values in files below a directory - indexed by a key describing their content
+
+    The key is supposed to be calculated by "get_content_key".  Thus equal keys are guaranteed to
+    refer to the same content.  Stale items are never overwritten - they are just not used
+    anymore.  The directory may be removed at any time.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _get_filename(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def get(self, key):
+        """ return the value stored for the key or raise KeyError """
+        filename = self._get_filename(key)
+        try:
+            with open(filename, "rb") as cache_file:
+                return pickle.load(cache_file)
+        except FileNotFoundError:
+            raise KeyError(key)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as exc:
+            _log.warning("Ignoring invalid cache file (%s): %s", filename, exc)
+            raise KeyError(key)
+
+    def set(self, key, value):
+        """ store the value - failures are reported, but they are not fatal """
+        filename = self._get_filename(key)
+        directory = os.path.dirname(filename)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # write to a temporary file first - readers should never see incomplete files
+            temp_file = tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False)
+        except OSError as exc:
+            _log.warning("Failed to store cache file (%s): %s", filename, exc)
+            return
+        try:
+            with temp_file:
+                pickle.dump(value, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file.name, filename)
+        except OSError as exc:
+            _log.warning("Failed to store cache file (%s): %s", filename, exc)
+            try:
+                os.unlink(temp_file.name)
+            except OSError:
+                pass
+
+
+def set_toolpath_cache_directory(directory):
+    """ enable the persistent cache of toolpath calculations
+
+    @param directory: location of the cache files (None: disable the cache)
+    """
+    global _toolpath_cache
+    if directory is None:
+        _toolpath_cache = None
+    else:
+        _toolpath_cache = PersistentCache(directory)
+
+
+def get_toolpath_cache():
+    """ return the persistent cache of toolpath calculations (or None, if it is disabled) """
+    return _toolpath_cache
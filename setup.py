@@ -68,6 +68,7 @@ Windows: select Python 3.X in the following dialog.
         ],
         "console_scripts": [
             "pycam-cli = pycam.run_cli:main_func",
+            "pycam-worker = pycam.run_worker:main_func",
         ],
     },
     data_files=[